@@ -5,27 +5,42 @@ YouTube视频智能体
 
 import os
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterator, AsyncIterator
 from pathlib import Path
 
 from langchain_core.tools import Tool
 from langchain_core.messages import HumanMessage, AIMessage
-from langchain_zhipu import ChatZhipuAI
 
 from core.config import settings
+from core.llm_router import get_router
+from services.youtube_service import (
+    YouTubeService,
+    match_search_filters,
+    parse_duration_text,
+    parse_publish_time
+)
+from services.ytdlp_pool import METADATA_PROFILE, best_thumbnail, extract_with_profile
+from utils.extractive import select_sentences
 from utils.logger import logger
+from utils.transcript import Transcript, items_default
 
 
 class YouTubeAgent:
     """YouTube视频智能体"""
     
+    # 无API Key时批量抓取视频详情的并发上限
+    DETAILS_MAX_WORKERS = 4
+    
+    # 总结提示词中字幕部分的 token 预算
+    FULL_SUMMARY_TOKEN_BUDGET = 4000
+    CONCISE_SUMMARY_TOKEN_BUDGET = 2500
+    
     def __init__(self):
-        self.llm = ChatZhipuAI(
-            model=settings.ZHIPU_MODEL,
-            temperature=0.7,
-            api_key=settings.ZHIPU_API_KEY
-        )
+        self.router = get_router()
+        self.youtube_service = YouTubeService(settings.YOUTUBE_API_KEY)
         self.output_dir = Path("data/youtube")
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.tools = self._create_tools()
@@ -84,16 +99,36 @@ class YouTubeAgent:
         """
         logger.info(f"搜索YouTube视频: {query}")
         
+        search_params = {
+            "max_results": max_results,
+            "order": order,
+            "video_duration": video_duration,
+            "published_after": published_after
+        }
+        
+        if self.youtube_service.api_key:
+            return self._search_youtube_api(query, search_params)
+        
         try:
             from youtube_search import YoutubeSearch
             
+            has_filters = bool(video_duration or published_after)
+            fetch_count = max_results * 3 if has_filters else max_results
+            
             results = YoutubeSearch(
                 query,
-                max_results=max_results
+                max_results=fetch_count
             ).to_dict()
             
             videos = []
             for video in results:
+                if not match_search_filters(
+                    {"duration": video.get("duration"), "published": video.get("publish_time")},
+                    video_duration,
+                    published_after
+                ):
+                    continue
+                
                 video_data = {
                     "video_id": video.get("id", ""),
                     "title": video.get("title", ""),
@@ -110,6 +145,12 @@ class YouTubeAgent:
             
             if order == "viewCount":
                 videos.sort(key=lambda x: x["views"], reverse=True)
+            elif order == "date":
+                videos.sort(
+                    key=lambda x: parse_publish_time(x["published"]) or datetime.min,
+                    reverse=True
+                )
+            videos = videos[:max_results]
             
             logger.info(f"找到 {len(videos)} 个视频")
             return {
@@ -117,12 +158,8 @@ class YouTubeAgent:
                 "query": query,
                 "total_results": len(videos),
                 "videos": videos,
-                "search_params": {
-                    "max_results": max_results,
-                    "order": order,
-                    "video_duration": video_duration,
-                    "published_after": published_after
-                }
+                "source": "youtube_search",
+                "search_params": search_params
             }
             
         except ImportError:
@@ -132,6 +169,68 @@ class YouTubeAgent:
             logger.error(f"搜索失败: {e}")
             return {"success": False, "error": str(e)}
     
+    def _search_youtube_api(
+        self,
+        query: str,
+        search_params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        通过YouTube Data API搜索，时长/日期/排序筛选交给服务端
+        
+        Args:
+            query: 搜索关键词
+            search_params: 搜索参数
+        
+        Returns:
+            搜索结果字典
+        """
+        result = self._run_coroutine(self.youtube_service.search_videos(
+            query,
+            max_results=search_params["max_results"],
+            order=search_params["order"],
+            video_duration=search_params["video_duration"],
+            published_after=search_params["published_after"]
+        ))
+        if not result.get("success"):
+            logger.error(f"YouTube API 搜索失败: {result.get('error')}")
+            return result
+        
+        videos = []
+        for video in result.get("videos", []):
+            channel_id = video.get("channel_id", "")
+            videos.append({
+                "video_id": video.get("video_id", ""),
+                "title": video.get("title", ""),
+                "url": video.get("url", ""),
+                "thumbnail": video.get("thumbnail", ""),
+                "channel": video.get("channel", ""),
+                "channel_url": f"https://www.youtube.com/channel/{channel_id}" if channel_id else "",
+                "views": 0,
+                "duration": "",
+                "published": video.get("published_at", ""),
+                "description": video.get("description", "")
+            })
+        
+        logger.info(f"找到 {len(videos)} 个视频")
+        return {
+            "success": True,
+            "query": query,
+            "total_results": len(videos),
+            "videos": videos,
+            "source": "youtube_api",
+            "search_params": search_params
+        }
+    
+    def _run_coroutine(self, coro):
+        """在同步方法中执行协程，已有事件循环时切换到独立线程"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+    
     def _get_video_details(self, video_id: str) -> Dict[str, Any]:
         """
         获取视频详细信息
@@ -145,42 +244,33 @@ class YouTubeAgent:
         logger.info(f"获取视频详情: {video_id}")
         
         try:
-            import yt_dlp
+            info = extract_with_profile(
+                f"https://www.youtube.com/watch?v={video_id}",
+                METADATA_PROFILE
+            )
             
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
+            details = {
+                "video_id": video_id,
+                "title": info.get("title", ""),
+                "description": info.get("description", ""),
+                "duration": info.get("duration", 0),
+                "view_count": info.get("view_count", 0),
+                "like_count": info.get("like_count", 0),
+                "comment_count": info.get("comment_count", 0),
+                "channel": info.get("channel", ""),
+                "channel_id": info.get("channel_id", ""),
+                "channel_url": info.get("channel_url", ""),
+                "channel_follower_count": info.get("channel_follower_count", 0),
+                "upload_date": info.get("upload_date", ""),
+                "categories": info.get("categories", []),
+                "tags": info.get("tags", []),
+                "thumbnail": best_thumbnail(info),
+                "url": f"https://www.youtube.com/watch?v={video_id}"
             }
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(
-                    f"https://www.youtube.com/watch?v={video_id}",
-                    download=False
-                )
-                
-                details = {
-                    "video_id": video_id,
-                    "title": info.get("title", ""),
-                    "description": info.get("description", ""),
-                    "duration": info.get("duration", 0),
-                    "view_count": info.get("view_count", 0),
-                    "like_count": info.get("like_count", 0),
-                    "comment_count": info.get("comment_count", 0),
-                    "channel": info.get("channel", ""),
-                    "channel_id": info.get("channel_id", ""),
-                    "channel_url": info.get("channel_url", ""),
-                    "channel_follower_count": info.get("channel_follower_count", 0),
-                    "upload_date": info.get("upload_date", ""),
-                    "categories": info.get("categories", []),
-                    "tags": info.get("tags", []),
-                    "thumbnail": info.get("thumbnail", ""),
-                    "url": f"https://www.youtube.com/watch?v={video_id}"
-                }
-                
-                logger.info(f"获取视频详情成功: {details['title']}")
-                return {"success": True, "details": details}
-                
+            logger.info(f"获取视频详情成功: {details['title']}")
+            return {"success": True, "details": details}
+            
         except ImportError:
             logger.warning("yt_dlp 未安装，返回基本信息")
             return {
@@ -194,6 +284,69 @@ class YouTubeAgent:
             logger.error(f"获取视频详情失败: {e}")
             return {"success": False, "error": str(e)}
     
+    def _get_videos_details(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取视频详细信息
+        
+        配置了 YOUTUBE_API_KEY 时通过 videos.list 每50个ID一次请求；
+        未配置或API未返回的视频，使用有界的 yt-dlp 线程池逐个抓取
+        
+        Args:
+            video_ids: YouTube视频ID列表
+        
+        Returns:
+            以video_id为键的视频详情字典，结构与 _get_video_details 的 details 一致
+        """
+        video_ids = list(dict.fromkeys(v for v in video_ids if v))
+        logger.info(f"批量获取视频详情: {len(video_ids)} 个")
+        
+        details_map: Dict[str, Dict[str, Any]] = {}
+        
+        if self.youtube_service.api_key and video_ids:
+            result = self._run_coroutine(
+                self.youtube_service.get_video_statistics(video_ids)
+            )
+            if result.get("success"):
+                for video_id, item in result.get("videos", {}).items():
+                    details_map[video_id] = self._api_item_to_details(item)
+            else:
+                logger.warning(f"videos.list 请求失败，改用yt-dlp: {result.get('error')}")
+        
+        missing = [v for v in video_ids if v not in details_map]
+        if missing:
+            workers = min(self.DETAILS_MAX_WORKERS, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for video_id, result in zip(missing, executor.map(self._get_video_details, missing)):
+                    if result.get("success"):
+                        details_map[video_id] = result.get("details", {})
+        
+        logger.info(f"批量获取视频详情完成: {len(details_map)}/{len(video_ids)}")
+        return details_map
+    
+    def _api_item_to_details(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """将 videos.list 的结果转换为 _get_video_details 的详情结构"""
+        video_id = item.get("video_id", "")
+        channel_id = item.get("channel_id", "")
+        published_at = item.get("published_at", "")
+        return {
+            "video_id": video_id,
+            "title": item.get("title", ""),
+            "description": item.get("description", ""),
+            "duration": parse_duration_text(item.get("duration")) or 0,
+            "view_count": item.get("view_count", 0),
+            "like_count": item.get("like_count", 0),
+            "comment_count": item.get("comment_count", 0),
+            "channel": item.get("channel", ""),
+            "channel_id": channel_id,
+            "channel_url": f"https://www.youtube.com/channel/{channel_id}" if channel_id else "",
+            "channel_follower_count": 0,
+            "upload_date": published_at[:10].replace("-", ""),
+            "categories": [],
+            "tags": item.get("tags", []),
+            "thumbnail": item.get("thumbnail", ""),
+            "url": f"https://www.youtube.com/watch?v={video_id}"
+        }
+    
     def _list_available_transcripts(self, video_id: str) -> Dict[str, Any]:
         """
         列出视频可用的字幕语言
@@ -253,7 +406,7 @@ class YouTubeAgent:
             auto_sentence_break: 是否自动断句
         
         Returns:
-            转录文本
+            转录文本；transcript 为紧凑的 Transcript 容器，需要字典列表时调用 to_items()
         """
         logger.info(f"获取视频字幕: {video_id}, 语言: {language}")
         
@@ -277,16 +430,9 @@ class YouTubeAgent:
             
             transcript_list = api.fetch(video_id, lang_codes)
             
-            raw_text = " ".join([item.text for item in transcript_list])
-            
-            transcript_with_timestamps = [
-                {
-                    "start": item.start,
-                    "duration": getattr(item, 'duration', 0),
-                    "text": item.text
-                }
-                for item in transcript_list
-            ]
+            # 条目存为紧凑的列式容器，其文本缓冲区就是空格拼接的全文
+            transcript = Transcript.from_items(transcript_list)
+            raw_text = transcript.text
             
             if auto_sentence_break:
                 full_text = self._auto_sentence_break(raw_text)
@@ -301,7 +447,7 @@ class YouTubeAgent:
                 "video_id": video_id,
                 "full_text": full_text,
                 "raw_text": raw_text,
-                "transcript": transcript_with_timestamps,
+                "transcript": transcript,
                 "language": detected_lang,
                 "language_code": lang_codes[0] if lang_codes else language
             }
@@ -355,35 +501,17 @@ class YouTubeAgent:
         else:
             return "英文"
     
-    def _summarize_video(
-        self,
-        transcript: str,
-        video_title: str = "",
-        summary_type: str = "concise"
-    ) -> Dict[str, Any]:
-        """
-        总结视频内容
-        
-        Args:
-            transcript: 视频转录文本
-            video_title: 视频标题
-            summary_type: 总结类型 (full: 全文总结, concise: 精炼要点)
-        
-        Returns:
-            总结结果
-        """
-        logger.info(f"总结视频内容: {video_title}, 类型: {summary_type}")
-        
-        if not transcript:
-            return {"success": False, "error": "转录文本为空"}
-        
+    def _build_summary_prompt(self, transcript: str, video_title: str, summary_type: str) -> str:
+        """构建总结提示词，字幕先经过抽取式预筛选以覆盖整个视频"""
+        budget = self.FULL_SUMMARY_TOKEN_BUDGET if summary_type == "full" else self.CONCISE_SUMMARY_TOKEN_BUDGET
+        content = select_sentences(transcript, token_budget=budget)
         if summary_type == "full":
-            prompt = f"""请对以下YouTube视频内容进行详细的全文总结。
+            return f"""请对以下YouTube视频内容进行详细的全文总结。
 
 视频标题：{video_title}
 
 视频内容：
-{transcript[:8000]}
+{content}
 
 请提供：
 1. 视频主要内容概述
@@ -392,13 +520,12 @@ class YouTubeAgent:
 4. 结论和建议
 
 请用中文回答。"""
-        else:
-            prompt = f"""请对以下YouTube视频内容进行精炼要点总结。
+        return f"""请对以下YouTube视频内容进行精炼要点总结。
 
 视频标题：{video_title}
 
 视频内容：
-{transcript[:8000]}
+{content}
 
 请提供：
 1. 核心主题（1-2句话）
@@ -406,10 +533,42 @@ class YouTubeAgent:
 3. 重要结论（1-2句话）
 
 请用中文回答，简洁明了。"""
+    
+    def _summarize_video(
+        self,
+        transcript: str,
+        video_title: str = "",
+        summary_type: str = "concise",
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        总结视频内容
+        
+        Args:
+            transcript: 视频转录文本
+            video_title: 视频标题
+            summary_type: 总结类型 (full: 全文总结, concise: 精炼要点)
+            on_chunk: 流式回调，传入时每生成一段文本调用一次
+        
+        Returns:
+            总结结果
+        """
+        logger.info(f"总结视频内容: {video_title}, 类型: {summary_type}")
+        
+        if not transcript:
+            return {"success": False, "error": "转录文本为空"}
+        
+        prompt = self._build_summary_prompt(transcript, video_title, summary_type)
         
         try:
-            response = self.llm.invoke(prompt)
-            summary = response.content
+            if on_chunk:
+                parts = []
+                for chunk in self.router.stream(prompt, temperature=0.7, max_tokens=2000):
+                    parts.append(chunk)
+                    on_chunk(chunk)
+                summary = "".join(parts)
+            else:
+                summary = self.router.complete(prompt, temperature=0.7, max_tokens=2000).content
             
             logger.info("视频总结完成")
             return {
@@ -423,6 +582,37 @@ class YouTubeAgent:
             logger.error(f"总结失败: {e}")
             return {"success": False, "error": str(e)}
     
+    def stream_summary(
+        self,
+        transcript: str,
+        video_title: str = "",
+        summary_type: str = "concise"
+    ) -> Iterator[str]:
+        """
+        流式总结视频内容
+        
+        Args:
+            transcript: 视频转录文本
+            video_title: 视频标题
+            summary_type: 总结类型 (full, concise)
+        
+        Yields:
+            总结文本增量
+        """
+        prompt = self._build_summary_prompt(transcript, video_title, summary_type)
+        yield from self.router.stream(prompt, temperature=0.7, max_tokens=2000)
+    
+    async def astream_summary(
+        self,
+        transcript: str,
+        video_title: str = "",
+        summary_type: str = "concise"
+    ) -> AsyncIterator[str]:
+        """stream_summary 的异步版本"""
+        prompt = self._build_summary_prompt(transcript, video_title, summary_type)
+        async for chunk in self.router.astream(prompt, temperature=0.7, max_tokens=2000):
+            yield chunk
+    
     def _save_video_data(
         self,
         video_data: Dict[str, Any],
@@ -453,7 +643,7 @@ class YouTubeAgent:
             if format in ["json", "both"]:
                 json_path = self.output_dir / f"{filename}.json"
                 with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(video_data, f, ensure_ascii=False, indent=2)
+                    json.dump(video_data, f, ensure_ascii=False, indent=2, default=items_default)
                 saved_files.append(str(json_path))
                 logger.info(f"JSON文件已保存: {json_path}")
             
@@ -569,7 +759,11 @@ class YouTubeAgent:
         max_results: int = 5,
         get_transcript: bool = True,
         summary_type: str = "concise",
-        save_format: str = "both"
+        save_format: str = "both",
+        order: str = "viewCount",
+        video_duration: Optional[str] = None,
+        published_after: Optional[str] = None,
+        on_summary_chunk: Optional[Callable[[Dict[str, Any], str], None]] = None
     ) -> Dict[str, Any]:
         """
         运行完整的YouTube视频分析流程
@@ -580,6 +774,10 @@ class YouTubeAgent:
             get_transcript: 是否获取字幕
             summary_type: 总结类型
             save_format: 保存格式
+            order: 排序方式 (viewCount, relevance, date, rating)
+            video_duration: 视频时长筛选 (short, medium, long)
+            published_after: 发布日期筛选 (YYYY-MM-DD)
+            on_summary_chunk: 流式总结回调 (video, chunk)，传入时边生成边回调
         
         Returns:
             完整分析结果
@@ -592,31 +790,44 @@ class YouTubeAgent:
             "videos": []
         }
         
-        search_result = self._search_youtube(query, max_results)
+        search_result = self._search_youtube(
+            query,
+            max_results,
+            order=order,
+            video_duration=video_duration,
+            published_after=published_after
+        )
         if not search_result.get("success"):
             return {"success": False, "error": "搜索失败", "details": search_result}
         
         videos = search_result.get("videos", [])
         
+        details_map = self._get_videos_details(
+            [video["video_id"] for video in videos[:max_results]]
+        )
+        
         for i, video in enumerate(videos[:max_results], 1):
             logger.info(f"处理视频 {i}/{len(videos)}: {video['title']}")
             
             video_data = video.copy()
-            
-            details_result = self._get_video_details(video["video_id"])
-            if details_result.get("success"):
-                video_data.update(details_result.get("details", {}))
+            video_data.update(details_map.get(video["video_id"], {}))
             
             if get_transcript:
                 transcript_result = self._get_video_transcript(video["video_id"])
                 if transcript_result.get("success"):
                     video_data["transcript"] = transcript_result.get("full_text", "")
-                    video_data["transcript_data"] = transcript_result.get("transcript", [])
+                    # 紧凑容器只在内部使用，结果中保持 {start, duration, text} 字典列表
+                    transcript = transcript_result.get("transcript")
+                    video_data["transcript_data"] = transcript.to_items() if transcript is not None else []
                     
+                    on_chunk = None
+                    if on_summary_chunk:
+                        on_chunk = lambda chunk, video=video_data: on_summary_chunk(video, chunk)
                     summary_result = self._summarize_video(
                         video_data["transcript"],
                         video_data["title"],
-                        summary_type
+                        summary_type,
+                        on_chunk=on_chunk
                     )
                     if summary_result.get("success"):
                         video_data["summary"] = summary_result.get("summary", "")
@@ -659,11 +870,20 @@ class YouTubeAgent:
         
         print(f"\n正在搜索: {query}...")
         
+        def print_chunk(video: Dict[str, Any], chunk: str) -> None:
+            if streaming.get("video_id") != video["video_id"]:
+                streaming["video_id"] = video["video_id"]
+                print(f"\n\n📝 {video['title']}\n")
+            print(chunk, end="", flush=True)
+        
+        streaming: Dict[str, Any] = {}
+        
         import asyncio
         result = asyncio.run(self.run(
             query=query,
             max_results=max_results,
-            summary_type=summary_type
+            summary_type=summary_type,
+            on_summary_chunk=print_chunk
         ))
         
         if result.get("success"):
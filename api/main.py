@@ -0,0 +1,17 @@
+"""
+FastAPI 服务入口
+"""
+
+from fastapi import FastAPI
+
+from api.routes import youtube
+from core.config import settings
+
+app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG)
+app.include_router(youtube.router)
+
+
+@app.get("/health")
+async def health():
+    """健康检查"""
+    return {"status": "healthy"}
@@ -0,0 +1,70 @@
+"""
+YouTube 智能体接口
+"""
+
+import json
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from utils.logger import logger
+
+router = APIRouter(prefix="/api/youtube", tags=["youtube"])
+
+_agent = None
+
+
+def get_agent():
+    """延迟创建智能体，避免导入时初始化"""
+    global _agent
+    if _agent is None:
+        from agents.youtube_agent import YouTubeAgent
+
+        _agent = YouTubeAgent()
+    return _agent
+
+
+class SummaryRequest(BaseModel):
+    video_id: Optional[str] = None
+    transcript: Optional[str] = None
+    title: str = ""
+    summary_type: str = "concise"
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    message = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return f"event: {event}\n{message}" if event else message
+
+
+@router.post("/summary/stream")
+async def stream_summary(body: SummaryRequest):
+    """以 SSE 流式返回视频总结"""
+    agent = get_agent()
+
+    transcript = body.transcript
+    if not transcript:
+        if not body.video_id:
+            raise HTTPException(status_code=400, detail="video_id 或 transcript 不能为空")
+        result = await run_in_threadpool(agent._get_video_transcript, body.video_id)
+        if not result.get("success"):
+            raise HTTPException(status_code=404, detail=result.get("error", "获取字幕失败"))
+        transcript = result.get("full_text", "")
+
+    async def generate():
+        try:
+            async for chunk in agent.astream_summary(transcript, body.title, body.summary_type):
+                yield _sse({"chunk": chunk})
+        except Exception as e:
+            logger.error(f"流式总结失败: {e}")
+            yield _sse({"error": str(e)}, event="error")
+            return
+        yield _sse({}, event="done")
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
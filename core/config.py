@@ -11,13 +11,32 @@ class Settings(BaseSettings):
     ZHIPU_API_KEY: str = ""
     ZHIPU_MODEL: str = "glm-4"
     
+    SILICONFLOW_API_KEY: str = ""
+    SILICONFLOW_BASE_URL: str = "https://api.siliconflow.cn/v1"
+    SILICONFLOW_MODEL: str = "Qwen/QwQ-32B"
+    OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
+    OPENAI_MODEL: str = "gpt-3.5-turbo"
+    
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_DELAY: float = 8.0
+    LLM_BREAKER_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_TIMEOUT: float = 30.0
+    
     DATABASE_URL: str = "sqlite:///./data/zzy_agent.db"
     REDIS_URL: str = "redis://localhost:6379/0"
     
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
     
+    RATE_LIMIT_BACKEND: str = "memory"
+    LLM_DAILY_TOKEN_BUDGET: int = 0
+    LLM_RATE_LIMITS: dict = {}
+    
     YOUTUBE_API_KEY: Optional[str] = None
+    YTDLP_POOL_SIZE: int = 4
+    YTDLP_POOL_MAX_USES: int = 200
+    YTDLP_POOL_MAX_AGE: int = 1800
     SERVERCHAN_KEY: Optional[str] = None
     PUSHPLUS_TOKEN: Optional[str] = None
     
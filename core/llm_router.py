@@ -0,0 +1,714 @@
+"""
+LLM 路由模块
+统一访问智谱、硅基流动和 OpenAI 兼容接口：按滚动延迟和错误率选择最快的健康服务商，
+慢请求可对冲到第二个服务商并取消较慢的一方，连续失败时熔断；
+stream/astream 以生成器形式逐段产出文本（OpenAI 兼容接口走 SSE，智谱走 LangChain stream/astream）
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Union, Iterator, AsyncIterator
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.config import settings
+from core.rate_limiter import (
+    BudgetExceededError,
+    backoff_delay,
+    estimate_tokens,
+    get_rate_limiter,
+    is_rate_limit_error,
+    retry_after_from,
+    usage_from_result
+)
+from utils.logger import logger
+
+Messages = Union[str, List[Dict[str, str]]]
+
+# 单个服务商遇到 429/503 时的重试次数（只有一个可用服务商时才重试，否则直接切换）
+MAX_RETRIES = 3
+
+# 统计延迟和错误率的滑动窗口大小
+STATS_WINDOW = 50
+
+
+@dataclass
+class LLMResponse:
+    """LLM 调用结果"""
+    content: str
+    provider: str
+    model: str
+    latency: float
+    usage: Dict[str, Any] = field(default_factory=dict)
+
+
+class LLMRouterError(Exception):
+    """所有服务商都调用失败或不可用"""
+
+
+class RequestCancelled(Exception):
+    """对冲请求中较慢的一方被取消"""
+
+
+class ProviderStats:
+    """服务商的滚动延迟和错误率"""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self._latencies: deque = deque(maxlen=window)
+        self._outcomes: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: Optional[float], ok: bool) -> None:
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok and latency is not None:
+                self._latencies.append(latency)
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return 1 - sum(self._outcomes) / len(self._outcomes)
+
+    def percentile(self, pct: float) -> float:
+        """延迟百分位，没有样本时返回0"""
+        with self._lock:
+            if not self._latencies:
+                return 0.0
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+    def score(self) -> float:
+        """越小越优先；没有样本的服务商排在最前以便探测，错误率按倍数惩罚"""
+        return (self.percentile(50) + 1) * (1 + 4 * self.error_rate())
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒后进入半开状态，
+    只放行一个探测请求：成功则关闭，失败则重新打开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """是否可以参与路由（不占用半开探测名额）"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self.reset_timeout
+            return not (self.state == self.HALF_OPEN and self._probing)
+
+    def allow(self) -> bool:
+        """请求发出前调用，半开状态下只放行一个请求"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"LLM 服务商连续失败 {self._failures} 次，熔断 {self.reset_timeout}s")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release(self) -> None:
+        """请求被取消时归还半开探测名额"""
+        with self._lock:
+            self._probing = False
+
+
+class Provider:
+    """LLM 服务商基类"""
+
+    def __init__(self, name: str, model: str):
+        self.name = name
+        self.model = model
+        self.stats = ProviderStats()
+        self.breaker = CircuitBreaker(
+            settings.LLM_BREAKER_THRESHOLD,
+            settings.LLM_BREAKER_RESET_TIMEOUT
+        )
+
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        cancel: threading.Event
+    ) -> LLMResponse:
+        raise NotImplementedError
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        cancel: threading.Event,
+        usage: Dict[str, Any]
+    ) -> Iterator[str]:
+        """逐段产出生成的文本，服务端返回的 token 用量写入 usage"""
+        raise NotImplementedError
+
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        cancel: threading.Event,
+        usage: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """异步版本的 stream，默认在线程中运行同步流并转发到事件循环"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+
+        def produce() -> None:
+            try:
+                for chunk in self.stream(messages, temperature, max_tokens, cancel, usage):
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancel.set()
+
+
+class ZhipuProvider(Provider):
+    """通过 LangChain ChatZhipuAI 调用智谱"""
+
+    def __init__(self, api_key: str, model: str):
+        super().__init__("zhipu", model)
+        self.api_key = api_key
+        self._clients: Dict[float, Any] = {}
+        self._lock = threading.Lock()
+
+    def _client(self, temperature: float):
+        with self._lock:
+            client = self._clients.get(temperature)
+            if client is None:
+                from langchain_zhipu import ChatZhipuAI
+
+                client = ChatZhipuAI(model=self.model, temperature=temperature, api_key=self.api_key)
+                self._clients[temperature] = client
+            return client
+
+    @staticmethod
+    def _to_langchain(messages):
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+        roles = {"system": SystemMessage, "assistant": AIMessage, "user": HumanMessage}
+        return [roles.get(m["role"], HumanMessage)(content=m["content"]) for m in messages]
+
+    def complete(self, messages, temperature, max_tokens, cancel):
+        start = time.monotonic()
+        result = self._client(temperature).invoke(self._to_langchain(messages), max_tokens=max_tokens)
+        if cancel.is_set():
+            raise RequestCancelled(self.name)
+        total = usage_from_result(result)
+        return LLMResponse(
+            content=result.content,
+            provider=self.name,
+            model=self.model,
+            latency=time.monotonic() - start,
+            usage={"total_tokens": total} if total else {}
+        )
+
+    def stream(self, messages, temperature, max_tokens, cancel, usage):
+        chunks = self._client(temperature).stream(self._to_langchain(messages), max_tokens=max_tokens)
+        for chunk in chunks:
+            if cancel.is_set():
+                raise RequestCancelled(self.name)
+            total = usage_from_result(chunk)
+            if total:
+                usage["total_tokens"] = total
+            if chunk.content:
+                yield chunk.content
+
+    async def astream(self, messages, temperature, max_tokens, cancel, usage):
+        chunks = self._client(temperature).astream(self._to_langchain(messages), max_tokens=max_tokens)
+        async for chunk in chunks:
+            if cancel.is_set():
+                raise RequestCancelled(self.name)
+            total = usage_from_result(chunk)
+            if total:
+                usage["total_tokens"] = total
+            if chunk.content:
+                yield chunk.content
+
+
+class OpenAICompatibleProvider(Provider):
+    """OpenAI 兼容的 /chat/completions 接口（硅基流动、OpenAI 等）"""
+
+    def __init__(self, name: str, base_url: str, api_key: str, model: str, timeout=(10, 120)):
+        super().__init__(name, model)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        # POST 非幂等，只重试建连失败
+        adapter = HTTPAdapter(pool_maxsize=10, max_retries=Retry(total=1, connect=1, read=0, status=0, other=0))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def _post(self, messages, temperature, max_tokens, stream: bool = False) -> requests.Response:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if stream:
+            payload["stream"] = True
+        return self.session.post(
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            timeout=self.timeout,
+            stream=True
+        )
+
+    def complete(self, messages, temperature, max_tokens, cancel):
+        start = time.monotonic()
+        response = self._post(messages, temperature, max_tokens)
+        try:
+            if response.status_code != 200:
+                response.raise_for_status()
+            # 分块读取响应体，被取消时立即关闭连接
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=8192):
+                if cancel.is_set():
+                    raise RequestCancelled(self.name)
+                body.extend(chunk)
+        finally:
+            response.close()
+
+        result = json.loads(body)
+        return LLMResponse(
+            content=result["choices"][0]["message"]["content"],
+            provider=self.name,
+            model=self.model,
+            latency=time.monotonic() - start,
+            usage=result.get("usage") or {}
+        )
+
+    def stream(self, messages, temperature, max_tokens, cancel, usage):
+        """解析 SSE：data: {...} 每行一个增量，data: [DONE] 结束"""
+        response = self._post(messages, temperature, max_tokens, stream=True)
+        try:
+            if response.status_code != 200:
+                response.raise_for_status()
+            for line in response.iter_lines():
+                if cancel.is_set():
+                    raise RequestCancelled(self.name)
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                event = json.loads(data)
+                if event.get("usage"):
+                    usage.update(event["usage"])
+                for choice in event.get("choices") or []:
+                    # 推理模型的 reasoning_content 不输出
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield content
+        finally:
+            response.close()
+
+
+class LLMRouter:
+    """多服务商 LLM 路由"""
+
+    def __init__(
+        self,
+        providers: List[Provider],
+        hedge: Optional[bool] = None,
+        hedge_delay: Optional[float] = None,
+        max_workers: int = 8
+    ):
+        self.providers = providers
+        self.hedge = settings.LLM_HEDGE_ENABLED if hedge is None else hedge
+        self.hedge_delay = settings.LLM_HEDGE_DELAY if hedge_delay is None else hedge_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+
+    def rank(self) -> List[Provider]:
+        """按延迟和错误率排序的可用服务商"""
+        healthy = [p for p in self.providers if p.breaker.available()]
+        return sorted(healthy, key=lambda p: p.stats.score())
+
+    def complete(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        hedge: Optional[bool] = None
+    ) -> LLMResponse:
+        """
+        调用最快的健康服务商，失败时切换到下一个
+
+        Args:
+            messages: 提示词或 [{"role": ..., "content": ...}] 消息列表
+            temperature: 采样温度
+            max_tokens: 最大输出 token 数
+            hedge: 是否对冲慢请求，None 使用配置
+
+        Returns:
+            LLMResponse
+
+        Raises:
+            BudgetExceededError: 当日 token 预算已用完
+            LLMRouterError: 所有服务商都失败
+        """
+        messages = _normalize(messages)
+        hedge = self.hedge if hedge is None else hedge
+
+        candidates = self.rank()
+        if not candidates:
+            raise LLMRouterError("没有可用的 LLM 服务商")
+
+        tokens = _estimate(messages, max_tokens)
+        retries = MAX_RETRIES if len(candidates) == 1 else 0
+        request = (messages, temperature, max_tokens, tokens, retries)
+
+        queue = list(candidates)
+        pending: Dict[Any, tuple] = {}
+        errors: List[str] = []
+        hedged = False
+
+        def launch() -> None:
+            provider = queue.pop(0)
+            cancel = threading.Event()
+            future = self._executor.submit(self._attempt, provider, request, cancel)
+            pending[future] = (provider, cancel)
+
+        launch()
+        while pending:
+            timeout = None
+            if hedge and not hedged and queue and len(pending) == 1:
+                primary = next(iter(pending.values()))[0]
+                timeout = self._hedge_delay(primary)
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                hedged = True
+                logger.info(f"{primary.name} 响应慢，对冲请求到 {queue[0].name}")
+                launch()
+                continue
+
+            for future in done:
+                provider, _ = pending.pop(future)
+                try:
+                    response = future.result()
+                except BudgetExceededError:
+                    self._cancel(pending)
+                    raise
+                except RequestCancelled:
+                    continue
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e}")
+                    logger.warning(f"LLM 服务商 {provider.name} 调用失败: {e}")
+                    if not pending and queue:
+                        launch()
+                    continue
+                self._cancel(pending)
+                return response
+
+            if not pending and queue:
+                launch()
+
+        raise LLMRouterError("; ".join(errors) or "所有 LLM 服务商都不可用")
+
+    def _hedge_delay(self, provider: Provider) -> float:
+        """样本足够时用该服务商的 p95 延迟作为对冲阈值"""
+        if provider.stats.samples >= 5:
+            return provider.stats.percentile(95)
+        return self.hedge_delay
+
+    @staticmethod
+    def _cancel(pending: Dict[Any, tuple]) -> None:
+        for future, (_, cancel) in pending.items():
+            cancel.set()
+            future.cancel()
+
+    def _attempt(self, provider: Provider, request: tuple, cancel: threading.Event) -> LLMResponse:
+        messages, temperature, max_tokens, tokens, retries = request
+        limiter = get_rate_limiter()
+
+        for attempt in range(retries + 1):
+            if not provider.breaker.allow():
+                raise LLMRouterError(f"{provider.name} 已熔断")
+            try:
+                limiter.acquire(provider.name, provider.model, tokens)
+            except BudgetExceededError:
+                provider.breaker.release()
+                raise
+            if cancel.is_set():
+                provider.breaker.release()
+                raise RequestCancelled(provider.name)
+
+            start = time.monotonic()
+            try:
+                response = provider.complete(messages, temperature, max_tokens, cancel)
+            except RequestCancelled:
+                provider.breaker.release()
+                raise
+            except Exception as e:
+                provider.stats.record(time.monotonic() - start, ok=False)
+                provider.breaker.record_failure()
+                if attempt < retries and is_rate_limit_error(e):
+                    time.sleep(backoff_delay(attempt, retry_after=retry_after_from(e)))
+                    continue
+                raise
+
+            provider.stats.record(response.latency, ok=True)
+            provider.breaker.record_success()
+            limiter.record_usage(response.usage.get("total_tokens") or tokens)
+            return response
+
+    def stream(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> Iterator[str]:
+        """
+        流式调用最快的健康服务商，逐段产出生成的文本
+
+        只在产出第一段之前切换服务商；消费方提前停止迭代时关闭上游连接
+
+        Args:
+            messages: 提示词或消息列表
+            temperature: 采样温度
+            max_tokens: 最大输出 token 数
+
+        Yields:
+            文本增量
+        """
+        messages = _normalize(messages)
+        tokens = _estimate(messages, max_tokens)
+        errors: List[str] = []
+
+        for provider in self._stream_candidates():
+            started = False
+            try:
+                for chunk in self._stream_attempt(provider, messages, temperature, max_tokens, tokens):
+                    started = True
+                    yield chunk
+                return
+            except BudgetExceededError:
+                raise
+            except Exception as e:
+                if started:
+                    raise
+                errors.append(f"{provider.name}: {e}")
+                logger.warning(f"LLM 服务商 {provider.name} 流式调用失败: {e}")
+
+        raise LLMRouterError("; ".join(errors) or "所有 LLM 服务商都不可用")
+
+    async def astream(
+        self,
+        messages: Messages,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> AsyncIterator[str]:
+        """stream 的异步版本"""
+        messages = _normalize(messages)
+        tokens = _estimate(messages, max_tokens)
+        errors: List[str] = []
+
+        for provider in self._stream_candidates():
+            started = False
+            try:
+                async for chunk in self._astream_attempt(provider, messages, temperature, max_tokens, tokens):
+                    started = True
+                    yield chunk
+                return
+            except BudgetExceededError:
+                raise
+            except Exception as e:
+                if started:
+                    raise
+                errors.append(f"{provider.name}: {e}")
+                logger.warning(f"LLM 服务商 {provider.name} 流式调用失败: {e}")
+
+        raise LLMRouterError("; ".join(errors) or "所有 LLM 服务商都不可用")
+
+    def _stream_candidates(self) -> List[Provider]:
+        candidates = self.rank()
+        if not candidates:
+            raise LLMRouterError("没有可用的 LLM 服务商")
+        return candidates
+
+    def _begin_stream(self, provider: Provider, tokens: int) -> None:
+        if not provider.breaker.allow():
+            raise LLMRouterError(f"{provider.name} 已熔断")
+        try:
+            get_rate_limiter().acquire(provider.name, provider.model, tokens)
+        except BudgetExceededError:
+            provider.breaker.release()
+            raise
+
+    def _end_stream(self, provider: Provider, start: float, usage: Dict[str, Any], tokens: int) -> None:
+        provider.stats.record(time.monotonic() - start, ok=True)
+        provider.breaker.record_success()
+        get_rate_limiter().record_usage(usage.get("total_tokens") or tokens)
+
+    @staticmethod
+    def _fail_stream(provider: Provider, error: BaseException) -> None:
+        if isinstance(error, (RequestCancelled, GeneratorExit, asyncio.CancelledError)):
+            provider.breaker.release()
+        else:
+            provider.stats.record(None, ok=False)
+            provider.breaker.record_failure()
+
+    def _stream_attempt(self, provider, messages, temperature, max_tokens, tokens) -> Iterator[str]:
+        self._begin_stream(provider, tokens)
+        cancel = threading.Event()
+        usage: Dict[str, Any] = {}
+        start = time.monotonic()
+        chunks = provider.stream(messages, temperature, max_tokens, cancel, usage)
+        try:
+            yield from chunks
+        except BaseException as e:
+            cancel.set()
+            self._fail_stream(provider, e)
+            raise
+        finally:
+            chunks.close()
+        self._end_stream(provider, start, usage, tokens)
+
+    async def _astream_attempt(self, provider, messages, temperature, max_tokens, tokens) -> AsyncIterator[str]:
+        self._begin_stream(provider, tokens)
+        cancel = threading.Event()
+        usage: Dict[str, Any] = {}
+        start = time.monotonic()
+        chunks = provider.astream(messages, temperature, max_tokens, cancel, usage)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except BaseException as e:
+            cancel.set()
+            self._fail_stream(provider, e)
+            raise
+        finally:
+            await chunks.aclose()
+        self._end_stream(provider, start, usage, tokens)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def _normalize(messages: Messages) -> List[Dict[str, str]]:
+    if isinstance(messages, str):
+        return [{"role": "user", "content": messages}]
+    return messages
+
+
+def _estimate(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    return sum(estimate_tokens(m["content"]) for m in messages) + max_tokens
+
+
+def create_router(
+    zhipu_api_key: Optional[str] = None,
+    siliconflow_api_key: Optional[str] = None,
+    openai_api_key: Optional[str] = None,
+    **kwargs
+) -> LLMRouter:
+    """
+    根据已配置的 API Key 创建路由
+
+    Args:
+        zhipu_api_key: 智谱 API Key，默认读取配置
+        siliconflow_api_key: 硅基流动 API Key，默认读取配置
+        openai_api_key: OpenAI API Key，默认读取配置
+        **kwargs: 传给 LLMRouter 的参数
+
+    Returns:
+        LLMRouter
+    """
+    zhipu_api_key = zhipu_api_key or settings.ZHIPU_API_KEY
+    siliconflow_api_key = siliconflow_api_key or settings.SILICONFLOW_API_KEY
+    openai_api_key = openai_api_key or settings.OPENAI_API_KEY
+
+    providers: List[Provider] = []
+    if zhipu_api_key:
+        providers.append(ZhipuProvider(zhipu_api_key, settings.ZHIPU_MODEL))
+    if siliconflow_api_key:
+        providers.append(OpenAICompatibleProvider(
+            "siliconflow", settings.SILICONFLOW_BASE_URL, siliconflow_api_key, settings.SILICONFLOW_MODEL
+        ))
+    if openai_api_key:
+        providers.append(OpenAICompatibleProvider(
+            "openai", settings.OPENAI_BASE_URL, openai_api_key, settings.OPENAI_MODEL
+        ))
+    return LLMRouter(providers, **kwargs)
+
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """获取进程内共享的路由"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = create_router()
+    return _router
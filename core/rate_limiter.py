@@ -0,0 +1,319 @@
+"""
+LLM 限流模块
+按 provider/model 的令牌桶限制每分钟请求数和 token 数，并控制每日 token 预算。
+单进程使用内存状态；配置 RATE_LIMIT_BACKEND=redis 后，Flask 线程、脚本和
+Celery worker 通过 settings.REDIS_URL 共享同一组令牌桶。
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from core.config import settings
+from utils.logger import logger
+from utils.tokens import estimate_tokens
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """每分钟请求数和 token 数上限"""
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+# 默认限额，可通过 LLM_RATE_LIMITS 按 provider 或 provider/model 覆盖
+DEFAULT_RATE_LIMITS = {
+    "zhipu": RateLimit(60, 100000),
+    "siliconflow": RateLimit(60, 100000),
+    "openai": RateLimit(60, 90000),
+}
+FALLBACK_RATE_LIMIT = RateLimit(30, 50000)
+
+
+class BudgetExceededError(Exception):
+    """当日 token 预算已用完"""
+
+
+# 一次性检查并扣减多个令牌桶：任一桶不足时不扣减，返回需要等待的秒数
+# KEYS: 令牌桶键; ARGV: 每个桶依次为 capacity, rate(每秒), amount
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    local amount = tonumber(ARGV[i * 3])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < amount then
+        wait = math.max(wait, (amount - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    redis.call('HSET', key, 'tokens', levels[i] - tonumber(ARGV[i * 3]), 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 60)
+end
+return '0'
+"""
+
+# (key, capacity, rate, amount)
+Bucket = Tuple[str, float, float, float]
+
+
+class MemoryBackend:
+    """单进程内存状态"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._usage: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, buckets: List[Bucket]) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            levels = []
+            for key, capacity, rate, amount in buckets:
+                tokens, ts = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+                levels.append(tokens)
+                if tokens < amount:
+                    wait = max(wait, (amount - tokens) / rate)
+            if wait > 0:
+                return wait
+            for (key, _, _, amount), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - amount, now)
+            return 0.0
+
+    def get_usage(self, key: str) -> int:
+        with self._lock:
+            return self._usage.get(key, 0)
+
+    def add_usage(self, key: str, tokens: int) -> int:
+        with self._lock:
+            self._usage[key] = self._usage.get(key, 0) + tokens
+            return self._usage[key]
+
+
+class RedisBackend:
+    """多进程共享的 Redis 状态"""
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._acquire = self.client.register_script(_ACQUIRE_SCRIPT)
+
+    def try_acquire(self, buckets: List[Bucket]) -> float:
+        keys = [bucket[0] for bucket in buckets]
+        args = [value for bucket in buckets for value in bucket[1:]]
+        return float(self._acquire(keys=keys, args=args))
+
+    def get_usage(self, key: str) -> int:
+        return int(self.client.get(key) or 0)
+
+    def add_usage(self, key: str, tokens: int) -> int:
+        pipe = self.client.pipeline()
+        pipe.incrby(key, tokens)
+        pipe.expire(key, 2 * 86400)
+        return int(pipe.execute()[0])
+
+
+class RateLimiter:
+    """LLM 请求限流器"""
+
+    def __init__(
+        self,
+        backend=None,
+        limits: Optional[Dict[str, RateLimit]] = None,
+        daily_token_budget: Optional[int] = None,
+        prefix: str = "llm"
+    ):
+        self.backend = backend or MemoryBackend()
+        self.limits = {**DEFAULT_RATE_LIMITS, **(limits or {})}
+        self.daily_token_budget = (
+            settings.LLM_DAILY_TOKEN_BUDGET if daily_token_budget is None else daily_token_budget
+        )
+        self.prefix = prefix
+
+    def get_limit(self, provider: str, model: str = "") -> RateLimit:
+        return (
+            self.limits.get(f"{provider}/{model}")
+            or self.limits.get(provider)
+            or FALLBACK_RATE_LIMIT
+        )
+
+    def acquire(
+        self,
+        provider: str,
+        model: str = "",
+        tokens: int = 1,
+        timeout: Optional[float] = None
+    ) -> None:
+        """
+        阻塞直到请求数和 token 数令牌桶都允许本次调用
+
+        Args:
+            provider: 服务商 (zhipu, siliconflow, openai)
+            model: 模型名称
+            tokens: 预估消耗的 token 数（提示词 + 最大输出）
+            timeout: 最长等待秒数，None 表示一直等待
+
+        Raises:
+            BudgetExceededError: 当日 token 预算不足
+            TimeoutError: 等待超时
+        """
+        self._check_budget(tokens)
+
+        limit = self.get_limit(provider, model)
+        key = f"{self.prefix}:rl:{provider}:{model}"
+        buckets = [
+            (f"{key}:req", limit.requests_per_minute, limit.requests_per_minute / 60, 1),
+            (f"{key}:tok", limit.tokens_per_minute, limit.tokens_per_minute / 60,
+             min(tokens, limit.tokens_per_minute)),
+        ]
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.backend.try_acquire(buckets)
+            if wait <= 0:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise TimeoutError(f"{provider}/{model} 限流等待超时")
+            logger.debug(f"{provider}/{model} 触发限流，等待 {wait:.2f}s")
+            time.sleep(wait + random.uniform(0, 0.05))
+
+    def record_usage(self, tokens: int) -> int:
+        """记录实际消耗的 token，返回当日累计用量"""
+        return self.backend.add_usage(self._budget_key(), max(0, int(tokens)))
+
+    def _check_budget(self, tokens: int) -> None:
+        if not self.daily_token_budget:
+            return
+        used = self.backend.get_usage(self._budget_key())
+        if used + tokens > self.daily_token_budget:
+            raise BudgetExceededError(
+                f"今日 token 预算已用完 ({used}/{self.daily_token_budget})"
+            )
+
+    def _budget_key(self) -> str:
+        return f"{self.prefix}:budget:{datetime.now().strftime('%Y%m%d')}"
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """
+    解析 Retry-After 头：秒数或 HTTP 日期
+
+    Returns:
+        需要等待的秒数（不小于0），无法解析时返回 None
+    """
+    if value is None or value == "":
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 1.0,
+    cap: float = 30.0,
+    retry_after: Optional[Any] = None
+) -> float:
+    """
+    计算重试等待时间（full jitter 指数退避）
+
+    Args:
+        attempt: 第几次重试，从0开始
+        base: 基础等待秒数
+        cap: 最长等待秒数
+        retry_after: 服务端返回的 Retry-After（秒数或 HTTP 日期），优先使用
+    """
+    seconds = parse_retry_after(retry_after)
+    if seconds is not None:
+        return min(cap, seconds) + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """读取异常携带的 HTTP 状态码（requests、openai SDK 等）"""
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """判断异常是否为服务端限流（429）或暂时不可用（503），两者都应退避后重试"""
+    if error_status(error) in (429, 503):
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "too many requests" in message
+
+
+def retry_after_from(error: Exception) -> Optional[str]:
+    """读取 429/503 响应的 Retry-After 头，其他错误返回 None"""
+    if error_status(error) not in (429, 503):
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    return headers.get("Retry-After")
+
+
+def usage_from_result(result: Any) -> Optional[int]:
+    """从 LangChain 消息或 OpenAI 兼容响应中读取实际 token 用量"""
+    usage = getattr(result, "usage_metadata", None)
+    if usage:
+        return usage.get("total_tokens")
+    metadata = getattr(result, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or {}
+    return token_usage.get("total_tokens")
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取进程内共享的限流器"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    backend=_create_backend(),
+                    limits={
+                        name: RateLimit(value["rpm"], value["tpm"])
+                        for name, value in settings.LLM_RATE_LIMITS.items()
+                    }
+                )
+    return _limiter
+
+
+def _create_backend():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        try:
+            backend = RedisBackend(settings.REDIS_URL)
+            backend.client.ping()
+            return backend
+        except Exception as e:
+            logger.warning(f"Redis 限流后端不可用，改用内存状态: {e}")
+    return MemoryBackend()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+下载接口准入控制基准测试
+模拟一个容量有限的上游（并发超过 capacity 后每个请求按比例变慢，类似 yt-dlp 抓取和 LLM 调用争抢带宽与配额），
+一批客户端同时涌入并持续请求，对比不限制与 AdmissionLimiter 限制时成功请求的延迟、吞吐和被拒请求拿到 503 的速度
+
+用法:
+    python -m scripts.benchmarks.bench_admission
+
+    python -m scripts.benchmarks.bench_admission --clients 64 --capacity 4 --service 0.2
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from utils.admission import AdmissionLimiter, Overloaded
+
+
+class Upstream:
+    """并发不超过 capacity 时耗时 service 秒，超过后按并发数线性变慢"""
+
+    def __init__(self, capacity: int, service: float):
+        self.capacity = capacity
+        self.service = service
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def call(self) -> None:
+        with self.lock:
+            self.active += 1
+            load = self.active
+        try:
+            time.sleep(self.service * max(1.0, load / self.capacity))
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def client(upstream: Upstream, limiter: AdmissionLimiter, deadline: float, results: dict, lock: threading.Lock) -> None:
+    ok, rejected = [], []
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with limiter.slot():
+                upstream.call()
+            ok.append(time.perf_counter() - start)
+        except Overloaded:
+            rejected.append(time.perf_counter() - start)
+            # 客户端收到 503 后稍等再试（真实客户端按 Retry-After 等待，这里缩短以保持压力）
+            time.sleep(0.05)
+    with lock:
+        results['ok'].extend(ok)
+        results['rejected'].extend(rejected)
+
+
+def run(limiter: AdmissionLimiter, args: argparse.Namespace) -> tuple:
+    upstream = Upstream(args.capacity, args.service)
+    results, lock = {'ok': [], 'rejected': []}, threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=client, args=(upstream, limiter, deadline, results, lock))
+        for _ in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    ok, rejected = sorted(results['ok']), sorted(results['rejected'])
+    p99 = lambda values: values[int(len(values) * 0.99)] * 1000 if values else 0.0
+    return (
+        len(ok) / elapsed,
+        statistics.median(ok) * 1000 if ok else 0.0,
+        p99(ok),
+        len(rejected),
+        p99(rejected),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="准入控制基准测试")
+    parser.add_argument("--clients", type=int, default=48, help="并发客户端数")
+    parser.add_argument("--capacity", type=int, default=4, help="上游不变慢的并发数")
+    parser.add_argument("--service", type=float, default=0.2, help="上游单次耗时（秒）")
+    parser.add_argument("--duration", type=float, default=10, help="持续秒数")
+    parser.add_argument("--queue", type=int, default=2, help="排队数")
+    parser.add_argument("--queue-timeout", type=float, default=1.0, help="排队超时（秒）")
+    args = parser.parse_args()
+
+    print(f"{args.clients} 个客户端, 上游容量 {args.capacity}, 单次 {args.service * 1000:.0f} ms, {args.duration:.0f}s\n")
+    print(f"{'方式':<16}{'成功 req/s':>11}{'成功 p50 ms':>13}{'成功 p99 ms':>13}{'503 次数':>10}{'503 p99 ms':>12}")
+    rows = [
+        ("不限制", AdmissionLimiter(0)),
+        (f"上限 {args.capacity} 排队 {args.queue}",
+         AdmissionLimiter(args.capacity, max_queue=args.queue, queue_timeout=args.queue_timeout)),
+    ]
+    for name, limiter in rows:
+        throughput, p50, p99, rejected, reject_p99 = run(limiter, args)
+        print(f"{name:<16}{throughput:>11.1f}{p50:>13.0f}{p99:>13.0f}{rejected:>10}{reject_p99:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+CPU 密集渲染卸载基准测试
+多个线程并发提取核心观点并渲染 docx（模拟并发下载），同时一个探测线程反复执行轻量请求（模拟 I/O 型接口），
+对比在请求线程内渲染与交给进程池渲染时的总耗时和探测请求的延迟
+
+用法:
+    python -m scripts.benchmarks.bench_cpu_offload
+
+    python -m scripts.benchmarks.bench_cpu_offload --jobs 8 --paragraphs 6000 --workers 4
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'youtube-subtitle-downloader' / 'app'))
+
+import render_worker
+from utils.process_pool import ProcessPool
+
+
+def probe(stop: threading.Event, latencies: list) -> None:
+    """轻量请求：等待 5ms（模拟 I/O）后序列化一个小 JSON，记录超出 5ms 的延迟（含等待 GIL 的时间）"""
+    payload = {'video_id': 'x' * 11, 'title': '标题', 'views': 12345}
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(0.005)
+        json.dumps(payload, ensure_ascii=False)
+        latencies.append((time.perf_counter() - start - 0.005) * 1000)
+
+
+def render_download(scratch: str, text: str) -> object:
+    """一次 docx 下载的 CPU 部分：TextRank 核心观点 + 渲染 docx"""
+    points = render_worker.key_points(text)
+    return render_worker.render_docx(scratch, text, '标题', {'description': ''}, True, points)
+
+
+def run(render, jobs: int, text: str, scratch: str) -> tuple:
+    stop, latencies = threading.Event(), []
+    prober = threading.Thread(target=probe, args=(stop, latencies))
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        staged = list(executor.map(lambda _: render(scratch, text), range(jobs)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+    for item in staged:
+        os.remove(item.path)
+    latencies.sort()
+    return elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99)], latencies[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CPU 密集渲染卸载基准测试")
+    parser.add_argument("--jobs", type=int, default=4, help="并发渲染数")
+    parser.add_argument("--paragraphs", type=int, default=4000, help="每个文档的段落数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="进程池大小")
+    args = parser.parse_args()
+
+    text = '\n'.join(f'第{i}句，我们讨论市场、利率和公司的未来。' for i in range(args.paragraphs))
+    pool = ProcessPool(args.workers, initializer=render_worker.init_worker)
+    pool.start()
+    render_worker.init_worker()
+
+    print(f"{args.jobs} 个并发 docx 渲染 x {args.paragraphs} 段, 进程池 {args.workers} 个子进程, CPU {os.cpu_count()} 核\n")
+    print(f"{'方式':<12}{'总耗时 s':>10}{'探测 p50 ms':>13}{'p99 ms':>10}{'max ms':>10}")
+    with tempfile.TemporaryDirectory() as scratch:
+        rows = [
+            ("请求线程内", render_download),
+            ("进程池", lambda *a: pool.run(render_download, *a)),
+        ]
+        for name, render in rows:
+            elapsed, p50, p99, worst = run(render, args.jobs, text, scratch)
+            print(f"{name:<12}{elapsed:>10.2f}{p50:>13.3f}{p99:>10.2f}{worst:>10.2f}")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Word 导出基准测试
+对比旧版逐段 add_paragraph + 逐 run 设置字体与 utils.docx_writer 的样式模板 + 批量插入，
+并校验两者生成的段落文本一致
+
+用法:
+    # 合成约2小时的中文字幕（默认4000段）
+    python -m scripts.benchmarks.bench_docx
+
+    python -m scripts.benchmarks.bench_docx --paragraphs 10000 --repeat 3
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Pt
+
+from utils.docx_writer import append_paragraphs, new_document, write_transcript_document
+
+WORDS = ['我们', '今天', '讨论', '市场', '趋势', '投资', '利率', '公司', '未来', '关键', '风险', '价格']
+
+
+def synthetic_transcript(paragraphs: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return '\n\n'.join(
+        '，'.join(''.join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))) for _ in range(3)) + '。'
+        for _ in range(paragraphs)
+    )
+
+
+# ==================== 旧实现（对比基线） ====================
+
+def legacy_set_chinese_font(run, font_name='SimSun', font_size=12):
+    run.font.name = font_name
+    run.font.size = Pt(font_size)
+    rPr = run._element.get_or_add_rPr()
+    rFonts = OxmlElement('w:rFonts')
+    rFonts.set(qn('w:eastAsia'), font_name)
+    rPr.insert(0, rFonts)
+
+
+def legacy_script_body(transcript: str) -> Document:
+    """旧版脚本 create_word_document 的正文部分"""
+    doc = Document()
+    for para_text in transcript.split('\n\n'):
+        if para_text.strip():
+            p = doc.add_paragraph()
+            run = p.add_run(para_text.strip())
+            legacy_set_chinese_font(run, 'SimSun', 12)
+            p.paragraph_format.first_line_indent = Pt(20)
+            p.paragraph_format.space_after = Pt(8)
+    return doc
+
+
+def legacy_flask_body(transcript: str) -> Document:
+    """旧版 create_docx 的正文部分"""
+    doc = Document()
+    for line in transcript.split('\n'):
+        if line.strip():
+            doc.add_paragraph(line)
+    return doc
+
+
+def engine_script_body(transcript: str) -> Document:
+    doc = new_document('SimSun', 'SimSun', 12, first_line_indent=20, space_after=8)
+    append_paragraphs(doc, transcript.split('\n\n'))
+    return doc
+
+
+def engine_flask_body(transcript: str) -> Document:
+    doc = new_document()
+    append_paragraphs(doc, transcript.split('\n'), style=None)
+    return doc
+
+
+def save(doc: Document) -> int:
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.tell()
+
+
+def timeit(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def texts(doc: Document) -> List[str]:
+    return [p.text for p in doc.paragraphs]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Word 导出基准测试")
+    parser.add_argument("--paragraphs", type=int, default=4000, help="正文段落数")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+
+    transcript = synthetic_transcript(args.paragraphs)
+    print(f"正文: {args.paragraphs} 段, {len(transcript):,} 字符\n")
+
+    print("== 生成并保存 docx（中位数 ms）==")
+    print(f"{'路径':<22}{'旧实现':>10}{'导出引擎':>10}{'加速比':>8}")
+    rows = [
+        ("脚本（宋体+缩进）", legacy_script_body, engine_script_body),
+        ("Flask create_docx", legacy_flask_body, engine_flask_body),
+    ]
+    for name, legacy, engine in rows:
+        assert texts(legacy(transcript)) == texts(engine(transcript))
+        old_ms = timeit(lambda: save(legacy(transcript)), args.repeat)
+        new_ms = timeit(lambda: save(engine(transcript)), args.repeat)
+        print(f"{name:<22}{old_ms:>10.1f}{new_ms:>10.1f}{old_ms / new_ms:>7.1f}x")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = {'title': '基准测试', 'description': '描述', 'transcript': transcript}
+        ms = timeit(lambda: write_transcript_document(video, str(Path(tmp) / 'out.docx'), '中文'), args.repeat)
+        print(f"\nwrite_transcript_document 完整文档: {ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
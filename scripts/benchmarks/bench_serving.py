@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+字幕下载器服务吞吐基准测试
+多个 keep-alive 客户端并发请求同一地址，统计吞吐、延迟和返回字节数；
+用于对比开发服务器（python youtube_subtitle_api.py）与 gunicorn 生产配置
+
+用法:
+    # 先启动待测服务，再运行
+    python -m scripts.benchmarks.bench_serving --url http://127.0.0.1:5002/api/health
+
+    # 首页（带 Accept-Encoding: gzip 时返回预压缩版本）
+    python -m scripts.benchmarks.bench_serving --url http://127.0.0.1:5002/ --gzip --concurrency 32
+"""
+
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def client(url: str, headers: dict, deadline: float, latencies: list, stats: dict, lock: threading.Lock) -> None:
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    local, received, errors = [], 0, 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            received += len(response.read())
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        local.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    with lock:
+        latencies.extend(local)
+        stats['bytes'] += received
+        stats['errors'] += errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="服务吞吐基准测试")
+    parser.add_argument("--url", required=True, help="请求地址")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发客户端数")
+    parser.add_argument("--duration", type=float, default=10, help="持续秒数")
+    parser.add_argument("--gzip", action="store_true", help="发送 Accept-Encoding: gzip")
+    args = parser.parse_args()
+
+    headers = {'Accept-Encoding': 'gzip'} if args.gzip else {}
+    latencies, stats, lock = [], {'bytes': 0, 'errors': 0}, threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=client, args=(args.url, headers, deadline, latencies, stats, lock))
+        for _ in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{args.url}  并发 {args.concurrency}, {elapsed:.1f}s")
+    print(f"请求数 {len(latencies)}, 错误 {stats['errors']}, 吞吐 {len(latencies) / elapsed:.0f} req/s, "
+          f"{stats['bytes'] / elapsed / 1024 / 1024:.1f} MB/s")
+    if latencies:
+        print(f"延迟 p50 {statistics.median(latencies):.1f} ms, p99 {latencies[int(len(latencies) * 0.99)]:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
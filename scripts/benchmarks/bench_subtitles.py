@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+字幕格式引擎基准测试
+对比旧版字幕处理函数与 utils.subtitles 的解析、输出和格式转换耗时，
+以及自动字幕规范化（去滚动重复、合并句子）前后的文本长度
+
+用法:
+    # 合成约2小时的字幕（默认3000条）
+    python -m scripts.benchmarks.bench_subtitles
+
+    # 使用真实字幕文件（json3/srt/vtt 自动识别）
+    python -m scripts.benchmarks.bench_subtitles --file subtitle.json3 --repeat 20
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from utils.subtitles import (
+    EMITTERS,
+    Segment,
+    convert,
+    detect_format,
+    normalize_segments,
+    parse_subtitles,
+    subtitle_text,
+    to_bilibili_body
+)
+
+FIXTURES = Path(__file__).parent.parent.parent / 'tests' / 'fixtures' / 'subtitles'
+
+WORDS = ['我们', '今天', '讨论', '市场', '趋势', 'the', 'market', 'is', 'going', 'to', 'change', '未来', '关键']
+
+
+def synthetic_segments(count: int, seed: int = 0) -> List[Segment]:
+    rng = random.Random(seed)
+    segments = []
+    start = 0.0
+    for _ in range(count):
+        duration = rng.uniform(1.0, 4.0)
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        segments.append(Segment(round(start, 3), round(start + duration, 3), text))
+        start += duration + rng.uniform(0, 0.5)
+    return segments
+
+
+# ==================== 旧实现（对比基线） ====================
+
+def legacy_parse_srt_to_text(srt_content: str) -> str:
+    """旧版 parse_srt_to_text：json3 只取文本，SRT 逐行过滤掉序号和时间轴"""
+    try:
+        data = json.loads(srt_content)
+        if 'events' in data:
+            text_lines = []
+            for event in data.get('events', []):
+                for seg in event.get('segs', []):
+                    if 'utf8' in seg:
+                        text = seg['utf8'].strip()
+                        if text:
+                            text_lines.append(text)
+            return ' '.join(text_lines)
+    except (json.JSONDecodeError, TypeError):
+        pass
+    text_lines = []
+    for line in srt_content.split('\n'):
+        line = line.strip()
+        if line and not line.isdigit() and '-->' not in line:
+            text_lines.append(line)
+    return '\n'.join(text_lines)
+
+
+def legacy_format_srt_time(seconds: float) -> str:
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    millis = int((seconds * 1000) % 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def legacy_create_srt_content(transcript_data: List[Dict]) -> str:
+    """旧版 create_srt_content：逐行拼列表再 join"""
+    srt_content = []
+    for i, entry in enumerate(transcript_data, 1):
+        start_time = entry.get('start', 0)
+        duration = entry.get('duration', 0)
+        srt_content.append(str(i))
+        srt_content.append(f"{legacy_format_srt_time(start_time)} --> "
+                           f"{legacy_format_srt_time(start_time + duration)}")
+        srt_content.append(entry.get('text', ''))
+        srt_content.append('')
+    return '\n'.join(srt_content)
+
+
+def legacy_bilibili_srt(subtitles: List[Dict]) -> str:
+    """旧版 generate_bilibili_srt：起止时间各自手工格式化"""
+    lines = []
+    for i, item in enumerate(subtitles, 1):
+        content = item.get('content', '').replace('\n', ' ')
+        stamps = []
+        for value in (item.get('from', 0), item.get('to', 0)):
+            hours = int(value // 3600)
+            minutes = int((value % 3600) // 60)
+            secs = int(value % 60)
+            millisecs = int((value % 1) * 1000)
+            stamps.append(f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}")
+        lines.append(str(i))
+        lines.append(f"{stamps[0]} --> {stamps[1]}")
+        lines.append(content)
+        lines.append("")
+    return '\n'.join(lines)
+
+
+def timeit(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="字幕格式引擎基准测试")
+    parser.add_argument("--file", help="字幕文件（json3/srt/vtt）")
+    parser.add_argument("--cues", type=int, default=3000, help="合成字幕的条数")
+    parser.add_argument("--repeat", type=int, default=10, help="重复次数")
+    args = parser.parse_args()
+
+    if args.file:
+        segments = parse_subtitles(Path(args.file).read_text(encoding="utf-8"))
+    else:
+        segments = synthetic_segments(args.cues)
+
+    sources = {fmt: ''.join(EMITTERS[fmt](segments)) for fmt in ('json3', 'srt', 'vtt', 'bilibili')}
+    items = [{'start': s.start, 'duration': s.end - s.start, 'text': s.text} for s in segments]
+    body = to_bilibili_body(segments)
+    print(f"字幕: {len(segments)} 条, SRT {len(sources['srt']) / 1024:.0f} KB\n")
+
+    print("== 对比旧实现（中位数 ms）==")
+    rows = [
+        ("json3 -> 纯文本", lambda: legacy_parse_srt_to_text(sources['json3']),
+         lambda: subtitle_text(sources['json3'])),
+        ("SRT -> 纯文本", lambda: legacy_parse_srt_to_text(sources['srt']),
+         lambda: subtitle_text(sources['srt'])),
+        ("条目 -> SRT", lambda: legacy_create_srt_content(items),
+         lambda: convert(items, 'srt')),
+        ("B站 body -> SRT", lambda: legacy_bilibili_srt(body),
+         lambda: convert(body, 'srt')),
+    ]
+    print(f"{'操作':<18}{'旧实现':>10}{'字幕引擎':>10}{'加速比':>8}")
+    for name, legacy, engine in rows:
+        old_ms, new_ms = timeit(legacy, args.repeat), timeit(engine, args.repeat)
+        print(f"{name:<18}{old_ms:>10.2f}{new_ms:>10.2f}{old_ms / new_ms:>7.1f}x")
+    print("注：旧实现解析 SRT 时丢弃时间轴，字幕引擎的 Segment 保留完整时间轴（见下方转换矩阵）")
+
+    print("\n== 格式转换矩阵（解析 + 输出，中位数 ms）==")
+    parse_ms = {fmt: timeit(lambda: parse_subtitles(content, fmt), args.repeat) for fmt, content in sources.items()}
+    print("仅解析: " + ', '.join(f"{fmt} {ms:.2f}" for fmt, ms in parse_ms.items()))
+    targets = list(EMITTERS)
+    print(f"{'源/目标':<10}" + ''.join(f"{t:>10}" for t in targets))
+    for source_format, content in sources.items():
+        assert detect_format(content) == source_format
+        cells = [timeit(lambda: convert(content, target, source_format), args.repeat) for target in targets]
+        print(f"{source_format:<10}" + ''.join(f"{ms:>10.2f}" for ms in cells))
+
+    print("\n== 自动字幕规范化（tests/fixtures/subtitles）==")
+    print(f"{'文件':<26}{'原条数':>8}{'原字符':>8}{'句子数':>8}{'字符':>8}{'缩减':>8}{'耗时ms':>8}")
+    for path in sorted(FIXTURES.glob('auto_captions.*')):
+        content = path.read_text(encoding="utf-8")
+        raw = parse_subtitles(content)
+        raw_chars, normalized = len(subtitle_text(content)), normalize_segments(raw)
+        chars = sum(len(segment.text) for segment in normalized)
+        ms = timeit(lambda: normalize_segments(raw), args.repeat)
+        print(f"{path.name:<26}{len(raw):>8}{raw_chars:>8}{len(normalized):>8}{chars:>8}"
+              f"{raw_chars / chars:>7.1f}x{ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+TextRank 核心观点提取基准测试
+按字幕长度统计 extract_key_points 的总耗时，以及断句、相似度矩阵、PageRank、MMR 各阶段耗时
+
+用法:
+    # 合成 500 / 1500 / 3000 句的中英文字幕
+    python -m scripts.benchmarks.bench_textrank
+
+    # 使用真实字幕文本
+    python -m scripts.benchmarks.bench_textrank --file transcript.txt --repeat 10
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from utils.extractive import dedupe_sentences, split_sentences, strip_filler
+from utils.textrank import (
+    MIN_POINT_LENGTH,
+    extract_key_points,
+    mmr_select,
+    pagerank,
+    similarity_matrix
+)
+
+CJK_WORDS = ['市场', '投资', '风险', '政策', '技术', '创新', '能源', '价格', '利率', '就业', '芯片', '供应链']
+LATIN_WORDS = ['the', 'market', 'rates', 'policy', 'energy', 'prices', 'growth', 'inflation', 'jobs', 'chips']
+
+
+def synthetic_transcript(sentences: int, seed: int = 0) -> str:
+    """中英文混合的合成字幕，句长和用词随机"""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(sentences):
+        if rng.random() < 0.7:
+            parts.append(''.join(rng.choice(CJK_WORDS) for _ in range(rng.randint(6, 14))) + '。')
+        else:
+            parts.append(' '.join(rng.choice(LATIN_WORDS) for _ in range(rng.randint(8, 18))) + '. ')
+    return ''.join(parts)
+
+
+def median_ms(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def prepare(text: str) -> List[str]:
+    """与 extract_key_points 相同的断句、去重和去口头语"""
+    return [
+        sent for sent in (strip_filler(s) for s in dedupe_sentences(split_sentences(text)))
+        if len(sent) >= MIN_POINT_LENGTH
+    ]
+
+
+def bench(label: str, text: str, repeat: int) -> None:
+    sentences = prepare(text)
+    sim = similarity_matrix(sentences)
+    relevance = pagerank(sim)
+
+    print(f"📄 {label}: {len(text)} 字符，{len(sentences)} 句")
+    print(f"   {'阶段':<20}{'中位数(ms)':>12}")
+    for name, func in [
+        ('断句/去重', lambda: prepare(text)),
+        ('相似度矩阵', lambda: similarity_matrix(sentences)),
+        ('PageRank', lambda: pagerank(sim)),
+        ('MMR 选择', lambda: mmr_select(relevance, sim, 8)),
+        ('extract_key_points', lambda: extract_key_points(text)),
+    ]:
+        print(f"   {name:<20}{median_ms(func, repeat):>12.2f}")
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TextRank 核心观点提取基准测试")
+    parser.add_argument("--file", help="字幕文本文件")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+
+    if args.file:
+        bench(Path(args.file).name, Path(args.file).read_text(encoding='utf-8'), args.repeat)
+        return
+    for sentences in (500, 1500, 3000):
+        bench(f"合成 {sentences} 句", synthetic_transcript(sentences), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+字幕常驻内存基准测试
+对比旧版 _get_video_transcript 的 raw_text + {start, duration, text} 字典列表与 Transcript 容器，
+两者都另外持有断句后的 full_text
+
+用法:
+    # 合成100个约1小时的英文字幕
+    python -m scripts.benchmarks.bench_transcript_memory
+
+    python -m scripts.benchmarks.bench_transcript_memory --videos 300 --segments 1500
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from utils.transcript import Transcript, json_default
+
+WORDS = ['so', 'the', 'market', 'is', 'going', 'to', 'change', 'and', 'we', 'think', 'about', 'interest', 'rates']
+
+
+class Snippet(NamedTuple):
+    """模拟 youtube-transcript-api 的 FetchedTranscriptSnippet"""
+    text: str
+    start: float
+    duration: float
+
+
+def synthetic_snippets(count: int, seed: int) -> List[Snippet]:
+    rng = random.Random(seed)
+    snippets, start = [], 0.0
+    for _ in range(count):
+        duration = round(rng.uniform(1.0, 4.0), 3)
+        snippets.append(Snippet(' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 10))), round(start, 3), duration))
+        start += duration
+    return snippets
+
+
+def legacy(snippets: List[Snippet]) -> Dict[str, Any]:
+    raw_text = " ".join([item.text for item in snippets])
+    transcript = [{"start": item.start, "duration": item.duration, "text": item.text} for item in snippets]
+    return {"full_text": raw_text.replace(' so ', '. So '), "raw_text": raw_text, "transcript": transcript}
+
+
+def compact(snippets: List[Snippet]) -> Dict[str, Any]:
+    transcript = Transcript.from_items(snippets)
+    raw_text = transcript.text
+    return {"full_text": raw_text.replace(' so ', '. So '), "raw_text": raw_text, "transcript": transcript}
+
+
+def retained(build: Callable[[List[Snippet]], Dict[str, Any]], videos: int, segments: int) -> float:
+    """构建全部结果后丢弃原始条目，返回结果常驻的内存（MB）"""
+    inputs = [synthetic_snippets(segments, seed) for seed in range(videos)]
+    tracemalloc.start()
+    results = []
+    while inputs:
+        results.append(build(inputs.pop()))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="字幕常驻内存基准测试")
+    parser.add_argument("--videos", type=int, default=100, help="视频数")
+    parser.add_argument("--segments", type=int, default=1200, help="每个视频的字幕条数")
+    args = parser.parse_args()
+
+    old_mb = retained(legacy, args.videos, args.segments)
+    new_mb = retained(compact, args.videos, args.segments)
+    print(f"{args.videos} 个视频 x {args.segments} 条字幕（含 full_text）")
+    print(f"{'旧实现':<12}{old_mb:>10.1f} MB")
+    print(f"{'Transcript':<12}{new_mb:>10.1f} MB  ({old_mb / new_mb:.1f}x)")
+
+    snippets = synthetic_snippets(args.segments, 0)
+    old, new = legacy(snippets), compact(snippets)
+    for name, payload in (("旧实现", old["transcript"]), ("Transcript", new["transcript"])):
+        start = time.perf_counter()
+        size = len(json.dumps(payload, ensure_ascii=False, default=json_default))
+        print(f"序列化 {name:<12}{size / 1024:>8.0f} KB {(time.perf_counter() - start) * 1000:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+yt-dlp 提取配置基准测试
+对比当前默认配置（full）与 metadata-only / subtitles-only 配置
+
+录制时把提取器发出的每个 HTTP 请求及响应（视频页、player 接口、播放器JS、DASH/HLS 清单）
+写入 tests/fixtures/ytdlp/<VIDEO_ID>.http.json；回放时替换 YoutubeDL.urlopen，
+按各配置的真实代码路径执行 extract_info（含 process=False），
+统计耗时以及实际发出的请求数——被跳过的清单请求直接体现在请求数中
+
+用法:
+    # 录制（需要能访问YouTube），每个配置各提取一次，合并所有请求
+    python -m scripts.benchmarks.bench_ytdlp_profiles --record VIDEO_ID [VIDEO_ID ...]
+
+    # 在录制的请求上回放，比较各配置的提取耗时和请求数
+    python -m scripts.benchmarks.bench_ytdlp_profiles
+
+    # 联网端到端对比
+    python -m scripts.benchmarks.bench_ytdlp_profiles --live VIDEO_ID
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from services.ytdlp_pool import (
+    FULL_PROFILE,
+    METADATA_PROFILE,
+    SUBTITLES_PROFILE,
+    ExtractionProfile,
+    extract_with_profile
+)
+
+FIXTURE_DIR = Path(__file__).parent.parent.parent / "tests" / "fixtures" / "ytdlp"
+
+# 改造前 get_transcript 使用的参数
+LEGACY_SUBTITLE_PROFILE = ExtractionProfile(
+    name="full+subs",
+    options={
+        **FULL_PROFILE.options,
+        'writesubtitles': True,
+        'writeautomaticsub': True,
+        'subtitleslangs': ['en'],
+    },
+)
+
+# (标签, 配置)：改造前的调用与替换它的配置相邻
+PROFILES: List[Tuple[str, ExtractionProfile]] = [
+    ("full (get_video_info)", FULL_PROFILE),
+    (METADATA_PROFILE.name, METADATA_PROFILE),
+    ("full+subs (get_transcript)", LEGACY_SUBTITLE_PROFILE),
+    (SUBTITLES_PROFILE.name, SUBTITLES_PROFILE),
+]
+
+MANIFEST_MARKERS = ("/manifest/", ".mpd", ".m3u8")
+
+
+def request_key(method: str, url: str, data: Any) -> str:
+    """按方法、地址和请求体区分请求（innertube 接口同一地址以不同请求体区分客户端）"""
+    if isinstance(data, str):
+        data = data.encode("utf-8", errors="surrogateescape")
+    digest = hashlib.sha1(data).hexdigest() if data else ""
+    return f"{method} {url} {digest}"
+
+
+def is_manifest(url: str) -> bool:
+    return any(marker in url for marker in MANIFEST_MARKERS)
+
+
+def profile_options(profile: ExtractionProfile) -> Dict[str, Any]:
+    """关闭磁盘缓存，保证录制和每轮回放都走完整的请求路径（包括播放器JS）"""
+    return {**profile.options, 'cachedir': False}
+
+
+@contextmanager
+def patched_urlopen(handler) -> Iterator[None]:
+    import yt_dlp
+
+    original = yt_dlp.YoutubeDL.urlopen
+    yt_dlp.YoutubeDL.urlopen = handler(original)
+    try:
+        yield
+    finally:
+        yt_dlp.YoutubeDL.urlopen = original
+
+
+def record_fixtures(video_ids: List[str]) -> None:
+    """用各配置分别提取一次，录制全部请求和响应"""
+    import yt_dlp
+    from yt_dlp.networking import Request, Response
+    from yt_dlp.networking.exceptions import HTTPError
+
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    for video_id in video_ids:
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        exchanges: Dict[str, Dict[str, Any]] = {}
+
+        def recorder(original):
+            def urlopen(self, req):
+                if isinstance(req, str):
+                    req = Request(req)
+                key = request_key(req.method, req.url, req.data)
+                try:
+                    response = original(self, req)
+                except HTTPError as e:
+                    response = e.response
+                    body, error = response.read(), e
+                else:
+                    body, error = response.read(), None
+                data = req.data.decode("utf-8", errors="surrogateescape") if isinstance(req.data, bytes) else req.data
+                exchanges[key] = {
+                    "method": req.method,
+                    "url": req.url,
+                    "data": data,
+                    "status": response.status,
+                    "headers": dict(response.headers),
+                    "body": body.decode("utf-8", errors="surrogateescape"),
+                }
+                replayed = Response(io.BytesIO(body), response.url, response.headers, response.status, response.reason)
+                if error is not None:
+                    raise HTTPError(replayed)
+                return replayed
+            return urlopen
+
+        with patched_urlopen(recorder):
+            for _, profile in PROFILES:
+                with yt_dlp.YoutubeDL(profile_options(profile)) as ydl:
+                    ydl.extract_info(url, download=False, process=profile.process)
+
+        path = FIXTURE_DIR / f"{video_id}.http.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "video_id": video_id,
+                "yt_dlp_version": yt_dlp.version.__version__,
+                "exchanges": list(exchanges.values()),
+            }, f, ensure_ascii=False)
+        manifests = sum(1 for e in exchanges.values() if is_manifest(e["url"]))
+        print(f"✅ 已录制: {path} ({len(exchanges)} 个请求，其中 {manifests} 个清单请求)")
+
+
+def load_fixtures() -> Dict[str, Dict[str, Any]]:
+    fixtures = {}
+    for path in sorted(FIXTURE_DIR.glob("*.http.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures[path.name[:-len(".http.json")]] = json.load(f)
+    return fixtures
+
+
+def replay(fixture: Dict[str, Any], profile: ExtractionProfile, rounds: int) -> Dict[str, Any]:
+    """
+    在录制的请求上执行 extract_info
+
+    Returns:
+        {ms: 平均毫秒数, requests: 每次提取的请求数, manifests: 其中清单请求数, missing: 未录制的请求}
+    """
+    import yt_dlp
+    from yt_dlp.networking import Request, Response
+    from yt_dlp.networking.exceptions import HTTPError, TransportError
+
+    responses = {request_key(e["method"], e["url"], e.get("data")): e for e in fixture["exchanges"]}
+    seen: List[str] = []
+    missing: List[str] = []
+
+    def replayer(original):
+        def urlopen(self, req):
+            if isinstance(req, str):
+                req = Request(req)
+            seen.append(req.url)
+            exchange = responses.get(request_key(req.method, req.url, req.data))
+            if exchange is None and req.method == "POST":
+                # 请求体中含有随时间变化的字段时按地址匹配
+                exchange = next((e for e in fixture["exchanges"] if e["method"] == "POST" and e["url"] == req.url), None)
+            if exchange is None:
+                missing.append(req.url)
+                raise TransportError(f"未录制的请求: {req.method} {req.url}")
+            body = exchange["body"].encode("utf-8", errors="surrogateescape")
+            response = Response(io.BytesIO(body), exchange["url"], exchange["headers"], exchange["status"])
+            if exchange["status"] >= 400:
+                raise HTTPError(response)
+            return response
+        return urlopen
+
+    url = f"https://www.youtube.com/watch?v={fixture['video_id']}"
+    with patched_urlopen(replayer), yt_dlp.YoutubeDL(profile_options(profile)) as ydl:
+        # 预热一次，排除提取器初始化
+        ydl.extract_info(url, download=False, process=profile.process)
+        seen.clear()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            ydl.extract_info(url, download=False, process=profile.process)
+        elapsed = (time.perf_counter() - start) * 1000 / rounds
+
+    return {
+        "ms": elapsed,
+        "requests": len(seen) / rounds,
+        "manifests": sum(1 for u in seen if is_manifest(u)) / rounds,
+        "missing": sorted(set(missing)),
+    }
+
+
+def bench_fixtures(rounds: int) -> None:
+    fixtures = load_fixtures()
+    if not fixtures:
+        print(f"⚠️  {FIXTURE_DIR} 中没有录制的请求，先用 --record VIDEO_ID 录制")
+        sys.exit(1)
+
+    for name, fixture in fixtures.items():
+        print(f"📼 {name}（yt-dlp {fixture.get('yt_dlp_version')} 录制，{len(fixture['exchanges'])} 个请求）")
+        print(f"   {'配置':<28}{'提取(ms)':>10}{'请求数':>8}{'清单请求':>10}")
+        for label, profile in PROFILES:
+            try:
+                result = replay(fixture, profile, rounds)
+            except Exception as e:
+                print(f"   {label:<28}失败: {e}")
+                continue
+            print(f"   {label:<28}{result['ms']:>10.2f}{result['requests']:>8.0f}{result['manifests']:>10.0f}")
+            if result["missing"]:
+                print(f"      ⚠️  {len(result['missing'])} 个请求未录制（yt-dlp 版本不同时重新录制）")
+        print()
+
+
+def bench_live(video_ids: List[str]) -> None:
+    for video_id in video_ids:
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        for label, profile in PROFILES:
+            # 预热一次，排除提取器初始化和播放器JS下载
+            extract_with_profile(url, profile)
+            start = time.perf_counter()
+            extract_with_profile(url, profile)
+            print(f"   {video_id} {label:<28}{(time.perf_counter() - start) * 1000:>10.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="yt-dlp 提取配置基准测试")
+    parser.add_argument("--record", nargs="+", metavar="VIDEO_ID", help="录制fixture")
+    parser.add_argument("--live", nargs="+", metavar="VIDEO_ID", help="联网端到端对比")
+    parser.add_argument("--rounds", type=int, default=5, help="回放轮数")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+    elif args.live:
+        bench_live(args.live)
+    else:
+        bench_fixtures(args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,30 +10,14 @@ import os
 import re
 import json
 from pathlib import Path
-from datetime import datetime
-from docx import Document
-from docx.shared import Inches, Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
 
 sys.path.insert(0, str(Path(__file__).parent))
 
 from agents.youtube_agent import YouTubeAgent
+from utils.docx_writer import write_transcript_document
 from utils.logger import logger
 
 
-def set_chinese_font(run, font_name='SimSun', font_size=12):
-    """设置中文字体"""
-    run.font.name = font_name
-    run.font.size = Pt(font_size)
-    r = run._element
-    rPr = r.get_or_add_rPr()
-    rFonts = OxmlElement('w:rFonts')
-    rFonts.set(qn('w:eastAsia'), font_name)
-    rPr.insert(0, rFonts)
-
-
 def auto_sentence_break(text: str) -> str:
     """自动断句处理"""
     text = re.sub(r'\s+', ' ', text)
@@ -46,74 +30,7 @@ def auto_sentence_break(text: str) -> str:
 
 def create_word_document(video_data: dict, output_path: str, language: str):
     """创建Word文档"""
-    
-    doc = Document()
-    
-    title = video_data.get('title', 'Untitled')
-    
-    doc_title = doc.add_heading(f'【{language}】{title}', 0)
-    doc_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    lang_para = doc.add_paragraph()
-    lang_run = lang_para.add_run(f'字幕语言: {language}')
-    lang_run.bold = True
-    lang_run.font.color.rgb = RGBColor(0, 102, 204)
-    lang_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    doc.add_paragraph('')
-    
-    info_table = doc.add_table(rows=6, cols=2)
-    info_table.style = 'Table Grid'
-    
-    info_data = [
-        ('频道', video_data.get('channel', 'N/A')),
-        ('播放量', f"{video_data.get('view_count', 0):,}" if isinstance(video_data.get('view_count'), int) else str(video_data.get('view_count', 'N/A'))),
-        ('点赞数', f"{video_data.get('like_count', 0):,}" if video_data.get('like_count') else 'N/A'),
-        ('时长', f"{video_data.get('duration', 0)} 秒" if isinstance(video_data.get('duration'), int) else str(video_data.get('duration', 'N/A'))),
-        ('链接', video_data.get('url', 'N/A')),
-        ('分析日期', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-    ]
-    
-    for i, (label, value) in enumerate(info_data):
-        row = info_table.rows[i]
-        row.cells[0].text = label
-        row.cells[1].text = str(value)
-    
-    doc.add_paragraph('')
-    doc.add_heading('视频描述', level=1)
-    description = video_data.get('description', '无描述')
-    doc.add_paragraph(description[:1000] if len(description) > 1000 else description)
-    
-    transcript = video_data.get('transcript', '')
-    if transcript:
-        doc.add_page_break()
-        doc.add_heading(f'完整字幕 ({language})', level=1)
-        
-        processed_text = auto_sentence_break(transcript)
-        paragraphs = processed_text.split('\n\n')
-        
-        for para_text in paragraphs:
-            if para_text.strip():
-                p = doc.add_paragraph()
-                run = p.add_run(para_text.strip())
-                
-                if language == "中文":
-                    set_chinese_font(run, 'SimSun', 12)
-                else:
-                    run.font.name = 'Times New Roman'
-                    run.font.size = Pt(12)
-                
-                p.paragraph_format.first_line_indent = Pt(20)
-                p.paragraph_format.space_after = Pt(8)
-        
-        doc.add_paragraph('')
-        p = doc.add_paragraph()
-        run = p.add_run(f'字幕总长度: {len(transcript):,} 字符 | 语言: {language}')
-        run.italic = True
-        run.font.color.rgb = RGBColor(128, 128, 128)
-    
-    doc.save(output_path)
-    return output_path
+    return write_transcript_document(video_data, output_path, language, sentence_break=auto_sentence_break)
 
 
 def ask_language_preference(available_languages: list) -> str:
@@ -4,11 +4,148 @@ YouTube服务模块
 """
 
 import os
-from typing import Optional, Dict, Any, List
-from datetime import datetime
+import re
+from typing import Optional, Dict, Any, List, Union
+from datetime import datetime, timedelta
 import json
 
 from utils.logger import logger
+from utils.subtitles import normalize_segments, parse_transcript_items, segments_to_text
+from utils.transcript import TimeIndex, format_clock
+
+
+# YouTube Data API 的 videoDuration 分档（秒）: short < 4分钟, medium 4-20分钟, long > 20分钟
+DURATION_RANGES = {
+    "short": (0, 240),
+    "medium": (240, 1200),
+    "long": (1200, None),
+}
+
+# videos.list 单次请求最多支持的视频ID数
+VIDEOS_LIST_BATCH_SIZE = 50
+
+RELATIVE_TIME_UNITS = [
+    (("second", "秒"), timedelta(seconds=1)),
+    (("minute", "分钟"), timedelta(minutes=1)),
+    (("hour", "小时"), timedelta(hours=1)),
+    (("day", "天"), timedelta(days=1)),
+    (("week", "周", "星期"), timedelta(weeks=1)),
+    (("month", "个月", "月"), timedelta(days=30)),
+    (("year", "年"), timedelta(days=365)),
+]
+
+
+def parse_duration_text(duration: Any) -> Optional[int]:
+    """
+    解析时长为秒数
+
+    支持 "1:02:03" / "12:34" 形式的文本、ISO 8601 (PT1H2M3S) 以及数字
+    """
+    if duration is None or duration == "":
+        return None
+    if isinstance(duration, (int, float)):
+        return int(duration)
+
+    text = str(duration).strip()
+    iso = re.fullmatch(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?", text)
+    if iso and text not in ("P", "PT"):
+        days, hours, minutes, seconds = (int(g) if g else 0 for g in iso.groups())
+        return days * 86400 + hours * 3600 + minutes * 60 + seconds
+
+    parts = text.split(":")
+    if all(p.isdigit() for p in parts):
+        total = 0
+        for p in parts:
+            total = total * 60 + int(p)
+        return total
+    return None
+
+
+def parse_seek_time(value: Any) -> float:
+    """
+    解析跳转时间为秒数，保留小数部分
+
+    数字原样返回；支持 "12.7"、"41:07"、"1:02:03.5" 形式的文本，其余按 parse_duration_text 解析
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    text = str(value or "").strip()
+    parts = text.split(":")
+    if all(p.isdigit() for p in parts[:-1]) and re.fullmatch(r"\d+(?:\.\d+)?", parts[-1]):
+        total = 0.0
+        for p in parts[:-1]:
+            total = total * 60 + int(p)
+        return total * 60 + float(parts[-1])
+    return float(parse_duration_text(text) or 0)
+
+
+def parse_publish_time(text: Any, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    解析发布时间
+
+    支持 ISO 日期 (2024-01-02 / 2024-01-02T03:04:05Z)、YYYYMMDD，
+    以及搜索页的相对时间 ("3 years ago", "Streamed 2 weeks ago", "5天前")
+    """
+    if not text:
+        return None
+    text = str(text).strip()
+    now = now or datetime.now()
+
+    if re.fullmatch(r"\d{8}", text):
+        try:
+            return datetime.strptime(text, "%Y%m%d")
+        except ValueError:
+            return None
+
+    iso = re.match(r"(\d{4}-\d{2}-\d{2})", text)
+    if iso:
+        try:
+            return datetime.strptime(iso.group(1), "%Y-%m-%d")
+        except ValueError:
+            return None
+
+    match = re.search(r"(\d+)\s*([^\d\s]+)", text.lower())
+    if not match:
+        return None
+    amount = int(match.group(1))
+    unit_text = match.group(2)
+    for names, delta in RELATIVE_TIME_UNITS:
+        if any(unit_text.startswith(name) for name in names):
+            return now - delta * amount
+    return None
+
+
+def match_search_filters(
+    video: Dict[str, Any],
+    video_duration: Optional[str] = None,
+    published_after: Optional[str] = None
+) -> bool:
+    """
+    判断抓取到的视频是否满足时长/发布日期筛选
+
+    无法解析的字段视为满足条件，避免误删结果
+    """
+    if video_duration in DURATION_RANGES:
+        seconds = parse_duration_text(video.get("duration"))
+        if seconds is not None:
+            low, high = DURATION_RANGES[video_duration]
+            if seconds < low or (high is not None and seconds >= high):
+                return False
+
+    if published_after:
+        threshold = parse_publish_time(published_after)
+        published = parse_publish_time(video.get("published") or video.get("published_at"))
+        if threshold and published and published < threshold:
+            return False
+
+    return True
+
+
+def to_rfc3339(date_text: str) -> str:
+    """将 YYYY-MM-DD 转为 Data API 需要的 RFC 3339 时间"""
+    if "T" in date_text:
+        return date_text
+    return f"{date_text}T00:00:00Z"
 
 
 class YouTubeService:
@@ -24,7 +161,8 @@ class YouTubeService:
         max_results: int = 10,
         order: str = "viewCount",
         video_duration: Optional[str] = None,
-        region_code: str = "US"
+        region_code: str = "US",
+        published_after: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         使用YouTube Data API搜索视频
@@ -35,13 +173,20 @@ class YouTubeService:
             order: 排序方式
             video_duration: 视频时长
             region_code: 地区代码
+            published_after: 发布日期筛选 (YYYY-MM-DD)
         
         Returns:
             搜索结果
         """
         if not self.api_key:
             logger.warning("YouTube API Key 未配置，使用备用方案")
-            return await self._fallback_search(query, max_results)
+            return await self._fallback_search(
+                query,
+                max_results,
+                order=order,
+                video_duration=video_duration,
+                published_after=published_after
+            )
         
         try:
             import aiohttp
@@ -58,6 +203,8 @@ class YouTubeService:
             
             if video_duration:
                 params["videoDuration"] = video_duration
+            if published_after:
+                params["publishedAfter"] = to_rfc3339(published_after)
             
             async with aiohttp.ClientSession() as session:
                 async with session.get(
@@ -83,6 +230,8 @@ class YouTubeService:
         """
         获取视频统计数据
         
+        超过50个ID时按 videos.list 的上限分批请求，结果合并返回
+        
         Args:
             video_ids: 视频ID列表
         
@@ -95,23 +244,28 @@ class YouTubeService:
         try:
             import aiohttp
             
-            params = {
-                "part": "statistics,contentDetails,snippet",
-                "id": ",".join(video_ids),
-                "key": self.api_key
-            }
-            
+            videos = {}
             async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/videos",
-                    params=params
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self._process_video_details(data)
-                    else:
-                        error = await response.text()
-                        return {"success": False, "error": error}
+                for i in range(0, len(video_ids), VIDEOS_LIST_BATCH_SIZE):
+                    batch = video_ids[i:i + VIDEOS_LIST_BATCH_SIZE]
+                    params = {
+                        "part": "statistics,contentDetails,snippet",
+                        "id": ",".join(batch),
+                        "key": self.api_key
+                    }
+                    
+                    async with session.get(
+                        f"{self.base_url}/videos",
+                        params=params
+                    ) as response:
+                        if response.status == 200:
+                            data = await response.json()
+                            videos.update(self._process_video_details(data)["videos"])
+                        else:
+                            error = await response.text()
+                            return {"success": False, "error": error}
+            
+            return {"success": True, "videos": videos}
                         
         except Exception as e:
             logger.error(f"获取统计数据失败: {e}")
@@ -161,16 +315,27 @@ class YouTubeService:
     async def _fallback_search(
         self,
         query: str,
-        max_results: int
+        max_results: int,
+        order: str = "relevance",
+        video_duration: Optional[str] = None,
+        published_after: Optional[str] = None
     ) -> Dict[str, Any]:
-        """备用搜索方案（不使用API Key）"""
+        """备用搜索方案（不使用API Key），筛选条件在抓取结果上提前过滤"""
         try:
             from youtube_search import YoutubeSearch
             
-            results = YoutubeSearch(query, max_results=max_results).to_dict()
+            has_filters = bool(video_duration or published_after)
+            fetch_count = max_results * 3 if has_filters else max_results
+            results = YoutubeSearch(query, max_results=fetch_count).to_dict()
             
             videos = []
             for item in results:
+                if not match_search_filters(
+                    {"duration": item.get("duration"), "published": item.get("publish_time")},
+                    video_duration,
+                    published_after
+                ):
+                    continue
                 videos.append({
                     "video_id": item.get("id", ""),
                     "title": item.get("title", ""),
@@ -183,6 +348,13 @@ class YouTubeService:
                     "description": item.get("description", "")[:200] if item.get("description") else ""
                 })
             
+            if order == "date":
+                videos.sort(
+                    key=lambda v: parse_publish_time(v["published"]) or datetime.min,
+                    reverse=True
+                )
+            videos = videos[:max_results]
+            
             return {
                 "success": True,
                 "videos": videos,
@@ -239,6 +411,8 @@ class YouTubeService:
             videos[video_id] = {
                 "video_id": video_id,
                 "title": snippet.get("title", ""),
+                "description": snippet.get("description", ""),
+                "thumbnail": snippet.get("thumbnails", {}).get("high", {}).get("url", ""),
                 "view_count": int(stats.get("viewCount", 0)),
                 "like_count": int(stats.get("likeCount", 0)),
                 "comment_count": int(stats.get("commentCount", 0)),
@@ -307,15 +481,12 @@ class TranscriptService:
                 languages=languages
             )
             
-            full_text = " ".join([item["text"] for item in transcript_list])
+            parsed = parse_transcript_items(transcript_list)
+            full_text = segments_to_text(normalize_segments(parsed), " ")
             
             segments = [
-                {
-                    "start": item["start"],
-                    "duration": item.get("duration", 0),
-                    "text": item["text"]
-                }
-                for item in transcript_list
+                {"start": start, "duration": end - start, "text": text}
+                for start, end, text in parsed
             ]
             
             return {
@@ -335,33 +506,93 @@ class TranscriptService:
             logger.error(f"获取字幕失败: {e}")
             return {"success": False, "error": str(e)}
     
+    @staticmethod
+    def build_time_index(segments: Union[List[Dict], TimeIndex]) -> TimeIndex:
+        """字幕片段建立时间索引；多次查询同一字幕时先建索引再传入，避免重复构建"""
+        return segments if isinstance(segments, TimeIndex) else TimeIndex(segments)
+    
     @staticmethod
     def format_transcript_with_timestamps(
-        segments: List[Dict],
+        segments: Union[List[Dict], TimeIndex],
         interval: int = 60
     ) -> str:
         """
         格式化带时间戳的字幕
         
         Args:
-            segments: 字幕片段列表
+            segments: 字幕片段列表或时间索引
             interval: 时间间隔（秒）
         
         Returns:
             格式化后的文本
         """
-        formatted = []
-        current_time = 0
+        return TranscriptService.build_time_index(segments).format_markers(interval)
+    
+    @staticmethod
+    def segment_at(segments: Union[List[Dict], TimeIndex], time: Any) -> Optional[Dict[str, Any]]:
+        """
+        某一时刻的字幕
         
-        for segment in segments:
-            start = segment["start"]
-            
-            if start >= current_time + interval:
-                minutes = int(start // 60)
-                seconds = int(start % 60)
-                formatted.append(f"\n[{minutes:02d}:{seconds:02d}]")
-                current_time = start
-            
-            formatted.append(segment["text"])
+        Args:
+            segments: 字幕片段列表或时间索引
+            time: 秒数（可带小数）或 "41:07" / "1:02:03" 形式的时间
         
-        return " ".join(formatted)
+        Returns:
+            {start, duration, text}；早于第一条字幕时为 None
+        """
+        index = TranscriptService.build_time_index(segments)
+        position = index.locate(parse_seek_time(time))
+        if position is None:
+            return None
+        start, end, text = index.transcript[position]
+        return {"start": start, "duration": end - start, "text": text}
+    
+    @staticmethod
+    def extract_clip(
+        segments: Union[List[Dict], TimeIndex],
+        start: Any,
+        end: Any
+    ) -> Optional[Dict[str, Any]]:
+        """
+        截取一段时间内的字幕作为引用
+        
+        Args:
+            segments: 字幕片段列表或时间索引
+            start: 开始时间，秒数或 "12:00"
+            end: 结束时间，秒数或 "15:30"
+        
+        Returns:
+            {start, end, timestamp, text}；时间段内没有字幕时为 None
+        """
+        clip = TranscriptService.build_time_index(segments).clip(
+            parse_seek_time(start),
+            parse_seek_time(end)
+        )
+        if clip is None:
+            return None
+        return {
+            "start": clip.start,
+            "end": clip.end,
+            "timestamp": f"{format_clock(clip.start)}-{format_clock(clip.end)}",
+            "text": clip.text
+        }
+    
+    @staticmethod
+    def search_transcript(
+        segments: Union[List[Dict], TimeIndex],
+        query: str
+    ) -> List[Dict[str, Any]]:
+        """
+        在字幕中搜索，返回命中所在的时间点
+        
+        Args:
+            segments: 字幕片段列表或时间索引
+            query: 搜索词（不区分大小写）
+        
+        Returns:
+            [{start, timestamp, text}]
+        """
+        return [
+            {"start": segment.start, "timestamp": format_clock(segment.start), "text": segment.text}
+            for segment in TranscriptService.build_time_index(segments).search(query)
+        ]
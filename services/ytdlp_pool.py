@@ -0,0 +1,298 @@
+"""
+yt-dlp 实例池模块
+复用长期存活的 YoutubeDL 实例，保留提取器状态、Cookie 和播放器JS缓存
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Iterator, Union
+
+from core.config import settings
+from utils.logger import logger
+
+
+@dataclass
+class _PooledWorker:
+    """池中的单个 YoutubeDL 实例"""
+    ydl: Any
+    created_at: float = field(default_factory=time.monotonic)
+    uses: int = 0
+
+
+class YoutubeDLPool:
+    """
+    YoutubeDL 实例池
+
+    同一组参数的 YoutubeDL 实例在多个线程之间借用/归还。每个实例同一时刻
+    只被一个线程持有；超过最大使用次数或存活时间的实例会被回收重建，
+    借用期间出现 yt-dlp 内部错误或网络错误时实例视为不健康并丢弃
+    （视频级错误和调用方自己代码中的异常不影响实例）。
+    """
+
+    def __init__(
+        self,
+        options: Dict[str, Any],
+        size: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        max_age: Optional[float] = None
+    ):
+        self.options = dict(options)
+        self.size = size or settings.YTDLP_POOL_SIZE
+        self.max_uses = max_uses or settings.YTDLP_POOL_MAX_USES
+        self.max_age = max_age or settings.YTDLP_POOL_MAX_AGE
+        self._idle: "queue.LifoQueue[_PooledWorker]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._closed = False
+
+    def prewarm(self, count: Optional[int] = None) -> None:
+        """预先创建实例并加载YouTube提取器"""
+        for _ in range(min(count or self.size, self.size) - self._idle.qsize()):
+            self._idle.put(self._create_worker())
+
+    @contextmanager
+    def borrow(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        借用一个 YoutubeDL 实例
+
+        Args:
+            timeout: 等待空闲实例的最长秒数，None 表示一直等待
+
+        Yields:
+            YoutubeDL 实例
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("等待 YoutubeDL 实例超时")
+
+        worker = None
+        healthy = True
+        try:
+            worker = self._checkout()
+            yield worker.ydl
+        except Exception as e:
+            healthy = not self._is_instance_error(e)
+            raise
+        finally:
+            if worker is not None:
+                worker.uses += 1
+                self._checkin(worker, healthy)
+            self._slots.release()
+
+    def extract_info(self, url: str, **kwargs) -> Dict[str, Any]:
+        """借用实例执行 extract_info，默认不下载"""
+        kwargs.setdefault("download", False)
+        with self.borrow() as ydl:
+            return ydl.extract_info(url, **kwargs)
+
+    def close(self) -> None:
+        """关闭所有空闲实例，之后归还的实例也直接关闭"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close_worker(worker)
+
+    def _checkout(self) -> _PooledWorker:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return self._create_worker()
+            if self._is_fresh(worker):
+                return worker
+            self._close_worker(worker)
+
+    def _checkin(self, worker: _PooledWorker, healthy: bool) -> None:
+        if healthy and not self._closed and self._is_fresh(worker):
+            self._idle.put(worker)
+        else:
+            self._close_worker(worker)
+
+    def _is_fresh(self, worker: _PooledWorker) -> bool:
+        return (
+            worker.uses < self.max_uses
+            and time.monotonic() - worker.created_at < self.max_age
+        )
+
+    def _create_worker(self) -> _PooledWorker:
+        import yt_dlp
+
+        ydl = yt_dlp.YoutubeDL(self.options)
+        ydl.get_info_extractor("Youtube")
+        return _PooledWorker(ydl=ydl)
+
+    def _close_worker(self, worker: _PooledWorker) -> None:
+        try:
+            worker.ydl.close()
+        except Exception as e:
+            logger.debug(f"关闭 YoutubeDL 实例失败: {e}")
+
+    @staticmethod
+    def _is_instance_error(error: Exception) -> bool:
+        """
+        判断异常是否说明实例可能已损坏
+
+        视频不存在、无字幕等视频级错误（DownloadError、ExtractorError）不影响实例；
+        其他 yt-dlp 错误和网络错误（连接、SSL 等）需要丢弃实例；
+        调用方在 with 块中处理结果时抛出的其他异常与实例无关
+        """
+        try:
+            from yt_dlp.utils import DownloadError, ExtractorError, YoutubeDLError
+        except ImportError:
+            return isinstance(error, OSError)
+        if isinstance(error, (DownloadError, ExtractorError)):
+            return False
+        return isinstance(error, (YoutubeDLError, OSError))
+
+
+@dataclass(frozen=True)
+class ExtractionProfile:
+    """
+    命名的 yt-dlp 提取配置
+
+    process=False 时 extract_info 直接返回提取器的原始结果，跳过格式排序、
+    格式选择和字幕请求处理等后处理步骤
+    """
+    name: str
+    options: Dict[str, Any]
+    process: bool = True
+
+
+# 现有调用方使用的默认配置：解析全部格式和流清单
+FULL_PROFILE = ExtractionProfile(
+    name="full",
+    options={
+        'quiet': True,
+        'no_warnings': True,
+        'skip_download': True,
+    },
+)
+
+# 只读取标题、播放量、频道、标签等元数据
+METADATA_PROFILE = ExtractionProfile(
+    name="metadata-only",
+    options={
+        'quiet': True,
+        'no_warnings': True,
+        'skip_download': True,
+        'noplaylist': True,
+        'check_formats': False,
+        'getcomments': False,
+        'extractor_args': {'youtube': {'skip': ['dash', 'hls', 'translated_subs']}},
+    },
+    process=False,
+)
+
+# 只读取字幕/自动字幕列表，保留自动翻译字幕
+SUBTITLES_PROFILE = ExtractionProfile(
+    name="subtitles-only",
+    options={
+        'quiet': True,
+        'no_warnings': True,
+        'skip_download': True,
+        'noplaylist': True,
+        'check_formats': False,
+        'getcomments': False,
+        'extractor_args': {'youtube': {'skip': ['dash', 'hls']}},
+    },
+    process=False,
+)
+
+PROFILES = {
+    profile.name: profile
+    for profile in (FULL_PROFILE, METADATA_PROFILE, SUBTITLES_PROFILE)
+}
+
+
+# 最多保留的实例池数量，超过时关闭最久未使用的池（extra_options 的每种组合都会产生一个池）
+MAX_POOLS = 8
+
+_pools: "OrderedDict[str, YoutubeDLPool]" = OrderedDict()
+_pools_lock = threading.Lock()
+
+
+def get_pool(options: Dict[str, Any], **kwargs) -> YoutubeDLPool:
+    """
+    按参数获取共享的 YoutubeDL 实例池
+
+    Args:
+        options: YoutubeDL 参数，相同参数共享同一个池
+        **kwargs: 首次创建池时传给 YoutubeDLPool 的参数
+
+    Returns:
+        实例池；池的数量超过 MAX_POOLS 时最久未使用的池被关闭
+    """
+    key = json.dumps(options, sort_keys=True, default=str)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = YoutubeDLPool(options, **kwargs)
+            _pools[key] = pool
+            while len(_pools) > MAX_POOLS:
+                _, evicted = _pools.popitem(last=False)
+                evicted.close()
+        else:
+            _pools.move_to_end(key)
+        return pool
+
+
+def prewarm_profiles(*profiles: Union[str, ExtractionProfile], count: Optional[int] = None) -> None:
+    """
+    为提取配置预先创建 YoutubeDL 实例，避免第一批请求承担实例构造和提取器加载的开销
+
+    Args:
+        *profiles: 配置名称或 ExtractionProfile
+        count: 每个池创建的实例数，默认为池大小
+    """
+    for profile in profiles:
+        if isinstance(profile, str):
+            profile = PROFILES[profile]
+        get_pool(profile.options).prewarm(count)
+
+
+def close_all_pools() -> None:
+    """关闭所有实例池"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def extract_with_profile(
+    url: str,
+    profile: Union[str, ExtractionProfile],
+    extra_options: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    使用指定提取配置获取视频信息
+
+    Args:
+        url: 视频链接
+        profile: 配置名称或 ExtractionProfile
+        extra_options: 追加的 YoutubeDL 参数
+
+    Returns:
+        视频信息字典
+    """
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    options = {**profile.options, **(extra_options or {})}
+    with get_pool(options).borrow() as ydl:
+        return ydl.extract_info(url, download=False, process=profile.process)
+
+
+def best_thumbnail(info: Dict[str, Any]) -> str:
+    """获取封面地址，未经后处理的结果只有 thumbnails 列表"""
+    if info.get("thumbnail"):
+        return info["thumbnail"]
+    thumbnails = [t for t in info.get("thumbnails") or [] if t.get("url")]
+    if not thumbnails:
+        return ""
+    best = max(thumbnails, key=lambda t: (t.get("preference") or 0, t.get("width") or 0))
+    return best["url"]
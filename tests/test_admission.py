@@ -0,0 +1,102 @@
+"""
+接口准入控制测试
+"""
+
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.admission import AdmissionLimiter, MAX_RETRY_AFTER, Overloaded
+
+
+def test_rejects_immediately_when_queue_full():
+    """并发已满且不允许排队时立即拒绝，归还名额后恢复"""
+    limiter = AdmissionLimiter(1, max_queue=0, name='download')
+    limiter.acquire()
+    start = time.monotonic()
+    with pytest.raises(Overloaded) as excinfo:
+        limiter.acquire()
+    assert time.monotonic() - start < 0.1
+    assert excinfo.value.retry_after >= 1
+    limiter.release()
+    with limiter.slot():
+        assert limiter.stats()['in_flight'] == 1
+    assert limiter.stats() == {'in_flight': 0, 'waiting': 0, 'admitted': 2, 'rejected': 1}
+
+
+def test_queued_request_admitted_when_slot_frees():
+    """排队的请求在名额归还后进入，等待超时的请求被拒绝"""
+    limiter = AdmissionLimiter(1, max_queue=1, queue_timeout=2)
+    limiter.acquire()
+    admitted = threading.Event()
+
+    def waiter():
+        with limiter.slot():
+            admitted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    assert limiter.stats()['waiting'] == 1
+    # 队列已满，第三个请求立即拒绝
+    with pytest.raises(Overloaded):
+        limiter.acquire()
+    limiter.release()
+    thread.join(1)
+    assert admitted.is_set()
+
+    limiter = AdmissionLimiter(1, max_queue=1, queue_timeout=0.05)
+    limiter.acquire()
+    with pytest.raises(Overloaded):
+        limiter.acquire()
+    assert limiter.stats()['waiting'] == 0
+
+
+def test_retry_after_follows_service_time():
+    """建议重试间隔随平均处理时长增长，并有上限"""
+    limiter = AdmissionLimiter(2, default_retry_after=1)
+    assert limiter.retry_after() == 1
+    for _ in range(50):
+        limiter.acquire()
+        limiter.release(elapsed=1000)
+    assert limiter.retry_after() == MAX_RETRY_AFTER
+
+
+def test_disabled_limiter_admits_everything():
+    """max_in_flight <= 0 时不限制"""
+    limiter = AdmissionLimiter(0)
+    for _ in range(100):
+        limiter.acquire()
+    assert limiter.stats()['in_flight'] == 0
+
+
+def test_hold_keeps_slot_until_stream_finishes():
+    """流式内容的名额在迭代完毕或被关闭（客户端断开）时才归还"""
+    limiter = AdmissionLimiter(1)
+    limiter.acquire()
+    body = limiter.hold(iter([b'a', b'b']))
+    assert next(body) == b'a'
+    with pytest.raises(Overloaded):
+        limiter.acquire()
+    assert list(body) == [b'b']
+    assert limiter.stats()['in_flight'] == 0
+
+    limiter.acquire()
+    closed = []
+
+    def stream():
+        try:
+            yield b'a'
+        finally:
+            closed.append(True)
+
+    body = limiter.hold(stream())
+    next(body)
+    body.close()
+    body.close()
+    assert closed and limiter.stats()['in_flight'] == 0
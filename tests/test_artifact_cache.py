@@ -0,0 +1,132 @@
+"""
+渲染产物磁盘缓存测试
+"""
+
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.artifact_cache import ArtifactCache, make_key, stage_file
+
+
+def test_coalesces_concurrent_builds(tmp_path):
+    """并发的相同请求只构建一次，之后从磁盘命中"""
+    cache = ArtifactCache(str(tmp_path))
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.1)
+        return b'subtitle', {'mimetype': 'text/plain'}
+
+    key = make_key(video_id='abc', format='srt')
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_build(key, build))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len({r.etag for r in results}) == 1
+    assert cache.get_or_build(key, build).meta == {'mimetype': 'text/plain'}
+    assert len(calls) == 1
+
+    # 重启后从目录恢复
+    assert ArtifactCache(str(tmp_path)).get(key).size == len(b'subtitle')
+
+
+def test_lru_eviction_by_size(tmp_path):
+    """超出大小预算时淘汰最久未使用的产物"""
+    cache = ArtifactCache(str(tmp_path), max_bytes=25)
+    cache.put('a', b'x' * 10)
+    cache.put('b', b'x' * 10)
+    assert cache.get('a') is not None
+    cache.put('c', b'x' * 10)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.total_bytes == 20
+
+
+def test_build_errors_are_not_cached(tmp_path):
+    """构建失败时异常传给调用方，不写入缓存；is_fresh 为 False 时重新构建"""
+    cache = ArtifactCache(str(tmp_path))
+
+    def broken():
+        raise LookupError('no subtitles')
+
+    with pytest.raises(LookupError):
+        cache.get_or_build('k', broken)
+    assert cache.get('k') is None
+
+    cache.get_or_build('k', lambda: (b'v1', {'summary_source': 'extractive'}))
+    artifact = cache.get_or_build('k', lambda: (b'v2', {'summary_source': 'llm'}),
+                                  is_fresh=lambda meta: meta['summary_source'] == 'llm')
+    assert open(artifact.path, 'rb').read() == b'v2'
+
+
+def test_put_adopts_staged_file(tmp_path):
+    """已渲染到磁盘的文件改名移入缓存，ETag 与直接写入相同内容时一致"""
+    cache = ArtifactCache(str(tmp_path))
+    staged_path = tmp_path / 'job.render.tmp'
+    staged_path.write_bytes(b'docx bytes')
+
+    artifact = cache.put('staged', stage_file(str(staged_path)), mimetype='application/octet-stream')
+    assert not staged_path.exists()
+    with open(artifact.path, 'rb') as f:
+        assert f.read() == b'docx bytes'
+    assert artifact.etag == cache.put('written', b'docx bytes').etag
+
+
+def test_instances_share_directory(tmp_path):
+    """多个进程（各自一个实例）共享同一目录：互相命中、构建只进行一次、预算按目录合计"""
+    a = ArtifactCache(str(tmp_path), max_bytes=25)
+    b = ArtifactCache(str(tmp_path), max_bytes=25)
+    a.put('k', b'x' * 10, mimetype='text/plain')
+    assert b.get('k').meta == {'mimetype': 'text/plain'}
+
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.1)
+        return b'y' * 10, {}
+
+    threads = [threading.Thread(target=cache.get_or_build, args=('shared', build)) for cache in (a, b)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+    b.put('other', b'z' * 10)
+    assert a.total_bytes == b.total_bytes == 20
+    assert a.get('k') is None and len(b) == 2
+
+
+def test_corrupt_metadata_is_a_miss(tmp_path):
+    """元数据损坏或缺少 etag 时视为未命中并删除该条目"""
+    cache = ArtifactCache(str(tmp_path))
+    for broken in ('{}', '[]', 'not json'):
+        cache.put('k', b'data')
+        (tmp_path / 'k.json').write_text(broken)
+        assert cache.get('k') is None
+        assert not (tmp_path / 'k.bin').exists()
+
+
+def test_sweep_keeps_lock_files(tmp_path):
+    """启动清理只删除过期的临时文件，不删除可能仍被其他 worker 持有的锁文件"""
+    old = time.time() - 2 * 3600
+    for name in ('crashed.bin.1.2.tmp', 'building.lock', 'fresh.render.tmp'):
+        (tmp_path / name).write_bytes(b'')
+    for name in ('crashed.bin.1.2.tmp', 'building.lock'):
+        os.utime(tmp_path / name, (old, old))
+
+    ArtifactCache(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ['building.lock', 'fresh.render.tmp']
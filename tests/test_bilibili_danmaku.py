@@ -0,0 +1,87 @@
+"""
+B站弹幕解析与采样测试
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'youtube-subtitle-downloader', 'app'
+))
+
+import danmaku
+from danmaku import DensitySampler, fetch_danmaku, iter_segment_elems
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(field_no, value):
+    if isinstance(value, str):
+        raw = value.encode('utf-8')
+        return _varint(field_no << 3 | 2) + _varint(len(raw)) + raw
+    return _varint(field_no << 3) + _varint(value)
+
+
+def _segment(elems):
+    """按 DmSegMobileReply 编码弹幕列表"""
+    out = b''
+    for elem in elems:
+        body = b''.join(_field(no, elem[name]) for no, name in (
+            (1, 'id'), (2, 'progress'), (3, 'mode'), (5, 'color'), (7, 'content'), (9, 'weight')
+        ) if name in elem)
+        body += _field(12, 'ignored')
+        out += _varint(1 << 3 | 2) + _varint(len(body)) + body
+    return out
+
+
+def test_iter_segment_elems():
+    """测试 protobuf 分段解析"""
+    data = _segment([
+        {'id': 1, 'progress': 1500, 'mode': 1, 'color': 0xFFFFFF, 'content': '前方高能'},
+        {'id': 300000000000, 'progress': 61000, 'mode': 4, 'content': 'hello'},
+    ])
+    elems = list(iter_segment_elems(data))
+    assert elems[0] == {'id': 1, 'progress': 1500, 'mode': 1, 'color': 0xFFFFFF, 'content': '前方高能'}
+    assert elems[1]['id'] == 300000000000
+    assert elems[1]['content'] == 'hello'
+
+
+def test_density_sampler():
+    """测试按密度采样和桶内去重"""
+    sampler = DensitySampler(bucket_seconds=10, max_per_bucket=2)
+    for i in range(50):
+        sampler.add({'id': i, 'progress': 1000 + i, 'content': f'弹幕{i % 5}', 'weight': i % 5})
+    sampler.add({'id': 99, 'progress': 15000, 'content': '第二个桶'})
+    results = sampler.results()
+    assert [e['content'] for e in results] == ['弹幕3', '弹幕4', '第二个桶']
+
+
+def test_fetch_danmaku_window(monkeypatch):
+    """测试时间窗口只请求覆盖到的分段并过滤"""
+    requested = []
+
+    def fake_fetch_segment(aid, cid, index):
+        requested.append(index)
+        base = (index - 1) * danmaku.SEGMENT_SECONDS * 1000
+        return _segment([
+            {'id': index * 10 + k, 'progress': base + k * 60000, 'mode': 1, 'content': f'P{index}-{k}'}
+            for k in range(6)
+        ] + [{'id': 1, 'progress': base, 'mode': 7, 'content': '高级弹幕'}])
+
+    monkeypatch.setattr(danmaku, 'fetch_segment', fake_fetch_segment)
+    body = fetch_danmaku(1, 2, duration=3600, start=400, end=800)
+    assert sorted(requested) == [2, 3]
+    assert [item['content'] for item in body] == ['P2-1', 'P2-2', 'P2-3', 'P2-4', 'P2-5', 'P3-0', 'P3-1']
+    assert body[0]['from'] == 420.0
+    assert body[0]['to'] == 423.0
@@ -0,0 +1,197 @@
+"""
+B站多P字幕获取、合并与下载参数校验测试
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'youtube-subtitle-downloader', 'app'
+))
+# 测试中不写产物缓存目录
+os.environ.setdefault('ARTIFACT_CACHE_MAX_MB', '0')
+os.environ.setdefault('CPU_POOL_WORKERS', '0')
+
+import youtube_subtitle_api as api
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+
+class FakeClient:
+    """按地址返回预设的字幕 JSON，记录请求过的地址"""
+
+    def __init__(self, bodies, delays=None):
+        self.bodies = bodies
+        self.delays = delays or {}
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        time.sleep(self.delays.get(url, 0))
+        if url not in self.bodies:
+            return FakeResponse({}, status_code=404)
+        return FakeResponse({'body': self.bodies[url]})
+
+
+def _sub(lan, url):
+    return {'lan': lan, 'subtitle_url': url}
+
+
+@pytest.fixture
+def bilibili(monkeypatch):
+    """替换播放器字幕列表和 HTTP 客户端"""
+    players = {}
+    client = FakeClient({})
+    monkeypatch.setattr(api, 'get_bilibili_player_subtitles', lambda aid, cid: players.get(cid, []))
+    monkeypatch.setattr(api, 'get_client', lambda name: client)
+    return players, client
+
+
+def test_cid_subtitle_prefers_ai_track(bilibili):
+    """优先 AI 字幕，补全协议相对地址，ai_only 时忽略普通字幕"""
+    players, client = bilibili
+    players[1] = [_sub('zh-CN', '//sub/zh.json'), _sub('ai-zh', '//sub/ai.json')]
+    client.bodies = {
+        'https://sub/zh.json': [{'from': 0, 'to': 1, 'content': '普通'}],
+        'https://sub/ai.json': [{'from': 0.5, 'to': 2, 'content': 'AI', 'sid': 9}],
+    }
+
+    assert api.fetch_bilibili_cid_subtitle(100, 1) == [{'from': 0.5, 'to': 2, 'content': 'AI'}]
+
+    players[2] = [_sub('zh-CN', '//sub/zh.json')]
+    assert api.fetch_bilibili_cid_subtitle(100, 2, ai_only=True) is None
+    assert api.fetch_bilibili_cid_subtitle(100, 2)[0]['content'] == '普通'
+
+    # AI 字幕下载失败时退回普通字幕
+    players[3] = [_sub('ai-zh', '//sub/missing.json'), _sub('zh-CN', '//sub/zh.json')]
+    assert api.fetch_bilibili_cid_subtitle(100, 3)[0]['content'] == '普通'
+
+
+def test_multipart_offsets_and_order(bilibili):
+    """各分P按前面分P的时长偏移；并发完成顺序不影响合并顺序；缺字幕的分P保留空字幕轨"""
+    players, client = bilibili
+    for cid in (11, 12, 13):
+        players[cid] = [_sub('ai-zh', f'//sub/{cid}.json')]
+    client.bodies = {
+        'https://sub/11.json': [{'from': 1.5, 'to': 3, 'content': 'P1-a'}, {'from': 4, 'to': 5, 'content': 'P1-b'}],
+        'https://sub/13.json': [{'from': 0.25, 'to': 2, 'content': 'P3'}],
+    }
+    # 第一个分P最后返回
+    client.delays = {'https://sub/11.json': 0.1}
+    view = {
+        'title': '合集',
+        'pages': [
+            {'cid': 11, 'page': 1, 'part': '上', 'duration': 100},
+            {'cid': 12, 'page': 2, 'part': '中', 'duration': 50},
+            {'cid': 13, 'page': 3, 'part': '下', 'duration': 30},
+        ],
+    }
+
+    result = api.get_bilibili_multipart_subtitle(100, view, max_workers=3)
+
+    assert [(item['from'], item['to'], item['content'], item['page']) for item in result['body']] == [
+        (1.5, 3, 'P1-a', 1),
+        (4, 5, 'P1-b', 1),
+        (150.25, 152, 'P3', 3),
+    ]
+    assert [(track['page'], track['offset'], len(track['body'])) for track in result['tracks']] == [
+        (1, 0, 2), (2, 100, 0), (3, 150, 1),
+    ]
+    # 字幕轨保留原始时间戳
+    assert result['tracks'][2]['body'][0]['from'] == 0.25
+
+
+def test_multipart_without_any_subtitle(bilibili):
+    """所有分P都没有字幕时返回 None；没有 pages 时按单P处理"""
+    assert api.get_bilibili_multipart_subtitle(100, {'pages': [{'cid': 1, 'page': 1, 'duration': 10}]}) is None
+
+    players, client = bilibili
+    players[7] = [_sub('ai-zh', '//sub/7.json')]
+    client.bodies = {'https://sub/7.json': [{'from': 1, 'to': 2, 'content': '单P'}]}
+    result = api.get_bilibili_multipart_subtitle(100, {'cid': 7, 'title': '单P', 'duration': 10})
+    assert [track['part'] for track in result['tracks']] == ['单P']
+
+
+@pytest.mark.parametrize('payload', [
+    {'multipart': 'yes'},
+    {'multipart': 2},
+    {'multipart_mode': 'pages'},
+])
+def test_download_rejects_invalid_multipart_options(payload):
+    """multipart 只接受布尔值，multipart_mode 只接受支持的合并方式"""
+    client = api.app.test_client()
+    response = client.post('/api/bilibili/download', json={'video_id': 'BV1xx', **payload})
+    assert response.status_code == 400
+
+
+def test_parse_flag():
+    """字符串 "false" 不会被当成真值"""
+    assert api.parse_flag('false') is False
+    assert api.parse_flag('True') is True
+    assert api.parse_flag(None) is False
+    assert api.parse_flag(1) is True
+
+
+@pytest.mark.parametrize('payload', [
+    {'danmaku_start': '10'},
+    {'danmaku_end': -1},
+    {'danmaku_start': 30, 'danmaku_end': 10},
+    {'danmaku_max_per_bucket': 0},
+    {'danmaku_max_per_bucket': 1.5},
+    {'danmaku_max_per_bucket': True},
+])
+def test_download_rejects_invalid_danmaku_options(payload):
+    """弹幕时间窗口须为非负秒数，采样密度须为正整数"""
+    client = api.app.test_client()
+    response = client.post('/api/bilibili/download', json={'video_id': 'BV1xx', **payload})
+    assert response.status_code == 400
+
+
+def test_danmaku_uses_part_duration(monkeypatch):
+    """多P视频的弹幕按 cid 对应分P的时长分段，而不是全部分P的总时长"""
+    calls = []
+    monkeypatch.setattr(api, 'BILIBILI_SESSDATA', '')
+    monkeypatch.setattr(api, 'get_client', lambda name: FakeClient({}))
+    monkeypatch.setattr(api, 'fetch_danmaku', lambda aid, cid, duration, **options: calls.append((cid, duration, options)) or [])
+    view = {
+        'cid': 11,
+        'duration': 1800,
+        'pages': [{'cid': 11, 'page': 1, 'duration': 600}, {'cid': 12, 'page': 2, 'duration': 1200}],
+    }
+    api.get_bilibili_subtitle(100, view=view, danmaku_options={'max_per_bucket': 2})
+    assert calls == [(11, 600, {'max_per_bucket': 2})]
+    assert api.parse_danmaku_options({'danmaku_start': 0, 'danmaku_end': 60.5}) == {'start': 0, 'end': 60.5}
+
+
+def test_multipart_falls_back_to_single_part_sources(monkeypatch):
+    """所有分P都没有字幕时回退到单P的获取方式（视频级字幕或弹幕），并带上弹幕参数"""
+    calls = []
+    view = {'aid': 100, 'cid': 11, 'pages': [{'cid': 11, 'page': 1, 'duration': 60}, {'cid': 12, 'page': 2, 'duration': 60}]}
+    monkeypatch.setattr(api, 'artifact_cache', None)
+    monkeypatch.setattr(api, 'fetch_bilibili_view', lambda video_type, video_id: view)
+    monkeypatch.setattr(api, 'get_bilibili_video_info', lambda video_type, video_id, view=None: {
+        'aid': 100, 'bvid': video_id, 'title': '合集', 'author': 'up', 'duration': '2:00', 'description': ''
+    })
+    monkeypatch.setattr(api, 'get_bilibili_multipart_subtitle', lambda aid, view: None)
+    monkeypatch.setattr(api, 'get_bilibili_subtitle', lambda aid, view=None, danmaku_options=None: calls.append(
+        danmaku_options) or {'body': [{'from': 0, 'to': 1, 'content': '弹幕'}]})
+
+    client = api.app.test_client()
+    response = client.post('/api/bilibili/download', json={
+        'video_id': 'BV1xx', 'format': 'srt', 'multipart': True, 'danmaku_max_per_bucket': 3
+    })
+
+    assert response.status_code == 200
+    assert '弹幕' in response.get_data(as_text=True)
+    assert calls == [{'max_per_bucket': 3}]
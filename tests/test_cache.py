@@ -0,0 +1,90 @@
+"""
+进程内 TTL 缓存测试
+"""
+
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.cache
+from utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    """条目在 ttl 秒后过期，单个条目可以指定自己的 ttl"""
+    clock = FakeClock()
+    monkeypatch.setattr(utils.cache, 'time', clock)
+    cache = TTLCache(ttl=10)
+    cache.set('view', {'aid': 1})
+    cache.set('player', [], ttl=60)
+
+    clock.now += 9.9
+    assert cache.get('view') == {'aid': 1}
+    clock.now += 0.2
+    assert cache.get('view') is None
+    assert 'view' not in cache and len(cache) == 1
+    # 空列表等假值也算命中
+    assert cache.get('player', 'missing') == []
+    clock.now += 60
+    assert 'player' not in cache
+
+
+def test_evicts_least_recently_used():
+    """超过 maxsize 时淘汰最久未使用的条目，读取会刷新顺序"""
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_missing_keys_and_pop():
+    """不存在的键返回默认值；pop 删除并返回值，clear 清空"""
+    cache = TTLCache(ttl=60)
+    assert cache.get('nope') is None
+    assert cache.get('nope', 'default') == 'default'
+    assert cache.pop('nope', 0) == 0
+    cache.set('k', None)
+    assert 'k' in cache
+    cache.set('k', 'v')
+    assert cache.pop('k') == 'v' and 'k' not in cache
+    cache.set('x', 1)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_concurrent_access_respects_maxsize():
+    """多线程并发读写时条目数不超过 maxsize，写入的值都能读回或已被淘汰"""
+    cache = TTLCache(ttl=60, maxsize=50)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(500):
+                key = (n, i % 80)
+                cache.set(key, i)
+                value = cache.get(key)
+                assert value is None or value % 80 == i % 80
+        except AssertionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(cache) <= 50
@@ -0,0 +1,42 @@
+"""
+Word 导出引擎测试
+"""
+
+import sys
+import os
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from utils.docx_writer import BODY_STYLE, append_paragraphs, new_document, write_transcript_document
+
+
+def test_append_paragraphs_uses_styled_template():
+    """正文段落引用样式，字体/东亚字体/缩进在样式上；特殊字符、制表符保存后原样读回"""
+    doc = new_document('SimSun', 'SimSun', 12, first_line_indent=20, space_after=8)
+    assert append_paragraphs(doc, ['a & <b>', '  ', ' x\ty ', '中文\x0b']) == 3
+    buffer = BytesIO()
+    doc.save(buffer)
+
+    saved = Document(buffer)
+    assert [(p.text, p.style.name) for p in saved.paragraphs] == [
+        ('a & <b>', BODY_STYLE), ('x\ty', BODY_STYLE), ('中文', BODY_STYLE)
+    ]
+    style = saved.styles[BODY_STYLE]
+    assert (style.font.name, style.font.size.pt, style.paragraph_format.first_line_indent.pt) == ('SimSun', 12, 20)
+    assert style.element.rPr.rFonts.get(qn('w:eastAsia')) == 'SimSun'
+
+
+def test_write_transcript_document(tmp_path):
+    """脚本文档：正文在分页和标题之后、统计行之前"""
+    path = write_transcript_document(
+        {'title': '标题', 'transcript': '第一句。第二句。'}, str(tmp_path / 'out.docx'), '中文',
+        sentence_break=lambda text: text.replace('。', '。\n\n')
+    )
+    paragraphs = [p.text for p in Document(path).paragraphs]
+    index = paragraphs.index('完整字幕 (中文)')
+    assert paragraphs[index + 1:index + 3] == ['第一句。', '第二句。']
+    assert paragraphs[-1].startswith('字幕总长度: 8 字符')
@@ -0,0 +1,43 @@
+"""
+抽取式预筛选测试
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.tokens import estimate_tokens
+from utils.extractive import select_sentences, split_sentences, strip_filler
+
+
+def test_strip_filler():
+    """只去掉完整的口头语"""
+    assert strip_filler("嗯这个问题很重要") == "这个问题很重要"
+    assert strip_filler("so, the market fell") == "the market fell"
+    assert strip_filler("solar power is growing") == "solar power is growing"
+
+
+def test_select_sentences_budget_and_order():
+    """结果不超过预算、去掉重复片段、保持原文顺序并覆盖视频后半段"""
+    filler = ["嗯嗯嗯好吧", "那个就是说我们来看一下"] * 200
+    body = [f"第{i}部分分析了芯片出口管制对半导体产业的影响" for i in range(200)]
+    ending = ["因此结论是未来三年芯片产业将出现重要的结构性变化"]
+    text = "。".join(filler + body + ending)
+
+    selected = select_sentences(text, token_budget=400)
+    lines = selected.split("\n")
+
+    assert estimate_tokens(selected) <= 400 + len(lines)
+    assert len(lines) == len(set(lines))
+    assert "好吧" not in selected
+    assert ending[0] in lines
+    positions = [text.index(line) for line in lines]
+    assert positions == sorted(positions)
+
+
+def test_short_text_unchanged():
+    """未超出预算时原样返回"""
+    text = "This is short. It fits."
+    assert select_sentences(text, token_budget=100) == text
+    assert split_sentences("第一句话比较长一点。第二句话也比较长！") == ["第一句话比较长一点", "第二句话也比较长"]
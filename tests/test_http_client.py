@@ -0,0 +1,83 @@
+"""
+上游HTTP客户端重试策略测试
+"""
+
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'youtube-subtitle-downloader', 'app'
+))
+
+from http_client import UPSTREAM_POLICIES, HttpClient
+
+
+@pytest.fixture
+def server():
+    """前 failures 次请求返回 failure_status，之后返回 200"""
+    state = {'failures': 0, 'failure_status': 503, 'requests': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state['requests'] += 1
+            status = state['failure_status'] if state['requests'] <= state['failures'] else 200
+            body = f'status {status}'.encode()
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    state['url'] = f'http://127.0.0.1:{httpd.server_address[1]}/'
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_client(name):
+    """使用上游的重试策略，去掉退避等待"""
+    policy = dict(UPSTREAM_POLICIES[name])
+    policy['retries'] = policy['retries'].new(backoff_factor=0)
+    return HttpClient(name, policy)
+
+
+@pytest.mark.parametrize('name', ['youtube', 'translate', 'bilibili'])
+def test_status_retries_then_recovers(server, name):
+    """可重试的状态码在重试次数内恢复时返回成功的响应"""
+    client = make_client(name)
+    server['failures'] = UPSTREAM_POLICIES[name]['retries'].total
+    response = client.get(server['url'])
+    assert response.status_code == 200
+    assert server['requests'] == server['failures'] + 1
+    client.close()
+
+
+@pytest.mark.parametrize('name', ['youtube', 'translate', 'bilibili'])
+def test_exhausted_retries_return_last_response(server, name):
+    """重试用完后返回最后一次的响应（而不是抛出 RetryError），调用方照常检查 status_code"""
+    client = make_client(name)
+    server['failures'] = 100
+    response = client.get(server['url'])
+    assert response.status_code == 503
+    assert response.text == 'status 503'
+    assert server['requests'] == UPSTREAM_POLICIES[name]['retries'].total + 1
+    client.close()
+
+
+def test_non_retryable_status_returned_immediately(server):
+    """不在重试列表中的状态码（如404）不重试"""
+    client = make_client('bilibili')
+    server['failures'], server['failure_status'] = 1, 404
+    assert client.get(server['url']).status_code == 404
+    assert server['requests'] == 1
+    client.close()
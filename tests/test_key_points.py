@@ -0,0 +1,69 @@
+"""
+下载接口核心观点（后台生成AI观点、多 worker 共享）测试
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'youtube-subtitle-downloader', 'app'
+))
+os.environ.setdefault('ARTIFACT_CACHE_MAX_MB', '0')
+os.environ.setdefault('CPU_POOL_WORKERS', '0')
+
+import youtube_subtitle_api as api
+from utils.artifact_cache import ArtifactCache
+from utils.swr import StaleWhileRevalidate
+
+TEXT = '这是一段足够长的字幕文本，用来生成核心观点。' * 5
+
+
+@pytest.fixture
+def worker(monkeypatch, tmp_path):
+    """共享同一产物缓存目录；每次调用返回一个新的 worker（独立的内存缓存和后台线程）"""
+    calls = []
+    monkeypatch.setattr(api, 'artifact_cache', ArtifactCache(str(tmp_path)))
+    monkeypatch.setattr(api, 'KEY_POINTS_MODE', 'swr')
+    monkeypatch.setattr(api, 'has_llm_provider', lambda: True)
+    monkeypatch.setattr(api, 'local_key_points', lambda text: ['本地观点'])
+    monkeypatch.setattr(api, 'generate_gpt_summary', lambda text, points: calls.append(text) or ['AI观点'])
+
+    def new_worker():
+        cache = StaleWhileRevalidate(ttl=60, name='test-key-points')
+        monkeypatch.setattr(api, 'key_points_cache', cache)
+        return cache
+
+    new_worker.calls = calls
+    return new_worker
+
+
+def test_upgrade_visible_to_other_workers(worker):
+    """一个 worker 在后台生成的AI观点写入磁盘，另一个 worker 据此重新渲染旧产物"""
+    cache_a = worker()
+    assert api.get_key_points(TEXT) == (['本地观点'], 'extractive')
+    _, meta = api.make_artifact('内容', 'txt', 'a.txt', TEXT, 'extractive')
+    assert api.artifact_is_fresh(meta)
+    cache_a.wait(api.transcript_hash(TEXT), timeout=2)
+
+    worker()
+    assert not api.artifact_is_fresh(meta)
+    assert api.get_key_points(TEXT) == (['AI观点'], 'llm')
+    assert len(worker.calls) == 1
+
+
+def test_extractive_artifact_rebuilt_when_refresh_lost(worker):
+    """发起后台任务的 worker 退出后，本地观点的产物在 KEY_POINTS_RETRY_SECONDS 后视为过期"""
+    worker()
+    _, meta = api.make_artifact('内容', 'txt', 'a.txt', TEXT, 'extractive')
+    assert api.artifact_is_fresh(meta)
+    meta['built_at'] = time.time() - api.KEY_POINTS_RETRY_SECONDS - 1
+    assert not api.artifact_is_fresh(meta)
+
+    # AI观点产物不受影响
+    _, meta = api.make_artifact('内容', 'txt', 'a.txt', TEXT, 'llm')
+    meta['built_at'] = 0
+    assert api.artifact_is_fresh(meta)
@@ -0,0 +1,158 @@
+"""
+LLM 路由测试
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm_router import (
+    CircuitBreaker,
+    LLMResponse,
+    LLMRouter,
+    LLMRouterError,
+    Provider,
+    RequestCancelled
+)
+
+
+class FakeProvider(Provider):
+    """按固定延迟返回或抛出异常的服务商"""
+
+    def __init__(self, name, delay=0.0, error=None):
+        super().__init__(name, "fake-model")
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    def complete(self, messages, temperature, max_tokens, cancel):
+        self.calls += 1
+        if cancel.wait(self.delay):
+            self.cancelled = True
+            raise RequestCancelled(self.name)
+        if self.error:
+            raise self.error
+        return LLMResponse(content=f"from {self.name}", provider=self.name,
+                           model=self.model, latency=self.delay)
+
+    def stream(self, messages, temperature, max_tokens, cancel, usage):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        for word in ["from ", self.name]:
+            yield word
+
+
+def test_failover_to_next_provider():
+    """首选服务商失败时切换到下一个"""
+    broken = FakeProvider("zhipu", error=RuntimeError("boom"))
+    working = FakeProvider("siliconflow")
+    router = LLMRouter([broken, working], hedge=False)
+
+    response = router.complete("hi")
+    assert response.provider == "siliconflow"
+    assert broken.stats.error_rate() == 1.0
+
+    # 出错的服务商排到后面
+    assert router.rank()[0] is working
+
+
+def test_hedge_cancels_slower_provider():
+    """慢请求对冲到第二个服务商，较慢的一方被取消"""
+    slow = FakeProvider("zhipu", delay=2.0)
+    fast = FakeProvider("openai", delay=0.01)
+    router = LLMRouter([slow, fast], hedge=True, hedge_delay=0.05)
+
+    start = time.monotonic()
+    response = router.complete("hi")
+    assert response.provider == "openai"
+    assert time.monotonic() - start < 1.0
+
+    time.sleep(0.05)
+    assert slow.cancelled
+
+
+def test_circuit_breaker():
+    """连续失败后熔断，超时后只放行一个探测请求"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_all_providers_open():
+    """所有服务商熔断时直接报错"""
+    provider = FakeProvider("zhipu")
+    for _ in range(provider.breaker.failure_threshold):
+        provider.breaker.record_failure()
+    router = LLMRouter([provider], hedge=False)
+    with pytest.raises(LLMRouterError):
+        router.complete("hi")
+    assert provider.calls == 0
+
+
+def test_stream_fails_over_before_first_chunk():
+    """流式调用在产出第一段之前失败时切换服务商"""
+    broken = FakeProvider("zhipu", error=RuntimeError("boom"))
+    working = FakeProvider("siliconflow")
+    router = LLMRouter([broken, working], hedge=False)
+
+    assert "".join(router.stream("hi")) == "from siliconflow"
+    assert broken.breaker._failures == 1
+
+
+def test_astream():
+    """异步流式调用通过线程转发同步流"""
+    import asyncio
+
+    router = LLMRouter([FakeProvider("openai")], hedge=False)
+
+    async def collect():
+        return [chunk async for chunk in router.astream("hi")]
+
+    assert asyncio.run(collect()) == ["from ", "openai"]
+
+
+class FakeHTTPError(Exception):
+    """带响应状态码和响应头的上游错误"""
+
+    def __init__(self, status_code, headers):
+        super().__init__(f"{status_code} Server Error")
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers})()
+
+
+def test_single_provider_waits_retry_after(monkeypatch):
+    """只有一个服务商时，429/503 按服务端的 Retry-After 等待后重试"""
+    import core.llm_router as llm_router
+
+    sleeps = []
+    monkeypatch.setattr(llm_router.time, "sleep", sleeps.append)
+    provider = FakeProvider("siliconflow")
+    errors = [FakeHTTPError(503, {"Retry-After": "7"}), FakeHTTPError(429, {"Retry-After": "2"})]
+    complete = provider.complete
+
+    def flaky(*args):
+        if errors:
+            provider.calls += 1
+            raise errors.pop(0)
+        return complete(*args)
+
+    provider.complete = flaky
+    response = LLMRouter([provider], hedge=False).complete("hi")
+
+    assert response.provider == "siliconflow"
+    assert provider.calls == 3
+    assert 7 <= sleeps[0] < 8 and 2 <= sleeps[1] < 3
@@ -0,0 +1,40 @@
+"""
+CPU 密集任务进程池测试
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.process_pool import ProcessPool
+
+
+def test_runs_in_child_process_and_propagates_errors():
+    """任务在子进程中执行，任务抛出的异常原样抛回调用方"""
+    pool = ProcessPool(1)
+    try:
+        assert pool.run(os.getpid) != os.getpid()
+        with pytest.raises(ValueError):
+            pool.run(int, 'not a number')
+    finally:
+        pool.shutdown()
+
+
+def test_render_worker_does_not_import_core():
+    """渲染子进程只导入纯计算模块，不加载 core 的配置和日志依赖"""
+    import subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "import sys; import render_worker; "
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in ('core', 'pydantic', 'loguru')))"
+    )
+    env = dict(os.environ, PYTHONPATH=root)
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=os.path.join(root, 'youtube-subtitle-downloader', 'app'),
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == '[]'
@@ -0,0 +1,92 @@
+"""
+LLM 限流器测试
+"""
+
+import sys
+import os
+import time
+import types
+from email.utils import formatdate
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.rate_limiter import (
+    BudgetExceededError,
+    MemoryBackend,
+    RateLimit,
+    RateLimiter,
+    backoff_delay,
+    is_rate_limit_error,
+    parse_retry_after,
+    retry_after_from
+)
+
+
+def test_request_bucket_blocks_when_empty():
+    """请求数令牌桶用完后等待超时"""
+    limiter = RateLimiter(
+        backend=MemoryBackend(),
+        limits={"test": RateLimit(requests_per_minute=2, tokens_per_minute=10000)},
+        daily_token_budget=0
+    )
+    limiter.acquire("test", "m", tokens=10)
+    limiter.acquire("test", "m", tokens=10)
+    with pytest.raises(TimeoutError):
+        limiter.acquire("test", "m", tokens=10, timeout=0.1)
+
+
+def test_token_bucket_failure_does_not_consume_requests():
+    """token 不足时不扣减请求数令牌桶"""
+    backend = MemoryBackend()
+    limiter = RateLimiter(
+        backend=backend,
+        limits={"test": RateLimit(requests_per_minute=2, tokens_per_minute=100)},
+        daily_token_budget=0
+    )
+    limiter.acquire("test", "m", tokens=100)
+    with pytest.raises(TimeoutError):
+        limiter.acquire("test", "m", tokens=50, timeout=0.1)
+    tokens, _ = backend._buckets["llm:rl:test:m:req"]
+    assert tokens == pytest.approx(1, abs=0.01)
+
+
+def test_daily_budget():
+    """超过每日预算时拒绝请求"""
+    limiter = RateLimiter(backend=MemoryBackend(), daily_token_budget=1000)
+    limiter.acquire("zhipu", "glm-4", tokens=500)
+    limiter.record_usage(800)
+    with pytest.raises(BudgetExceededError):
+        limiter.acquire("zhipu", "glm-4", tokens=500)
+
+
+def test_backoff_delay():
+    """退避时间不超过上限，并优先使用 Retry-After"""
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=1, cap=8) <= 8
+    assert 5 <= backoff_delay(0, base=1, retry_after="5") <= 6
+    assert is_rate_limit_error(Exception("Error code: 429, rate limit reached"))
+    assert not is_rate_limit_error(Exception("invalid api key"))
+
+
+def test_retry_after_parsing():
+    """Retry-After 支持秒数和 HTTP 日期，只从 429/503 响应中读取"""
+    assert parse_retry_after("12") == 12
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+    future = formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= parse_retry_after(future) <= 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert 25 <= backoff_delay(0, base=1, retry_after=future) <= 31
+
+    class HTTPError(Exception):
+        def __init__(self, status_code):
+            super().__init__(f"{status_code} Server Error")
+            self.response = types.SimpleNamespace(status_code=status_code, headers={"Retry-After": "3"})
+
+    assert retry_after_from(HTTPError(503)) == "3"
+    assert retry_after_from(HTTPError(429)) == "3"
+    assert retry_after_from(HTTPError(500)) is None
+    assert is_rate_limit_error(HTTPError(503))
+    assert not is_rate_limit_error(HTTPError(500))
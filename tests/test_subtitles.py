@@ -0,0 +1,72 @@
+"""
+字幕格式引擎测试
+"""
+
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.subtitles import Segment, convert, detect_format, normalize_segments, parse_subtitles, subtitle_text
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'subtitles')
+
+SRT = (
+    "1\r\n00:00:01,500 --> 00:00:03,250\r\n<i>hello</i>\r\nworld\r\n\r\n"
+    "2\r\n01:01:01,000 --> 01:01:02,000\r\nA &amp; B\r\n"
+)
+
+VTT = (
+    "WEBVTT\nKind: captions\n\nNOTE comment\n\n"
+    "00:01.500 --> 00:03.250 align:start position:0%\nhello<00:00:02.000><c> world</c>\n\n"
+    "cue-2\n01:01:01.000 --> 01:01:02.000\nA & B"
+)
+
+JSON3 = json.dumps({'events': [
+    {'tStartMs': 1500, 'dDurationMs': 1750, 'segs': [{'utf8': 'hello'}, {'utf8': ' world'}]},
+    {'tStartMs': 3000, 'aAppend': 1, 'segs': [{'utf8': '\n'}]},
+    {'tStartMs': 3661000, 'dDurationMs': 1000, 'segs': [{'utf8': 'A & B'}]},
+]})
+
+
+def test_parsers_agree():
+    """SRT、VTT、json3 解析为相同的时间轴；标签、实体、追加事件被清理"""
+    srt = parse_subtitles(SRT)
+    assert srt == [Segment(1.5, 3.25, 'hello\nworld'), Segment(3661.0, 3662.0, 'A & B')]
+    assert [(s.start, s.end) for s in parse_subtitles(VTT)] == [(1.5, 3.25), (3661.0, 3662.0)]
+    assert parse_subtitles(VTT)[0].text == 'hello world'
+    assert parse_subtitles(JSON3) == [Segment(1.5, 3.25, 'hello world'), Segment(3661.0, 3662.0, 'A & B')]
+
+
+def test_round_trip_all_formats():
+    """任意格式互相转换后时间轴和文本保持不变"""
+    original = parse_subtitles(JSON3)
+    for target in ('srt', 'vtt', 'json3', 'bilibili'):
+        output = convert(JSON3, target)
+        assert detect_format(output) == target
+        assert parse_subtitles(output) == original
+
+    assert convert(SRT, 'srt').startswith('1\n00:00:01,500 --> 00:00:03,250\nhello\nworld\n\n')
+    assert parse_subtitles({'body': [{'from': 1.5, 'to': 3.25, 'content': 'hi'}]}) == [Segment(1.5, 3.25, 'hi')]
+    assert parse_subtitles('not a subtitle') == []
+
+
+def test_normalize_rolling_auto_captions():
+    """滚动自动字幕（VTT/json3）去重后文本一致，长度不到原来的一半，时间轴单调"""
+    texts = []
+    for name in ('auto_captions.en.vtt', 'auto_captions.en.json3'):
+        with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+            content = f.read()
+        segments = normalize_segments(parse_subtitles(content))
+        assert len(subtitle_text(content, normalize=True)) * 2 < len(subtitle_text(content))
+        assert segments[0].start == 0.0
+        assert all(a.start <= b.start and a.start < a.end for a, b in zip(segments, segments[1:]))
+        texts.append(' '.join(segment.text for segment in segments))
+        deduped = normalize_segments(parse_subtitles(content), merge_sentences=False)
+        assert ' '.join(segment.text for segment in deduped) == texts[-1]
+    assert texts[0] == texts[1]
+    assert texts[0].startswith("so today we're going to talk about how markets actually work")
+
+    chinese = [Segment(0, 2, '我们今天讨论'), Segment(1, 3, '今天讨论市场趋势。'), Segment(5, 6, 'no no no')]
+    assert normalize_segments(chinese) == [Segment(0, 3, '我们今天讨论市场趋势。'), Segment(5, 6, 'no no no')]
@@ -0,0 +1,48 @@
+"""
+Stale-while-revalidate 缓存测试
+"""
+
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.swr import StaleWhileRevalidate
+
+
+def test_fallback_then_upgrade():
+    """未命中时立即返回降级结果，后台结果写入缓存后返回升级结果"""
+    cache = StaleWhileRevalidate(ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        release.wait(2)
+        return ['ai point']
+
+    assert cache.get('k', lambda: ['local'], refresh) == (['local'], False)
+    # 刷新进行中，不重复提交
+    assert cache.get('k', lambda: ['local'], refresh) == (['local'], False)
+
+    release.set()
+    assert cache.wait('k', timeout=2) == ['ai point']
+    assert cache.get('k', lambda: ['local'], refresh) == (['ai point'], True)
+    assert len(calls) == 1
+
+
+def test_failed_refresh_backs_off():
+    """刷新失败后在 retry_after 内不再重试"""
+    cache = StaleWhileRevalidate(ttl=60, retry_after=60)
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        raise RuntimeError('upstream down')
+
+    cache.get('k', lambda: 'local', refresh)
+    cache.wait('k', timeout=2)
+    assert cache.get('k', lambda: 'local', refresh) == ('local', False)
+    assert cache.peek('k') is None
+    assert len(calls) == 1
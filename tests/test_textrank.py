@@ -0,0 +1,63 @@
+"""
+TextRank 核心观点提取测试
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import textrank
+from utils.textrank import extract_key_points
+
+
+def test_central_sentences_rank_first():
+    """与全文主题相关度最高的句子排在前面，无关句子不入选"""
+    sentences = [
+        "芯片出口管制影响了全球半导体产业链的布局",
+        "半导体产业链正在因为出口管制而重新布局",
+        "全球芯片企业都在调整半导体供应链策略",
+        "今天天气很好我们去公园散步吧",
+        "出口管制让芯片企业加快了国产替代进程",
+    ]
+    points = extract_key_points("。".join(sentences), top_k=3)
+    assert len(points) == 3
+    assert "今天天气很好我们去公园散步吧" not in points
+
+
+def test_mmr_skips_near_duplicates():
+    """MMR 不会同时选出几乎相同的句子"""
+    text = ". ".join([
+        "The federal reserve raised interest rates again this quarter",
+        "The federal reserve raised interest rates again this quarter, analysts said",
+        "Higher interest rates are slowing the housing market",
+        "Housing prices fell as mortgage rates climbed",
+        "Technology stocks rallied despite higher rates",
+    ])
+    points = extract_key_points(text, top_k=2)
+    assert len(points) == 2
+    assert not all("federal reserve" in p for p in points)
+
+
+def test_long_transcript_points_are_distinct_input_sentences(monkeypatch):
+    """一小时量级的字幕返回 top_k 个互不相同、来自原文的观点；超过 MAX_SENTENCES 时抽样后结果同样完整
+
+    耗时见 scripts/benchmarks/bench_textrank.py
+    """
+    words = ["市场", "投资", "风险", "政策", "技术", "创新", "能源", "价格", "利率", "就业"]
+    sentences = [
+        "".join(words[(i * 7 + j * 3) % len(words)] for j in range(8 + i % 5))
+        for i in range(1500)
+    ]
+    text = "。".join(sentences)
+
+    points = extract_key_points(text)
+    assert len(points) == len(set(points)) == 8
+    assert set(points) <= set(sentences)
+    assert extract_key_points(text) == points
+
+    monkeypatch.setattr(textrank, "MAX_SENTENCES", 100)
+    sampled = extract_key_points(text)
+    assert len(sampled) == len(set(sampled)) == 8
+    assert set(sampled) <= set(sentences)
+    assert extract_key_points("") == []
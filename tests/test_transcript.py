@@ -0,0 +1,63 @@
+"""
+紧凑字幕容器测试
+"""
+
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.subtitles import Segment
+from utils.transcript import Transcript, items_default, json_default
+
+
+def test_transcript_views_and_round_trip():
+    """按条访问、拼接和序列化与原始条目一致"""
+    items = [{'start': 0.5, 'duration': 1.5, 'text': 'hello world'}, {'start': 2, 'duration': 1, 'text': ''},
+             {'start': 3, 'duration': 2, 'text': '你好'}]
+    transcript = Transcript.from_items(items)
+
+    assert len(transcript) == 3
+    assert transcript.text == 'hello world  你好'
+    assert transcript[-1] == Segment(3.0, 5.0, '你好')
+    assert list(transcript)[1] == Segment(2.0, 3.0, '')
+    assert transcript.join('\n') == 'hello world\n\n你好'
+    assert transcript.to_items() == items
+    assert Transcript.from_items(transcript).to_items() == items
+
+    restored = Transcript.from_dict(json.loads(json.dumps({'t': transcript}, default=json_default))['t'])
+    assert list(restored) == list(transcript)
+    # 保存的结果文件保持旧的字典列表格式
+    assert json.loads(json.dumps({'t': transcript}, default=items_default))['t'] == items
+
+
+def test_time_index_lookup_and_markers():
+    """点查询、区间截取、分桶、搜索定位，以及与逐条扫描一致的时间标记"""
+    from utils.transcript import TimeIndex
+
+    index = TimeIndex([{'start': 70, 'duration': 5, 'text': 'gamma'}, {'start': 0, 'duration': 5, 'text': 'alpha'},
+                       {'start': 30, 'duration': 5, 'text': 'beta Gamma'}])
+    assert index.locate(-1) is None
+    assert index.transcript[index.locate(32)].text == 'beta Gamma'
+    assert index.span(4, 31) == (0, 2)
+    assert index.span(6, 20) == (1, 1)
+    assert index.clip(4, 31) == Segment(0.0, 35.0, 'alpha beta Gamma')
+    assert index.buckets(60) == [(0.0, 0, 2), (60.0, 2, 3)]
+    assert [hit.start for hit in index.search('gamma')] == [30.0, 70.0]
+    assert index.format_markers(60) == 'alpha beta Gamma \n[01:10] gamma'
+
+
+def test_service_seeks_with_fractional_seconds():
+    """秒数的小数部分参与定位：12.7 秒落在 12.5 秒开始的字幕上，而不是前一条"""
+    from services.youtube_service import TranscriptService, parse_seek_time
+
+    segments = [{'start': 10.0, 'duration': 2.5, 'text': 'first'},
+                {'start': 12.5, 'duration': 2.0, 'text': 'second'},
+                {'start': 14.5, 'duration': 1.0, 'text': 'third'}]
+    assert TranscriptService.segment_at(segments, 12.7)['text'] == 'second'
+    assert TranscriptService.segment_at(segments, '0:12.4')['text'] == 'first'
+    assert TranscriptService.extract_clip(segments, 12.6, 14.4)['text'] == 'second'
+    assert TranscriptService.extract_clip(segments, 12.4, '14.6')['text'] == 'first second third'
+    assert parse_seek_time('1:02:03.5') == 3723.5
+    assert parse_seek_time('41:07') == 2467
@@ -0,0 +1,38 @@
+"""
+流式写出测试
+"""
+
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'youtube-subtitle-downloader', 'app'
+))
+
+from writers import encode_chunks, iter_json, iter_summary_text
+
+
+def test_encode_chunks_bounds_chunk_size():
+    """长正文按切片编码，每块不超过 chunk_size 个字符，拼接后与原文一致"""
+    text = '字幕内容' * 1000
+    chunks = list(encode_chunks(['头部\n', text, '尾部'], chunk_size=256))
+    assert all(len(chunk.decode('utf-8')) <= 256 for chunk in chunks)
+    assert b''.join(chunks).decode('utf-8') == '头部\n' + text + '尾部'
+
+
+def test_iter_json():
+    """JSON 与 json.dumps 的输出一致"""
+    data = {'title': '标题', 'subtitles': [{'from': 1, 'content': '你好'}]}
+    streamed = b''.join(encode_chunks(iter_json(data), chunk_size=8)).decode('utf-8')
+    assert streamed == json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def test_iter_summary_text_layout():
+    """txt 依次包含视频信息、简介、核心观点和字幕正文"""
+    text = ''.join(iter_summary_text('标题', ['作者: x'], 'd' * 600, ['观点一', '观点二'], '正文'))
+    assert text.startswith('=' * 60 + '\n标题\n' + '=' * 60 + '\n\n【视频信息】\n作者: x\n')
+    assert 'd' * 500 + '...\n' in text
+    assert '1. 观点一\n2. 观点二\n' in text
+    assert text.endswith('【字幕内容】\n' + '=' * 60 + '\n\n正文')
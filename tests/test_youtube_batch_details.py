@@ -0,0 +1,131 @@
+"""
+批量视频详情测试（videos.list 分批请求、结果转换、yt-dlp 回退）
+"""
+
+import sys
+import os
+import threading
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.youtube_agent import YouTubeAgent
+from services.youtube_service import VIDEOS_LIST_BATCH_SIZE, YouTubeService
+
+
+class FakeResponse:
+    def __init__(self, status, payload):
+        self.status = status
+        self.payload = payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self.payload
+
+    async def text(self):
+        return 'quotaExceeded'
+
+
+def fake_aiohttp(status=200, items_for=None):
+    """记录每次 videos.list 请求的ID；items_for(ids) 返回该批的 items"""
+    requests = []
+
+    class ClientSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def get(self, url, params=None):
+            ids = params['id'].split(',')
+            requests.append(ids)
+            items = items_for(ids) if items_for else [{'id': v, 'snippet': {'title': v}} for v in ids]
+            return FakeResponse(status, {'items': items})
+
+    module = types.ModuleType('aiohttp')
+    module.ClientSession = ClientSession
+    return module, requests
+
+
+def make_agent(api_key):
+    """不初始化路由和输出目录，只保留批量详情需要的属性"""
+    agent = YouTubeAgent.__new__(YouTubeAgent)
+    agent.youtube_service = YouTubeService(api_key)
+    return agent
+
+
+def test_videos_list_chunked_by_50(monkeypatch):
+    """超过50个ID时按50个一批请求，重复ID只请求一次"""
+    module, requests = fake_aiohttp()
+    monkeypatch.setitem(sys.modules, 'aiohttp', module)
+    agent = make_agent('key')
+    monkeypatch.setattr(agent, '_get_video_details', lambda video_id: pytest.fail('不应回退到 yt-dlp'))
+
+    video_ids = [f'id{i:03d}' for i in range(120)]
+    details = agent._get_videos_details(video_ids + video_ids[:5])
+
+    assert [len(batch) for batch in requests] == [VIDEOS_LIST_BATCH_SIZE, VIDEOS_LIST_BATCH_SIZE, 20]
+    assert sum(requests, []) == video_ids
+    assert set(details) == set(video_ids)
+    assert details['id119']['title'] == 'id119'
+
+
+def test_api_item_mapping_with_missing_statistics(monkeypatch):
+    """ISO 8601 时长转成秒数；没有 statistics（如关闭了计数）时计数为0"""
+    item = {
+        'id': 'abc',
+        'snippet': {
+            'title': '标题',
+            'channelTitle': '频道',
+            'channelId': 'UC123',
+            'publishedAt': '2024-03-05T10:00:00Z',
+            'thumbnails': {'high': {'url': 'https://i.ytimg.com/hq.jpg'}},
+        },
+        'contentDetails': {'duration': 'PT1H2M3S'},
+    }
+    module, _ = fake_aiohttp(items_for=lambda ids: [item])
+    monkeypatch.setitem(sys.modules, 'aiohttp', module)
+
+    details = make_agent('key')._get_videos_details(['abc'])['abc']
+
+    assert details['duration'] == 3723
+    assert (details['view_count'], details['like_count'], details['comment_count']) == (0, 0, 0)
+    assert details['upload_date'] == '20240305'
+    assert details['channel_url'] == 'https://www.youtube.com/channel/UC123'
+    assert details['thumbnail'] == 'https://i.ytimg.com/hq.jpg'
+    assert details['url'] == 'https://www.youtube.com/watch?v=abc'
+
+
+@pytest.mark.parametrize('api_key, status', [('key', 403), (None, 200)])
+def test_falls_back_to_ytdlp_thread_pool(monkeypatch, api_key, status):
+    """API 请求失败或未配置 Key 时，用有界线程池逐个抓取；抓取失败的视频不出现在结果中"""
+    module, _ = fake_aiohttp(status=status)
+    monkeypatch.setitem(sys.modules, 'aiohttp', module)
+    agent = make_agent(api_key)
+    agent.youtube_service.api_key = api_key
+
+    threads, lock = set(), threading.Lock()
+
+    def fetch(video_id):
+        with lock:
+            threads.add(threading.get_ident())
+        if video_id == 'bad':
+            return {'success': False, 'error': 'unavailable'}
+        return {'success': True, 'details': {'video_id': video_id}}
+
+    monkeypatch.setattr(agent, '_get_video_details', fetch)
+    video_ids = ['a', 'b', 'bad', 'c', 'd', 'e']
+
+    details = agent._get_videos_details(video_ids)
+
+    assert sorted(details) == ['a', 'b', 'c', 'd', 'e']
+    assert details['c'] == {'video_id': 'c'}
+    assert len(threads) <= YouTubeAgent.DETAILS_MAX_WORKERS
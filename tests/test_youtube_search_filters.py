@@ -0,0 +1,64 @@
+"""
+YouTube 搜索筛选测试
+"""
+
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.youtube_service import (
+    match_search_filters,
+    parse_duration_text,
+    parse_publish_time,
+    to_rfc3339
+)
+
+
+def test_parse_duration_text():
+    """测试时长解析"""
+    assert parse_duration_text("12:34") == 754
+    assert parse_duration_text("1:02:03") == 3723
+    assert parse_duration_text("PT1H2M3S") == 3723
+    assert parse_duration_text("PT45S") == 45
+    assert parse_duration_text(90) == 90
+    assert parse_duration_text("LIVE") is None
+    assert parse_duration_text("") is None
+
+
+def test_parse_publish_time():
+    """测试发布时间解析"""
+    now = datetime(2024, 6, 1)
+    assert parse_publish_time("2023-05-01", now) == datetime(2023, 5, 1)
+    assert parse_publish_time("20230501", now) == datetime(2023, 5, 1)
+    assert parse_publish_time("2 weeks ago", now) == datetime(2024, 5, 18)
+    assert parse_publish_time("Streamed 3 days ago", now) == datetime(2024, 5, 29)
+    assert parse_publish_time("1个月前", now) == datetime(2024, 5, 2)
+    assert parse_publish_time("5天前", now) == datetime(2024, 5, 27)
+    assert parse_publish_time("unknown", now) is None
+
+
+def test_match_search_filters_duration():
+    """测试时长筛选"""
+    assert match_search_filters({"duration": "3:59"}, video_duration="short")
+    assert not match_search_filters({"duration": "4:00"}, video_duration="short")
+    assert match_search_filters({"duration": "15:00"}, video_duration="medium")
+    assert not match_search_filters({"duration": "15:00"}, video_duration="long")
+    assert match_search_filters({"duration": "1:00:00"}, video_duration="long")
+    # 无法解析的时长保留
+    assert match_search_filters({"duration": ""}, video_duration="long")
+
+
+def test_match_search_filters_published_after():
+    """测试发布日期筛选"""
+    assert match_search_filters({"published": "2024-03-01"}, published_after="2024-01-01")
+    assert not match_search_filters({"published": "2023-03-01"}, published_after="2024-01-01")
+    assert not match_search_filters({"published": "10 years ago"}, published_after="2020-01-01")
+    assert match_search_filters({"published": ""}, published_after="2024-01-01")
+
+
+def test_to_rfc3339():
+    """测试 Data API 日期格式"""
+    assert to_rfc3339("2024-01-01") == "2024-01-01T00:00:00Z"
+    assert to_rfc3339("2024-01-01T08:00:00Z") == "2024-01-01T08:00:00Z"
@@ -0,0 +1,133 @@
+"""
+yt-dlp 实例池测试
+"""
+
+import sys
+import os
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ytdlp_pool import METADATA_PROFILE, YoutubeDLPool, close_all_pools, get_pool, prewarm_profiles
+
+
+class FakeYoutubeDL:
+    """记录创建与关闭次数的 YoutubeDL 替身"""
+    created = 0
+
+    def __init__(self, params):
+        FakeYoutubeDL.created += 1
+        self.params = params
+        self.closed = False
+
+    def get_info_extractor(self, name):
+        return None
+
+    def extract_info(self, url, download=True):
+        return {"url": url, "download": download}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_yt_dlp(monkeypatch):
+    module = types.ModuleType("yt_dlp")
+    module.YoutubeDL = FakeYoutubeDL
+    utils = types.ModuleType("yt_dlp.utils")
+    utils.YoutubeDLError = type("YoutubeDLError", (Exception,), {})
+    utils.DownloadError = type("DownloadError", (utils.YoutubeDLError,), {})
+    utils.ExtractorError = type("ExtractorError", (utils.YoutubeDLError,), {})
+    module.utils = utils
+    monkeypatch.setitem(sys.modules, "yt_dlp", module)
+    monkeypatch.setitem(sys.modules, "yt_dlp.utils", utils)
+    FakeYoutubeDL.created = 0
+    return module
+
+
+def test_borrow_reuses_instance(fake_yt_dlp):
+    """测试实例被复用"""
+    pool = YoutubeDLPool({"quiet": True}, size=2, max_uses=10, max_age=60)
+    with pool.borrow() as first:
+        pass
+    with pool.borrow() as second:
+        pass
+    assert first is second
+    assert FakeYoutubeDL.created == 1
+    assert pool.extract_info("u") == {"url": "u", "download": False}
+
+
+def test_recycle_after_max_uses(fake_yt_dlp):
+    """测试达到最大使用次数后回收"""
+    pool = YoutubeDLPool({"quiet": True}, size=1, max_uses=2, max_age=60)
+    with pool.borrow() as first:
+        pass
+    with pool.borrow():
+        pass
+    with pool.borrow() as third:
+        pass
+    assert first.closed
+    assert third is not first
+
+
+def test_unhealthy_instance_discarded(fake_yt_dlp):
+    """yt-dlp 内部错误或网络错误后实例被丢弃；视频级错误和调用方代码的异常保留实例"""
+    pool = YoutubeDLPool({"quiet": True}, size=1, max_uses=10, max_age=60)
+    with pytest.raises(fake_yt_dlp.utils.DownloadError):
+        with pool.borrow() as first:
+            raise fake_yt_dlp.utils.DownloadError("video unavailable")
+    with pool.borrow() as second:
+        pass
+    assert second is first
+
+    with pytest.raises(KeyError):
+        with pool.borrow() as ydl:
+            {}["formats"]
+    assert ydl is first and not first.closed
+
+    for error in (fake_yt_dlp.utils.YoutubeDLError("broken"), ConnectionResetError("reset")):
+        with pool.borrow() as current:
+            pass
+        with pytest.raises(type(error)):
+            with pool.borrow():
+                raise error
+        assert current.closed
+    with pool.borrow() as last:
+        pass
+    assert not last.closed
+
+
+def test_prewarm_profiles_fills_pool(fake_yt_dlp):
+    """预热后借用不再创建新实例"""
+    close_all_pools()
+    try:
+        prewarm_profiles(METADATA_PROFILE, count=2)
+        assert FakeYoutubeDL.created == 2
+        pool = get_pool(METADATA_PROFILE.options)
+        with pool.borrow(), pool.borrow():
+            pass
+        assert FakeYoutubeDL.created == 2
+    finally:
+        close_all_pools()
+
+
+def test_pool_map_is_bounded(fake_yt_dlp, monkeypatch):
+    """参数组合超过 MAX_POOLS 时关闭最久未使用的池，之后归还到该池的实例直接关闭"""
+    import services.ytdlp_pool as ytdlp_pool
+
+    close_all_pools()
+    monkeypatch.setattr(ytdlp_pool, "MAX_POOLS", 2)
+    try:
+        first = get_pool({"n": 1})
+        with first.borrow() as borrowed:
+            second = get_pool({"n": 2})
+            # 最近使用过的池保留，淘汰 second
+            assert get_pool({"n": 1}) is first
+            get_pool({"n": 3})
+            assert get_pool({"n": 2}) is not second
+            assert len(ytdlp_pool._pools) == 2 and first not in ytdlp_pool._pools.values()
+        assert borrowed.closed
+    finally:
+        close_all_pools()
@@ -0,0 +1,181 @@
+"""
+接口准入控制（负载削减）
+限制同时处理的请求数，超出时最多让少量请求短暂排队，队列已满或等待超时立即拒绝并给出建议的重试间隔；
+避免突发流量同时发起几十个 yt-dlp 抓取和 LLM 请求，把所有 worker 线程都卡在上游上。
+状态在进程内，多个 gunicorn worker 各自计数
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# 建议重试间隔的上下限（秒）
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+# 平均处理时长的平滑系数
+EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """并发已满且排队已满或等待超时"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} 繁忙，{retry_after} 秒后重试")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class _HeldIterator:
+    """迭代结束、出错或被关闭时归还名额的迭代器包装"""
+
+    def __init__(self, limiter: "AdmissionLimiter", iterable: Iterable[Any], started: float):
+        self._limiter = limiter
+        self._iterable = iterable
+        self._iterator = iter(iterable)
+        self._started = started
+        self._released = False
+
+    def __iter__(self) -> "_HeldIterator":
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        try:
+            close = getattr(self._iterable, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._limiter.release(time.monotonic() - self._started)
+
+
+class AdmissionLimiter:
+    """
+    最大并发数 + 有界等待队列
+
+    max_in_flight <= 0 时不限制
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int = 0,
+        queue_timeout: float = 1.0,
+        name: str = "default",
+        default_retry_after: float = 5.0
+    ):
+        """
+        Args:
+            max_in_flight: 同时处理的最大请求数
+            max_queue: 并发已满时最多等待的请求数，超出的立即拒绝
+            queue_timeout: 排队请求最长等待秒数
+            name: 名称，用于错误信息和统计
+            default_retry_after: 还没有处理时长样本时，估算重试间隔用的单次处理秒数
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.name = name
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._avg_seconds = default_retry_after
+
+    def retry_after(self) -> int:
+        """按平均处理时长和排在前面的请求数估算多久后有空位"""
+        ahead = self._waiting + 1
+        seconds = self._avg_seconds * ahead / max(self.max_in_flight, 1)
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(seconds)))
+
+    def _reject(self) -> Overloaded:
+        self._rejected += 1
+        return Overloaded(self.name, self.retry_after())
+
+    def acquire(self) -> None:
+        """
+        获取一个处理名额，必要时排队等待
+
+        Raises:
+            Overloaded: 排队已满或等待超过 queue_timeout
+        """
+        if self.max_in_flight <= 0:
+            return
+        with self._cond:
+            if self._in_flight < self.max_in_flight and self._waiting == 0:
+                self._in_flight += 1
+                self._admitted += 1
+                return
+            if self._waiting >= self.max_queue:
+                raise self._reject()
+
+            self._waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject()
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+            self._admitted += 1
+
+    def release(self, elapsed: float = None) -> None:
+        """
+        归还名额
+
+        Args:
+            elapsed: 本次处理耗时（秒），用于估算重试间隔
+        """
+        if self.max_in_flight <= 0:
+            return
+        with self._cond:
+            self._in_flight -= 1
+            if elapsed is not None:
+                self._avg_seconds += EWMA_ALPHA * (elapsed - self._avg_seconds)
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """with limiter.slot(): ... 在名额内执行，结束（含异常）后归还"""
+        self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def hold(self, iterable: Iterable[Any], started: Optional[float] = None) -> Iterator[Any]:
+        """
+        把已获得的名额交给流式内容：迭代结束、出错或 close() 时才归还
+
+        用于响应体在返回之后才生成的流式响应（SSE、分块下载）；
+        WSGI 服务器在发送完毕或客户端断开时会调用 close()
+
+        Args:
+            iterable: 响应体
+            started: acquire 成功的时间（time.monotonic），用于统计处理时长
+        """
+        return _HeldIterator(self, iterable, time.monotonic() if started is None else started)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+            }
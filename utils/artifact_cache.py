@@ -0,0 +1,285 @@
+"""
+渲染产物磁盘缓存
+把生成好的下载文件（txt/srt/docx/json）按请求参数存到磁盘，命中时直接返回文件；
+总大小超过预算时按最近最少使用淘汰，并把并发的相同请求合并为一次构建
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Union
+
+from utils.logger import logger
+from utils.staged_file import StagedFile, read_chunks, stage_file
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# 超过该时长的 .tmp 文件视为遗留，启动时清理
+STALE_TMP_SECONDS = 3600
+
+
+class Artifact(NamedTuple):
+    """一个已缓存的产物"""
+    key: str
+    path: str
+    etag: str
+    size: int
+    meta: Dict[str, Any]
+
+
+class _Build:
+    """进行中的构建，供合并进来的请求等待"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.artifact: Optional[Artifact] = None
+        self.error: Optional[BaseException] = None
+
+
+def make_key(**params: Any) -> str:
+    """按请求参数生成缓存键，参数顺序不影响结果"""
+    raw = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ArtifactCache:
+    """
+    磁盘 LRU 产物缓存
+
+    每个产物存为 <key>.bin（内容）和 <key>.json（元数据），写入先落到临时文件再原子替换。
+    状态全部在目录中：.bin 的修改时间即 LRU 顺序（命中时刷新），总大小按目录扫描计算，
+    多个进程（gunicorn 的各个 worker）共享同一目录时看到的是同一份缓存；
+    同一个 key 的构建用 <key>.lock 文件锁在进程间合并
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024, max_age: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._builds: Dict[str, _Build] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._sweep()
+        self._evict()
+
+    def _paths(self, key: str) -> tuple:
+        base = os.path.join(self.directory, key)
+        return base + '.bin', base + '.json'
+
+    def _sweep(self) -> None:
+        """
+        清理进程崩溃遗留的临时文件（写入中途、子进程渲染的结果）
+
+        .lock 文件不清理：锁可能仍被其他 worker 持有（构建时间与修改时间无关），
+        删除后新来的进程会在新文件上加锁，两个进程同时构建同一个 key
+        """
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def _scan(self) -> list:
+        """扫描目录中的产物，返回按修改时间从旧到新排列的 (mtime, key, 大小)"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.bin'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                # 已被其他进程淘汰
+                continue
+            entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        entries.sort()
+        return entries
+
+    @contextmanager
+    def _file_lock(self, key: str) -> Iterator[None]:
+        """进程间互斥地构建同一个 key；没有 fcntl 的平台只在进程内合并"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, key + '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, key: str) -> Optional[Artifact]:
+        """
+        读取缓存
+
+        Args:
+            key: make_key 生成的缓存键
+
+        Returns:
+            命中且未过期时返回 Artifact，否则返回 None
+        """
+        data_path, meta_path = self._paths(key)
+        if not os.path.exists(data_path):
+            return None
+        try:
+            if time.time() - os.path.getmtime(meta_path) > self.max_age:
+                self.delete(key)
+                return None
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            etag = meta.pop('etag', None) if isinstance(meta, dict) else None
+            if etag is None:
+                raise ValueError(f"缺少 etag: {meta_path}")
+            size = os.path.getsize(data_path)
+            now = time.time()
+            os.utime(data_path, (now, now))
+        except (OSError, ValueError):
+            # 文件被外部删除或元数据损坏
+            self.delete(key)
+            return None
+        return Artifact(key, data_path, etag, size, meta)
+
+    def put(self, key: str, content: Union[bytes, StagedFile, Iterable[bytes]], **meta: Any) -> Artifact:
+        """
+        写入产物
+
+        Args:
+            key: 缓存键
+            content: 文件内容；已渲染到磁盘的 StagedFile（同一文件系统时直接改名移入）；
+                或按块产出内容的可迭代对象（逐块写盘，不在内存中拼接）
+            **meta: 需要随产物保存的元数据（须可 JSON 序列化）
+
+        Returns:
+            写入后的 Artifact
+        """
+        data_path, meta_path = self._paths(key)
+        suffix = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        if isinstance(content, StagedFile):
+            etag, size = self._move_staged(content, data_path + suffix)
+        else:
+            etag, size = self._write(content, data_path + suffix)
+        with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+            json.dump({**meta, 'etag': etag}, f, ensure_ascii=False)
+        # 元数据先就位，保证看到 .bin 的读者一定能读到 .json
+        os.replace(meta_path + suffix, meta_path)
+        os.replace(data_path + suffix, data_path)
+        # 显式设置修改时间，与 get 刷新时使用同一时钟，避免文件系统时间戳精度影响 LRU 顺序
+        now = time.time()
+        os.utime(data_path, (now, now))
+        self._evict()
+        return Artifact(key, data_path, etag, size, dict(meta))
+
+    @staticmethod
+    def _write(content: Union[bytes, Iterable[bytes]], path: str) -> tuple:
+        """逐块写入临时文件，返回 (etag, 大小)"""
+        if isinstance(content, bytes):
+            content = (content,)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(path, 'wb') as f:
+                for chunk in content:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return digest.hexdigest()[:32], size
+
+    def _move_staged(self, staged: StagedFile, path: str) -> tuple:
+        """改名移入已渲染的文件；跨文件系统时退回复制"""
+        try:
+            os.replace(staged.path, path)
+        except OSError:
+            etag, size = self._write(read_chunks(staged.path), path)
+            os.remove(staged.path)
+            return etag, size
+        return staged.sha256[:32], staged.size
+
+    def get_or_build(
+        self,
+        key: str,
+        build: Callable[[], tuple],
+        is_fresh: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Artifact:
+        """
+        命中时直接返回，否则构建并写入；同一个 key 的并发请求只构建一次
+
+        Args:
+            key: 缓存键
+            build: 返回 (内容, 元数据 dict)，内容可以是 bytes 或 bytes 块的迭代器；
+                抛出的异常会传给所有等待的请求，不写入缓存
+            is_fresh: 根据元数据判断缓存是否仍可用，返回 False 时重新构建
+
+        Returns:
+            Artifact
+        """
+        artifact = self.get(key)
+        if artifact is not None and (is_fresh is None or is_fresh(artifact.meta)):
+            return artifact
+
+        with self._lock:
+            pending = self._builds.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._builds[key] = _Build()
+
+        if not leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.artifact
+
+        try:
+            with self._file_lock(key):
+                # 等锁期间其他进程可能已构建好
+                artifact = self.get(key)
+                if artifact is None or (is_fresh is not None and not is_fresh(artifact.meta)):
+                    content, meta = build()
+                    artifact = self.put(key, content, **meta)
+            pending.artifact = artifact
+            return artifact
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._builds.pop(key, None)
+            pending.done.set()
+
+    def delete(self, key: str) -> None:
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        """目录中产物总大小超出预算时删除最久未使用的产物，至少保留最新的一个"""
+        entries = self._scan()
+        total = sum(size for _, _, size in entries)
+        for _, key, size in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            logger.debug(f"淘汰缓存产物 {key} ({size} bytes)")
+            self.delete(key)
+            total -= size
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for _, _, size in self._scan())
+
+    def __len__(self) -> int:
+        return len(self._scan())
@@ -0,0 +1,190 @@
+"""
+Word 导出引擎
+字体、缩进、段距设置在模板的段落样式上（含东亚字体 w:eastAsia），正文段落只引用样式；
+正文按整段 XML 一次解析后批量插入，代替逐段 add_paragraph + 逐 run 设置字体。
+模板按样式参数构建一次后缓存为字节，每次导出从字节加载
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, Optional
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.document import Document as DocumentObject
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.shared import Pt, RGBColor
+
+# 正文段落样式名（样式 ID 为去掉空格后的名字）
+BODY_STYLE = 'Transcript Body'
+
+# XML 1.0 不允许的控制字符
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_TAB = '</w:t><w:tab/><w:t xml:space="preserve">'
+_BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+
+
+@lru_cache(maxsize=8)
+def _template(
+    font_name: Optional[str],
+    east_asia_font: Optional[str],
+    font_size: Optional[float],
+    first_line_indent: Optional[float],
+    space_after: Optional[float]
+) -> bytes:
+    doc = Document()
+    style = doc.styles.add_style(BODY_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+    style.base_style = doc.styles['Normal']
+    if font_name:
+        style.font.name = font_name
+    if font_size:
+        style.font.size = Pt(font_size)
+    if east_asia_font:
+        style.element.get_or_add_rPr().get_or_add_rFonts().set(qn('w:eastAsia'), east_asia_font)
+    if first_line_indent is not None:
+        style.paragraph_format.first_line_indent = Pt(first_line_indent)
+    if space_after is not None:
+        style.paragraph_format.space_after = Pt(space_after)
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def new_document(
+    font_name: Optional[str] = None,
+    east_asia_font: Optional[str] = None,
+    font_size: Optional[float] = None,
+    first_line_indent: Optional[float] = None,
+    space_after: Optional[float] = None
+) -> DocumentObject:
+    """
+    从缓存的模板创建文档
+
+    Args:
+        font_name: 正文样式的西文字体
+        east_asia_font: 正文样式的东亚字体
+        font_size: 正文字号（磅）
+        first_line_indent: 首行缩进（磅）
+        space_after: 段后距（磅）
+
+    Returns:
+        python-docx Document，包含 BODY_STYLE 段落样式；参数都为空时正文样式与 Normal 相同
+    """
+    return Document(BytesIO(_template(font_name, east_asia_font, font_size, first_line_indent, space_after)))
+
+
+def append_paragraphs(doc: DocumentObject, lines: Iterable[str], style: Optional[str] = BODY_STYLE) -> int:
+    """
+    批量追加正文段落，跳过空行
+
+    Args:
+        doc: 文档
+        lines: 每段的文本
+        style: 段落样式名；None 为 Normal
+
+    Returns:
+        追加的段落数
+    """
+    style_id = doc.styles[style].style_id if style else None
+    opening = f'<w:p><w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>' if style_id else '<w:p>'
+    parts = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            # 与 add_run 一致，制表符和段内换行写成 w:tab / w:br
+            text = escape(_INVALID_XML_CHARS.sub('', line)).replace('\t', _TAB).replace('\n', _BREAK)
+            parts.append(f'{opening}<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>')
+    if not parts:
+        return 0
+
+    container = parse_xml(f'<w:body {nsdecls("w")}>{"".join(parts)}</w:body>')
+    body = doc.element.body
+    sect_pr = body.sectPr
+    if sect_pr is not None:
+        for paragraph in list(container):
+            sect_pr.addprevious(paragraph)
+    else:
+        body.extend(list(container))
+    return len(parts)
+
+
+def write_transcript_document(
+    video_data: Dict[str, Any],
+    output_path: str,
+    language: str,
+    sentence_break: Optional[Callable[[str], str]] = None
+) -> str:
+    """
+    脚本使用的字幕 Word 文档：标题、语言、视频信息表、描述、分页后的完整字幕
+
+    Args:
+        video_data: 视频数据（title/channel/view_count/like_count/duration/url/description/transcript）
+        output_path: 输出路径
+        language: 字幕语言，"中文" 时正文用宋体，否则用 Times New Roman
+        sentence_break: 断句函数，断句后按空行分段；默认不处理
+
+    Returns:
+        输出路径
+    """
+    if language == "中文":
+        doc = new_document('SimSun', 'SimSun', 12, first_line_indent=20, space_after=8)
+    else:
+        doc = new_document('Times New Roman', None, 12, first_line_indent=20, space_after=8)
+
+    title = video_data.get('title', 'Untitled')
+
+    doc_title = doc.add_heading(f'【{language}】{title}', 0)
+    doc_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    lang_para = doc.add_paragraph()
+    lang_run = lang_para.add_run(f'字幕语言: {language}')
+    lang_run.bold = True
+    lang_run.font.color.rgb = RGBColor(0, 102, 204)
+    lang_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.add_paragraph('')
+
+    info_table = doc.add_table(rows=6, cols=2)
+    info_table.style = 'Table Grid'
+
+    view_count, duration = video_data.get('view_count'), video_data.get('duration')
+    info_data = [
+        ('频道', video_data.get('channel', 'N/A')),
+        ('播放量', f"{view_count:,}" if isinstance(view_count, int) else str(video_data.get('view_count', 'N/A'))),
+        ('点赞数', f"{video_data.get('like_count', 0):,}" if video_data.get('like_count') else 'N/A'),
+        ('时长', f"{duration} 秒" if isinstance(duration, int) else str(video_data.get('duration', 'N/A'))),
+        ('链接', video_data.get('url', 'N/A')),
+        ('分析日期', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    ]
+
+    for i, (label, value) in enumerate(info_data):
+        row = info_table.rows[i]
+        row.cells[0].text = label
+        row.cells[1].text = str(value)
+
+    doc.add_paragraph('')
+    doc.add_heading('视频描述', level=1)
+    description = video_data.get('description', '无描述')
+    doc.add_paragraph(description[:1000] if len(description) > 1000 else description)
+
+    transcript = video_data.get('transcript', '')
+    if transcript:
+        doc.add_page_break()
+        doc.add_heading(f'完整字幕 ({language})', level=1)
+
+        processed_text = sentence_break(transcript) if sentence_break else transcript
+        append_paragraphs(doc, processed_text.split('\n\n'))
+
+        doc.add_paragraph('')
+        p = doc.add_paragraph()
+        run = p.add_run(f'字幕总长度: {len(transcript):,} 字符 | 语言: {language}')
+        run.italic = True
+        run.font.color.rgb = RGBColor(128, 128, 128)
+
+    doc.save(output_path)
+    return output_path
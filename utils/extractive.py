@@ -0,0 +1,196 @@
+"""
+抽取式预筛选
+在整段字幕中为句子打分，按 token 预算选出信息量最高的句子并保持原文顺序，
+用于缩短发给 LLM 的提示词，同时覆盖整个视频而不只是开头几分钟
+"""
+
+import re
+from collections import Counter
+from typing import List
+
+from utils.tokens import estimate_tokens
+
+# 信息量高的提示词
+HIGH_VALUE_WORDS = [
+    '关键', '重要', '核心', '主要', '原因', '因为', '结论', '所以', '因此',
+    '认为', '预测', '估计', '分析', '显示', '表明', '趋势', '未来', '必须',
+    'important', 'key', 'because', 'therefore', 'conclusion', 'result',
+    'means', 'shows', 'believe', 'predict', 'future', 'must',
+]
+
+# 口头语/填充词
+FILLER_WORDS = [
+    '嗯', '啊', '呃', '这个', '那个', '就是说', '好吧', '是的', '对吧', '然后',
+    'um', 'uh', 'you know', 'i mean', 'like', 'okay', 'so', 'yeah',
+]
+
+ENGLISH_STOPWORDS = frozenset("""
+a an the and or but if then so of to in on at by for with from as is are was were be been
+being it its this that these those i you he she we they me him her us them my your our their
+do does did have has had not no yes just very can will would should could what which who
+whom when where why how all any some there here about into over than too also only out up
+""".split())
+
+_SENTENCE_SPLIT = re.compile(r'[。！？!?\n]+|(?<=[a-z0-9])[.;]\s+', re.IGNORECASE)
+_CJK = re.compile(r'[一-鿿]+')
+_WORD = re.compile(r"[a-z][a-z'\-]+|\d+(?:\.\d+)?", re.IGNORECASE)
+_DIGIT = re.compile(r'\d')
+_NORMALIZE = re.compile(r'[\s，,。.！!？?、；;：:“”"\'‘’()（）\-]+')
+_FILLER_PREFIX = re.compile(
+    r'^(?:' + '|'.join(
+        re.escape(word) + (r'\b' if word.isascii() else '')
+        for word in sorted(FILLER_WORDS, key=len, reverse=True)
+    ) + r')[\s，,]*',
+    re.IGNORECASE
+)
+
+
+def split_sentences(text: str, max_length: int = 60, min_part: int = 12) -> List[str]:
+    """
+    断句，过长的句子按逗号拆分
+
+    Args:
+        text: 原文
+        max_length: 超过该长度的句子按逗号拆分
+        min_part: 拆分后保留的最短片段
+
+    Returns:
+        句子列表（原文顺序）
+    """
+    sentences = []
+    for sent in _SENTENCE_SPLIT.split(text):
+        sent = sent.strip()
+        if len(sent) < 6:
+            continue
+        if len(sent) > max_length and ('，' in sent or ', ' in sent):
+            parts = [p.strip() for p in re.split(r'，|, ', sent)]
+            sentences.extend(p for p in parts if len(p) >= min_part)
+        else:
+            sentences.append(sent)
+    return sentences
+
+
+def tokenize(sentence: str) -> List[str]:
+    """中文取相邻二字组，英文取去停用词后的小写单词"""
+    tokens = []
+    for run in _CJK.findall(sentence):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    for word in _WORD.findall(sentence):
+        word = word.lower()
+        if word not in ENGLISH_STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+
+def strip_filler(sentence: str) -> str:
+    """去掉句首的口头语"""
+    return _FILLER_PREFIX.sub('', sentence.strip(), count=1)
+
+
+def score_sentences(sentences: List[str]) -> List[float]:
+    """
+    为每个句子打分
+
+    综合长度、高价值词、句首口头语、数字、位置（开头和结尾）以及
+    句中词语在全文中的出现频率（反映是否属于视频主题）
+
+    Args:
+        sentences: 句子列表
+
+    Returns:
+        与 sentences 等长的分数列表
+    """
+    token_lists = [tokenize(sent) for sent in sentences]
+    doc_freq = Counter(token for tokens in token_lists for token in set(tokens))
+    total = len(sentences)
+    scores = []
+
+    for i, (sent, tokens) in enumerate(zip(sentences, token_lists)):
+        score = 0.0
+        length = len(sent)
+        lowered = sent.lower()
+
+        if 15 <= length <= 70:
+            score += 2
+        if length > 100:
+            score -= 1
+
+        score += 2 * sum(1 for word in HIGH_VALUE_WORDS if word in lowered)
+
+        if strip_filler(sent) != sent.strip():
+            score -= 2
+
+        if _DIGIT.search(sent):
+            score += 1
+
+        if i < 5:
+            score += 2
+        if i > total * 0.8:
+            score += 2
+
+        # 主题词：在多个句子中反复出现但不是到处都有的词
+        if tokens:
+            topical = [doc_freq[t] for t in set(tokens) if 1 < doc_freq[t] < total * 0.5]
+            score += 3 * len(topical) / len(set(tokens))
+
+        scores.append(score)
+    return scores
+
+
+def dedupe_sentences(sentences: List[str]) -> List[str]:
+    """去掉重复句子（自动字幕的滚动片段），保留首次出现的位置"""
+    seen = set()
+    unique = []
+    for sent in sentences:
+        key = _NORMALIZE.sub('', sent.lower())
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        unique.append(sent)
+    return unique
+
+
+def select_sentences(
+    text: str,
+    token_budget: int = 2500,
+    max_sentences: int = 0
+) -> str:
+    """
+    按 token 预算选出信息量最高的句子，按原文顺序拼接
+
+    全文没有超出预算时原样返回
+
+    Args:
+        text: 字幕全文
+        token_budget: 返回文本的 token 上限
+        max_sentences: 最多选出的句子数，0 表示不限
+
+    Returns:
+        预筛选后的文本，每句一行
+    """
+    if not text or estimate_tokens(text) <= token_budget:
+        return text
+
+    sentences = dedupe_sentences(split_sentences(text))
+    if not sentences:
+        return text[:token_budget]
+
+    scores = score_sentences(sentences)
+    ranked = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+
+    chosen = []
+    used = 0
+    for i in ranked:
+        cost = estimate_tokens(sentences[i])
+        if used + cost > token_budget:
+            continue
+        chosen.append(i)
+        used += cost
+        if max_sentences and len(chosen) >= max_sentences:
+            break
+
+    chosen.sort()
+    return '\n'.join(strip_filler(sentences[i]) for i in chosen)
@@ -0,0 +1,84 @@
+"""
+CPU 密集任务进程池
+docx 渲染、TextRank、正则断句等纯 Python 计算持有 GIL，放在请求线程里会让并发请求在 CPU 上排队；
+交给子进程执行后，请求进程的线程只等待结果，I/O 型请求不受影响，多核时渲染也能并行。
+子进程用 spawn 启动，initializer 预先导入依赖（如 python-docx）；大结果由子进程写到文件，只回传路径
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from utils.logger import logger
+
+
+def _noop() -> None:
+    pass
+
+
+class ProcessPool:
+    """
+    懒启动的进程池
+
+    子进程意外退出导致进程池损坏时重建进程池，本次任务退回到当前进程执行
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        initializer: Optional[Callable[[], None]] = None,
+        max_tasks_per_child: Optional[int] = None,
+        name: str = "cpu"
+    ):
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.max_tasks_per_child = max_tasks_per_child
+        self.name = name
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                options = {}
+                if self.max_tasks_per_child:
+                    # Python 3.11+：子进程执行一定数量的任务后替换，限制内存增长
+                    options['max_tasks_per_child'] = self.max_tasks_per_child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=self.initializer,
+                    **options
+                )
+            return self._executor
+
+    def start(self) -> None:
+        """预先启动全部子进程，避免第一个请求承担进程启动和导入的开销"""
+        executor = self._get_executor()
+        for future in [executor.submit(_noop) for _ in range(self.max_workers)]:
+            future.result()
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        在子进程中执行 fn(*args) 并等待结果
+
+        fn 和参数须可 pickle（模块级函数）；fn 抛出的异常原样抛出
+        """
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            logger.warning(f"进程池 {self.name} 已损坏，重建后在当前进程执行 {fn.__name__}")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            return fn(*args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,50 @@
+"""
+已渲染到磁盘的文件
+子进程把渲染结果写到临时文件，只把路径、大小和摘要传回请求进程，由产物缓存改名移入或直接流式返回。
+不依赖配置和日志模块，可在渲染子进程中导入
+"""
+
+import hashlib
+import os
+from typing import Iterator, NamedTuple
+
+
+class StagedFile(NamedTuple):
+    """已渲染到磁盘的内容（如子进程生成的 docx），写入缓存时直接改名移入，不再读进内存"""
+    path: str
+    size: int
+    sha256: str
+
+
+def stage_file(path: str) -> StagedFile:
+    """计算已写好的文件的大小和摘要"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in read_chunks(path):
+        digest.update(chunk)
+        size += len(chunk)
+    return StagedFile(path, size, digest.hexdigest())
+
+
+def read_chunks(path: str, chunk_size: int = 64 * 1024, remove: bool = False) -> Iterator[bytes]:
+    """
+    按块读取文件
+
+    Args:
+        path: 文件路径
+        chunk_size: 每块字节数
+        remove: 读完（或中途放弃）后删除文件，用于流式返回临时文件
+    """
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if remove:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
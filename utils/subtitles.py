@@ -0,0 +1,462 @@
+"""
+字幕格式引擎
+json3 / SRT / WebVTT / B站 body / youtube-transcript-api 条目统一解析为 Segment 序列，
+再由各格式的生成器输出，任意输入格式一次线性扫描即可转换为任意输出格式
+"""
+
+import html
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+
+class Segment(NamedTuple):
+    """一条字幕，时间单位为秒"""
+    start: float
+    end: float
+    text: str
+
+
+# SRT 与 WebVTT 共用的时间轴行：小时可省略（VTT），毫秒分隔符为 , 或 .
+_CUE = re.compile(
+    r'(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})[ \t]*-->[ \t]*'
+    r'(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})[^\n]*\n'
+    r'(.*?)(?:\n[ \t]*\n|\Z)',
+    re.DOTALL
+)
+_TIMESTAMP = re.compile(r'(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})')
+_TAG = re.compile(r'<[^>]*>')
+_TIMING_SEPARATORS = str.maketrans('', '', ':,.-> \t')
+
+
+def _seconds(hours: Optional[str], minutes: str, secs: str, millis: str) -> float:
+    total = int(minutes) * 60000 + int(secs) * 1000 + int(millis.ljust(3, '0'))
+    if hours:
+        total += int(hours) * 3600000
+    return total / 1000
+
+
+def _parse_timestamp(stamp: str) -> Optional[float]:
+    """单个时间戳，HH:MM:SS,mmm 定长格式按位置切片，其他写法（VTT 省略小时等）走正则"""
+    if len(stamp) == 12 and stamp[2] == ':' and stamp[5] == ':':
+        return (int(stamp[:2]) * 3600000 + int(stamp[3:5]) * 60000
+                + int(stamp[6:8]) * 1000 + int(stamp[9:])) / 1000
+    match = _TIMESTAMP.match(stamp)
+    return _seconds(*match.groups()) if match else None
+
+
+def _clean(text: str) -> str:
+    """去掉 <i>、<c>、<00:00:01.000> 等标签并反转义 HTML 实体"""
+    if '<' in text:
+        text = _TAG.sub('', text)
+    if '&' in text:
+        text = html.unescape(text)
+    return text.strip()
+
+
+def _iter_cue_blocks(content: str) -> Iterator[tuple]:
+    """按空行切块，产出 (时间轴行起点, 箭头位置, 时间轴行终点, 块)；序号、WEBVTT 头、NOTE 块没有箭头，直接跳过"""
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    for block in content.split('\n\n'):
+        arrow = block.find('-->')
+        if arrow < 0:
+            continue
+        line_end = block.find('\n', arrow)
+        if line_end < 0:
+            continue
+        yield block.rfind('\n', 0, arrow) + 1, arrow, line_end, block
+
+
+def parse_cues(content: str) -> List[Segment]:
+    """
+    解析 SRT 或 WebVTT
+
+    按空行切块后在块内定位时间轴行，标准时间轴行整体转成整数解析；
+    块内有多条字幕（空行里带空格等不规范文件）时退回正则
+
+    Args:
+        content: SRT/VTT 文本
+
+    Returns:
+        字幕列表
+    """
+    segments = []
+    append = segments.append
+    for line_start, arrow, line_end, block in _iter_cue_blocks(content):
+        if block.find('-->', line_end) >= 0:
+            for h1, m1, s1, ms1, h2, m2, s2, ms2, text in _CUE.findall(block[line_start:]):
+                text = _clean(text)
+                if text:
+                    append(Segment(_seconds(h1, m1, s1, ms1), _seconds(h2, m2, s2, ms2), text))
+            continue
+        text = block[line_end + 1:]
+        if '<' in text or '&' in text:
+            text = _clean(text)
+        else:
+            text = text.strip()
+        if not text:
+            continue
+        # 标准的 "HH:MM:SS,mmm --> HH:MM:SS,mmm" 去掉分隔符后是18位数字，一次 int() 解析两个时间戳
+        digits = block[line_start:line_end].translate(_TIMING_SEPARATORS)
+        if len(digits) == 18 and digits.isdigit():
+            value = int(digits)
+            a, b = value // 1000000000, value % 1000000000
+            append(Segment(
+                (a // 10000000 * 3600000 + a // 100000 % 100 * 60000 + a // 1000 % 100 * 1000 + a % 1000) / 1000,
+                (b // 10000000 * 3600000 + b // 100000 % 100 * 60000 + b // 1000 % 100 * 1000 + b % 1000) / 1000,
+                text
+            ))
+            continue
+        start = _parse_timestamp(block[line_start:arrow].strip())
+        # VTT 的结束时间后面可能跟着 align:start 等设置
+        end = _parse_timestamp(block[arrow + 3:line_end].strip().split(' ', 1)[0])
+        if start is not None and end is not None:
+            append(Segment(start, end, text))
+    return segments
+
+
+def cue_texts(content: str) -> List[str]:
+    """只取 SRT/VTT 的文本，不解析时间轴（转纯文本时使用）"""
+    texts = []
+    for line_start, _, line_end, block in _iter_cue_blocks(content):
+        if block.find('-->', line_end) >= 0:
+            texts.extend(text for text in (_clean(cue[-1]) for cue in _CUE.findall(block[line_start:])) if text)
+            continue
+        text = block[line_end + 1:]
+        text = _clean(text) if ('<' in text or '&' in text) else text.strip()
+        if text:
+            texts.append(text)
+    return texts
+
+
+parse_srt = parse_cues
+parse_vtt = parse_cues
+
+
+def parse_json3(content: Union[str, Dict[str, Any]]) -> List[Segment]:
+    """
+    解析 YouTube json3（timedtext）
+
+    Args:
+        content: json3 文本或已解析的字典
+
+    Returns:
+        字幕列表，跳过只含换行的追加事件
+    """
+    data = json.loads(content) if isinstance(content, str) else content
+    segments = []
+    append = segments.append
+    for event in data.get('events') or ():
+        segs = event.get('segs')
+        if not segs:
+            continue
+        text = ''.join(seg.get('utf8', '') for seg in segs).strip()
+        if not text:
+            continue
+        start = event.get('tStartMs', 0) / 1000
+        append(Segment(start, start + event.get('dDurationMs', 0) / 1000, text))
+    return segments
+
+
+def json3_texts(content: Union[str, Dict[str, Any]]) -> List[str]:
+    """只取 json3 的文本，不构造 Segment"""
+    data = json.loads(content) if isinstance(content, str) else content
+    texts = []
+    for event in data.get('events') or ():
+        segs = event.get('segs')
+        if segs:
+            text = ''.join(seg.get('utf8', '') for seg in segs).strip()
+            if text:
+                texts.append(text)
+    return texts
+
+
+def parse_bilibili(body: Iterable[Dict[str, Any]]) -> List[Segment]:
+    """解析B站字幕 body（from/to/content）"""
+    return [
+        Segment(item.get('from', 0), item.get('to', 0), item.get('content', ''))
+        for item in body
+        if item.get('content')
+    ]
+
+
+def parse_transcript_items(items: Iterable[Dict[str, Any]]) -> List[Segment]:
+    """解析 youtube-transcript-api 的条目（start/duration/text）"""
+    return [
+        Segment(item['start'], item['start'] + item.get('duration', 0), item['text'])
+        for item in items
+    ]
+
+
+def detect_format(content: Any) -> str:
+    """
+    判断字幕格式
+
+    Returns:
+        'json3'、'vtt'、'srt'、'bilibili' 或 'transcript'
+    """
+    if isinstance(content, dict):
+        return 'bilibili' if 'body' in content else 'json3'
+    if isinstance(content, list):
+        return 'transcript' if content and 'start' in content[0] else 'bilibili'
+    head = content.lstrip('\ufeff \t\r\n')[:16]
+    if head.startswith('{'):
+        return 'bilibili' if head[1:].lstrip().startswith('"body"') else 'json3'
+    if head.startswith('WEBVTT'):
+        return 'vtt'
+    return 'srt'
+
+
+def parse_subtitles(content: Any, source_format: Optional[str] = None) -> List[Segment]:
+    """
+    解析任意支持的字幕格式
+
+    Args:
+        content: 字幕内容（文本、json3 字典、B站 body 列表或 {'body': [...]}）
+        source_format: 格式，不传时自动判断
+
+    Returns:
+        字幕列表；内容无法解析时返回空列表
+    """
+    if not content:
+        return []
+    source_format = source_format or detect_format(content)
+    try:
+        if source_format == 'bilibili':
+            if isinstance(content, str):
+                content = json.loads(content)
+            if isinstance(content, dict):
+                content = content.get('body') or []
+        return PARSERS[source_format](content)
+    except (ValueError, AttributeError, KeyError, TypeError):
+        return []
+
+
+def subtitle_text(content: Any, separator: Optional[str] = None, normalize: bool = False) -> str:
+    """
+    字幕转纯文本
+
+    Args:
+        content: 字幕内容
+        separator: 分隔符；默认 json3 自动字幕的事件很碎，用空格连接，其余按行
+        normalize: 先做自动字幕规范化（去滚动重复、合并为句子），每句一行；否则跳过时间轴解析
+
+    Returns:
+        纯文本
+    """
+    if not content:
+        return ''
+    if normalize:
+        return segments_to_text(normalize_segments(parse_subtitles(content)), separator or '\n')
+    source_format = detect_format(content)
+    if separator is None:
+        separator = ' ' if source_format == 'json3' else '\n'
+    try:
+        if source_format == 'json3':
+            return separator.join(json3_texts(content))
+        if source_format in ('srt', 'vtt'):
+            return separator.join(cue_texts(content))
+    except (ValueError, AttributeError, TypeError):
+        return ''
+    return segments_to_text(parse_subtitles(content, source_format), separator)
+
+
+# 自动字幕规范化：句末标点；没有标点时按停顿、时长和长度断句
+_SENTENCE_END = ('。', '！', '？', '.', '!', '?', '…')
+PAUSE_SECONDS = 1.2
+MAX_SENTENCE_SECONDS = 12.0
+MAX_SENTENCE_CHARS = 240
+# 滚动重叠的最短长度，避免把偶然重复的短词当成重叠
+MIN_OVERLAP_CHARS = 3
+
+
+def _is_cjk(char: str) -> bool:
+    return '\u4e00' <= char <= '\u9fff' or '\u3040' <= char <= '\u30ff' or '\uac00' <= char <= '\ud7af'
+
+
+def _join(left: str, right: str) -> str:
+    """拼接两段文本，中日韩文字之间不加空格"""
+    if not left:
+        return right
+    if not right:
+        return left
+    if _is_cjk(left[-1]) or _is_cjk(right[0]):
+        return left + right
+    return left + ' ' + right
+
+
+def _flatten(text: str) -> str:
+    """多行字幕合为一行"""
+    if '\n' not in text:
+        return text
+    result = ''
+    for line in text.split('\n'):
+        result = _join(result, line.strip())
+    return result
+
+
+def _new_text(previous: str, text: str) -> str:
+    """
+    去掉 text 开头与 previous 结尾重叠的部分，返回新增的文本
+
+    滚动自动字幕的每条都会重复上一条的全部或后半部分；重叠只在词边界（中文任意位置）处截断
+    """
+    if not previous:
+        return text
+    if previous.endswith(text):
+        return ''
+    for k in range(min(len(previous), len(text) - 1), MIN_OVERLAP_CHARS - 1, -1):
+        if (text[k] == ' ' or _is_cjk(text[k]) or _is_cjk(text[k - 1])) and previous.endswith(text[:k]):
+            boundary = len(previous) - k
+            if boundary == 0 or previous[boundary - 1] == ' ' or _is_cjk(previous[boundary]):
+                return text[k:].lstrip()
+    return text
+
+
+def normalize_segments(segments: Iterable[Segment], merge_sentences: bool = True) -> List[Segment]:
+    """
+    自动字幕规范化：去掉滚动重复，合并碎片为句子，保留时间轴
+
+    Args:
+        segments: 原始字幕（json3/VTT 自动字幕的事件往往互相重叠、重复上一行）
+        merge_sentences: 是否把碎片合并为句子；False 时只去重，保留原有的分条
+
+    Returns:
+        规范化后的字幕，每条的开始时间为其第一段碎片的开始时间
+    """
+    result: List[Segment] = []
+    previous = ''
+    start = end = 0.0
+    buffer = ''
+
+    for segment in sorted(segments, key=lambda item: item.start):
+        text = _flatten(segment.text)
+        fragment = _new_text(previous, text)
+        previous = text
+        if not fragment:
+            continue
+        if not merge_sentences:
+            result.append(Segment(segment.start, segment.end, fragment))
+            continue
+
+        if buffer and (
+            segment.start - end > PAUSE_SECONDS
+            or segment.end - start > MAX_SENTENCE_SECONDS
+            or len(buffer) + len(fragment) > MAX_SENTENCE_CHARS
+        ):
+            result.append(Segment(start, end, buffer))
+            buffer = ''
+        if not buffer:
+            start = segment.start
+        buffer = _join(buffer, fragment)
+        end = max(end, segment.end)
+        if buffer.endswith(_SENTENCE_END):
+            result.append(Segment(start, end, buffer))
+            buffer = ''
+
+    if buffer:
+        result.append(Segment(start, end, buffer))
+    return result
+
+
+def format_timestamp(seconds: float, decimal: str = ',') -> str:
+    """秒数格式化为 HH:MM:SS,mmm（VTT 使用 . 作为毫秒分隔符）"""
+    total = max(0, int(seconds * 1000 + 0.5))
+    return f"{total // 3600000:02d}:{total // 60000 % 60:02d}:{total // 1000 % 60:02d}{decimal}{total % 1000:03d}"
+
+
+def _timing_line(start: float, end: float, decimal: str) -> str:
+    """一次格式化起止两个时间戳，比两次调用 format_timestamp 少一半函数调用"""
+    a = max(0, int(start * 1000 + 0.5))
+    b = max(0, int(end * 1000 + 0.5))
+    return (f"{a // 3600000:02d}:{a // 60000 % 60:02d}:{a // 1000 % 60:02d}{decimal}{a % 1000:03d} --> "
+            f"{b // 3600000:02d}:{b // 60000 % 60:02d}:{b // 1000 % 60:02d}{decimal}{b % 1000:03d}")
+
+
+def iter_srt(segments: Iterable[Segment]) -> Iterator[str]:
+    """逐条生成 SRT"""
+    for i, (start, end, text) in enumerate(segments, 1):
+        yield f"{i}\n{_timing_line(start, end, ',')}\n{text}\n\n"
+
+
+def iter_vtt(segments: Iterable[Segment]) -> Iterator[str]:
+    """逐条生成 WebVTT"""
+    yield "WEBVTT\n\n"
+    for start, end, text in segments:
+        yield f"{_timing_line(start, end, '.')}\n{text}\n\n"
+
+
+def iter_json3(segments: Iterable[Segment]) -> Iterator[str]:
+    """逐条生成 YouTube json3"""
+    yield '{"wireMagic": "pb3", "events": ['
+    separator = ''
+    for start, end, text in segments:
+        start_ms = int(round(start * 1000))
+        yield (f'{separator}{{"tStartMs": {start_ms}, "dDurationMs": {int(round(end * 1000)) - start_ms}, '
+               f'"segs": [{{"utf8": {json.dumps(text, ensure_ascii=False)}}}]}}')
+        separator = ', '
+    yield ']}'
+
+
+def to_bilibili_body(segments: Iterable[Segment]) -> List[Dict[str, Any]]:
+    """转换为B站字幕 body 列表"""
+    return [{'from': start, 'to': end, 'content': text} for start, end, text in segments]
+
+
+def iter_bilibili(segments: Iterable[Segment]) -> Iterator[str]:
+    """逐条生成B站字幕 JSON（{"body": [...]}）"""
+    yield '{"body": ['
+    separator = ''
+    for start, end, text in segments:
+        yield (f'{separator}{{"from": {round(start, 3)}, "to": {round(end, 3)}, '
+               f'"content": {json.dumps(text, ensure_ascii=False)}}}')
+        separator = ', '
+    yield ']}'
+
+
+def iter_text(segments: Iterable[Segment], separator: str = '\n') -> Iterator[str]:
+    """只输出文本"""
+    first = True
+    for segment in segments:
+        if first:
+            first = False
+            yield segment.text
+        else:
+            yield separator + segment.text
+
+
+def segments_to_text(segments: Iterable[Segment], separator: str = '\n') -> str:
+    return separator.join(segment.text for segment in segments)
+
+
+PARSERS: Dict[str, Callable[[Any], List[Segment]]] = {
+    'json3': parse_json3,
+    'srt': parse_srt,
+    'vtt': parse_vtt,
+    'bilibili': parse_bilibili,
+    'transcript': parse_transcript_items,
+}
+
+EMITTERS: Dict[str, Callable[[Iterable[Segment]], Iterator[str]]] = {
+    'json3': iter_json3,
+    'srt': iter_srt,
+    'vtt': iter_vtt,
+    'bilibili': iter_bilibili,
+    'text': iter_text,
+}
+
+
+def convert(content: Any, target_format: str, source_format: Optional[str] = None) -> str:
+    """
+    字幕格式转换
+
+    Args:
+        content: 源字幕
+        target_format: 'srt'、'vtt'、'json3'、'bilibili' 或 'text'
+        source_format: 源格式，不传时自动判断
+
+    Returns:
+        转换后的文本
+    """
+    return ''.join(EMITTERS[target_format](parse_subtitles(content, source_format)))
@@ -0,0 +1,102 @@
+"""
+Stale-while-revalidate 缓存
+慢的计算（如 LLM 摘要）放到后台线程执行，期间立即返回快速的降级结果；
+后台结果写入缓存后，之后的请求直接拿到升级后的版本
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from utils.cache import TTLCache
+from utils.logger import logger
+
+
+class StaleWhileRevalidate:
+    """
+    缓存命中时返回升级结果，未命中时返回降级结果并在后台刷新
+
+    同一个 key 同时只有一个后台任务；刷新失败（抛异常或返回 None）后
+    在 retry_after 秒内不再重试，避免上游故障时每个请求都排队等待
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        maxsize: int = 256,
+        max_workers: int = 2,
+        retry_after: float = 60,
+        name: str = "swr"
+    ):
+        self._cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._failed = TTLCache(ttl=retry_after, maxsize=maxsize)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: Hashable,
+        fallback: Callable[[], Any],
+        refresh: Optional[Callable[[], Any]] = None
+    ) -> Tuple[Any, bool]:
+        """
+        读取结果
+
+        Args:
+            key: 缓存键
+            fallback: 未命中时同步计算的降级结果
+            refresh: 后台计算升级结果，返回 None 表示失败；为 None 时不刷新
+
+        Returns:
+            (结果, 是否为升级后的结果)
+        """
+        value = self._cache.get(key)
+        if value is not None:
+            return value, True
+        if refresh is not None:
+            self.schedule(key, refresh)
+        return fallback(), False
+
+    def schedule(self, key: Hashable, refresh: Callable[[], Any]) -> Optional[Future]:
+        """提交后台刷新，已有同 key 任务或最近失败过时不重复提交"""
+        if key in self._failed:
+            return None
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                if self._cache.get(key) is not None:
+                    # 刚好在检查缓存之后完成
+                    return None
+                future = self._executor.submit(self._run, key, refresh)
+                self._inflight[key] = future
+            return future
+
+    def _run(self, key: Hashable, refresh: Callable[[], Any]) -> Any:
+        try:
+            value = refresh()
+        except Exception as e:
+            logger.warning(f"后台刷新失败 {key!r}: {e}")
+            value = None
+        if value is None:
+            self._failed.set(key, True)
+        else:
+            self._cache.set(key, value)
+        with self._lock:
+            self._inflight.pop(key, None)
+        return value
+
+    def peek(self, key: Hashable) -> Any:
+        """只读缓存，不触发刷新"""
+        return self._cache.get(key)
+
+    def wait(self, key: Hashable, timeout: Optional[float] = None) -> Any:
+        """等待进行中的刷新完成（主要用于测试和关闭前收尾）"""
+        with self._lock:
+            future = self._inflight.get(key)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self._cache.get(key)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,162 @@
+"""
+TextRank 核心观点提取
+离线、不依赖领域词表：句子 TF-IDF 向量 -> 余弦相似度矩阵 -> PageRank 迭代 -> MMR 去冗余，
+全部用 NumPy 向量化计算，中文按二字组、英文按单词切分
+"""
+
+import re
+from typing import Dict, List
+
+import numpy as np
+
+from utils.extractive import dedupe_sentences, split_sentences, strip_filler, tokenize
+
+# PageRank 阻尼系数、收敛阈值和最大迭代次数
+DAMPING = 0.85
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 100
+
+# MMR 中相关性与多样性的权衡（越大越偏向相关性）
+MMR_LAMBDA = 0.7
+
+# 词表超过该维度时哈希降维，限制相似度矩阵的计算量
+MAX_FEATURES = 2048
+
+# 参与排序的最多句子数，超过时均匀抽样以保证覆盖全片
+MAX_SENTENCES = 3000
+
+# 观点的最短长度和显示长度上限（中文按字，英文按字符）
+MIN_POINT_LENGTH = 12
+MAX_POINT_LENGTH_CJK = 45
+MAX_POINT_LENGTH_LATIN = 160
+
+_CJK_CHAR = re.compile(r'[一-鿿]')
+
+
+def _sentence_vectors(sentences: List[str]) -> np.ndarray:
+    """L2 归一化的 TF-IDF 句向量；只出现在一个句子里的词对相似度没有贡献，直接丢弃"""
+    token_lists = [tokenize(sent) for sent in sentences]
+    vocab: Dict[str, int] = {}
+    rows, cols = [], []
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            rows.append(row)
+            cols.append(vocab.setdefault(token, len(vocab)))
+
+    n = len(sentences)
+    if not rows:
+        return np.zeros((n, 1), dtype=np.float32)
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+
+    # 文档频率：每个 (句子, 词) 只计一次
+    pairs = np.unique(rows * len(vocab) + cols)
+    df = np.bincount(pairs % len(vocab), minlength=len(vocab))
+    keep = (df > 1) & (df < max(2, n * 0.5))
+    mask = keep[cols]
+    rows, cols = rows[mask], cols[mask]
+
+    idf = np.log(n / (1 + df)).astype(np.float32) + 1
+    weights = idf[cols]
+    if len(vocab) > MAX_FEATURES:
+        cols = cols % MAX_FEATURES
+        width = MAX_FEATURES
+    else:
+        width = len(vocab)
+
+    matrix = np.bincount(rows * width + cols, weights=weights, minlength=n * width)
+    matrix = matrix.reshape(n, width).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def similarity_matrix(sentences: List[str]) -> np.ndarray:
+    """句子间余弦相似度，对角线置0"""
+    vectors = _sentence_vectors(sentences)
+    sim = vectors @ vectors.T
+    np.fill_diagonal(sim, 0)
+    return sim
+
+
+def pagerank(sim: np.ndarray, damping: float = DAMPING) -> np.ndarray:
+    """在相似度加权图上做 PageRank 幂迭代，孤立句子均匀分配出链"""
+    n = sim.shape[0]
+    out_weight = sim.sum(axis=1, keepdims=True)
+    transition = np.divide(sim, out_weight, out=np.full_like(sim, 1.0 / n), where=out_weight > 0)
+    transition_t = np.ascontiguousarray(transition.T)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - damping) / n + damping * (transition_t @ scores)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def mmr_select(relevance: np.ndarray, sim: np.ndarray, top_k: int, lam: float = MMR_LAMBDA) -> List[int]:
+    """最大边际相关：每次选相关性高且与已选句子最不相似的句子"""
+    relevance = relevance / (relevance.max() or 1)
+    max_sim = np.zeros_like(relevance)
+    available = np.ones(len(relevance), dtype=bool)
+    selected: List[int] = []
+
+    for _ in range(min(top_k, len(relevance))):
+        gain = np.where(available, lam * relevance - (1 - lam) * max_sim, -np.inf)
+        best = int(np.argmax(gain))
+        if not np.isfinite(gain[best]):
+            break
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_sim, sim[:, best], out=max_sim)
+    return selected
+
+
+def _length_prior(sentences: List[str]) -> np.ndarray:
+    """偏好长度适中的完整句子"""
+    lengths = np.fromiter((len(s) for s in sentences), dtype=np.float32, count=len(sentences))
+    prior = np.ones_like(lengths)
+    prior[lengths < 15] = 0.5
+    prior[lengths > 120] = 0.7
+    return prior
+
+
+def shorten_point(point: str) -> str:
+    """过长的观点在子句边界处截断"""
+    is_cjk = len(_CJK_CHAR.findall(point)) > len(point) * 0.3
+    limit = MAX_POINT_LENGTH_CJK if is_cjk else MAX_POINT_LENGTH_LATIN
+    if len(point) <= limit:
+        return point
+    for mark in ('。', '；', ';', '，', ', '):
+        index = point.find(mark, limit // 2, limit)
+        if index != -1:
+            return point[:index + 1]
+    return point[:limit - 3] + '...'
+
+
+def extract_key_points(text: str, top_k: int = 8) -> List[str]:
+    """
+    提取核心观点
+
+    Args:
+        text: 字幕全文
+        top_k: 返回的观点数
+
+    Returns:
+        按重要性排序的观点列表
+    """
+    sentences = [
+        sent for sent in (strip_filler(s) for s in dedupe_sentences(split_sentences(text)))
+        if len(sent) >= MIN_POINT_LENGTH
+    ]
+    if not sentences:
+        return []
+    if len(sentences) > MAX_SENTENCES:
+        picks = np.linspace(0, len(sentences) - 1, MAX_SENTENCES).astype(int)
+        sentences = [sentences[i] for i in picks]
+
+    sim = similarity_matrix(sentences)
+    relevance = pagerank(sim) * _length_prior(sentences)
+    return [shorten_point(sentences[i]) for i in mmr_select(relevance, sim, top_k)]
@@ -0,0 +1,10 @@
+"""
+token 数估算
+不依赖具体模型的分词器，用于限流计费和提示词预算
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文约1字1 token，其余约4字符1 token"""
+    cjk = sum(1 for char in text if '一' <= char <= '鿿')
+    return cjk + (len(text) - cjk) // 4 + 1
@@ -0,0 +1,278 @@
+"""
+紧凑的字幕条目容器与时间索引
+开始时间和时长存为 array('d')，全部文本拼成一个字符串并记录偏移，
+代替每条一个 {start, duration, text} 字典；批量处理上百个视频时常驻内存小得多。
+TimeIndex 在有序的开始时间上二分查找，按时间点、时间段、固定间隔取字幕无需逐条扫描
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.subtitles import Segment
+
+
+class Transcript:
+    """
+    字幕条目序列
+
+    文本缓冲区以空格连接各条文本，text 属性即为空格拼接的全文，无需再复制一份；
+    第 i 条文本为 text[offsets[i]:offsets[i + 1] - 1]
+    """
+
+    __slots__ = ('starts', 'durations', 'offsets', 'text')
+
+    def __init__(self, starts: array, durations: array, offsets: array, text: str):
+        self.starts = starts
+        self.durations = durations
+        self.offsets = offsets
+        self.text = text
+
+    @classmethod
+    def from_items(cls, items: Iterable[Any]) -> 'Transcript':
+        """
+        从字幕条目构建
+
+        Args:
+            items: youtube-transcript-api 的条目对象、{start, duration, text} 字典或 Segment
+
+        Returns:
+            Transcript
+        """
+        starts, durations, offsets = array('d'), array('d'), array('I', [0])
+        texts: List[str] = []
+        position = 0
+        for item in items:
+            if isinstance(item, dict):
+                start, duration, text = item.get('start', 0), item.get('duration', 0), item.get('text', '')
+            elif isinstance(item, Segment):
+                start, duration, text = item.start, item.end - item.start, item.text
+            else:
+                start, duration, text = item.start, getattr(item, 'duration', 0), item.text
+            starts.append(start)
+            durations.append(duration or 0)
+            texts.append(text)
+            position += len(text) + 1
+            offsets.append(position)
+        return cls(starts, durations, offsets, ' '.join(texts))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text_at(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1] - 1]
+
+    def __getitem__(self, index: int) -> Segment:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Transcript index out of range')
+        start = self.starts[index]
+        return Segment(start, start + self.durations[index], self.text_at(index))
+
+    def __iter__(self) -> Iterator[Segment]:
+        text, offsets = self.text, self.offsets
+        for i, (start, duration) in enumerate(zip(self.starts, self.durations)):
+            yield Segment(start, start + duration, text[offsets[i]:offsets[i + 1] - 1])
+
+    def texts(self) -> Iterator[str]:
+        text, offsets = self.text, self.offsets
+        for i in range(len(self)):
+            yield text[offsets[i]:offsets[i + 1] - 1]
+
+    def join(self, separator: str = ' ') -> str:
+        """按分隔符拼接全部文本；空格分隔时直接返回缓冲区"""
+        if separator == ' ':
+            return self.text
+        return separator.join(self.texts())
+
+    def to_items(self) -> List[Dict[str, Any]]:
+        """展开为旧格式的 {start, duration, text} 字典列表"""
+        return [
+            {"start": start, "duration": duration, "text": text}
+            for start, duration, text in zip(self.starts, self.durations, self.texts())
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """按列序列化，JSON 中每条只占两个数字和一个偏移"""
+        return {
+            "start": self.starts.tolist(),
+            "duration": self.durations.tolist(),
+            "offsets": self.offsets.tolist(),
+            "text": self.text
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Transcript':
+        return cls(array('d', data["start"]), array('d', data["duration"]), array('I', data["offsets"]), data["text"])
+
+    def __sizeof__(self) -> int:
+        return (
+            object.__sizeof__(self) + self.starts.__sizeof__() + self.durations.__sizeof__()
+            + self.offsets.__sizeof__() + self.text.__sizeof__()
+        )
+
+    def __repr__(self) -> str:
+        return f"Transcript({len(self)} segments, {len(self.text)} chars)"
+
+
+def format_clock(seconds: float) -> str:
+    """秒数格式化为 MM:SS，超过一小时分钟数继续累加"""
+    return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
+
+
+class TimeIndex:
+    """
+    字幕时间索引
+
+    开始时间有序（乱序的输入会先排序），点查询和区间查询都是 O(log n)；
+    区间内的文本直接从 Transcript 的缓冲区切片，不逐条拼接
+    """
+
+    def __init__(self, segments: Iterable[Any]):
+        transcript = segments if isinstance(segments, Transcript) else Transcript.from_items(segments)
+        starts = transcript.starts
+        if any(starts[i] > starts[i + 1] for i in range(len(starts) - 1)):
+            transcript = Transcript.from_items(sorted(transcript, key=lambda segment: segment.start))
+        self.transcript = transcript
+
+    def __len__(self) -> int:
+        return len(self.transcript)
+
+    def locate(self, seconds: float) -> Optional[int]:
+        """
+        某一时刻的字幕
+
+        Args:
+            seconds: 时间点（秒）
+
+        Returns:
+            该时刻最近一条已开始的字幕下标；早于第一条字幕时为 None
+        """
+        index = bisect_right(self.transcript.starts, seconds) - 1
+        return index if index >= 0 else None
+
+    def span(self, start: float, end: float) -> Tuple[int, int]:
+        """
+        与 [start, end) 有重叠的字幕下标范围
+
+        Returns:
+            (lo, hi)，下标 lo <= i < hi
+        """
+        transcript = self.transcript
+        lo = bisect_right(transcript.starts, start) - 1
+        if lo < 0 or transcript.starts[lo] + transcript.durations[lo] <= start:
+            lo += 1
+        return lo, max(lo, bisect_left(transcript.starts, end))
+
+    def text_between(self, lo: int, hi: int, separator: str = ' ') -> str:
+        """下标 [lo, hi) 的字幕文本；空格分隔时直接切片缓冲区"""
+        transcript = self.transcript
+        if lo >= hi:
+            return ''
+        if separator == ' ':
+            return transcript.text[transcript.offsets[lo]:transcript.offsets[hi] - 1]
+        return separator.join(transcript.text_at(i) for i in range(lo, hi))
+
+    def window(self, start: float, end: float) -> List[Segment]:
+        """时间段内的字幕条目"""
+        lo, hi = self.span(start, end)
+        return [self.transcript[i] for i in range(lo, hi)]
+
+    def clip(self, start: float, end: float, separator: str = ' ') -> Optional[Segment]:
+        """
+        截取时间段的字幕作为一段引用
+
+        Returns:
+            Segment，起止时间取自首尾字幕；时间段内没有字幕时为 None
+        """
+        lo, hi = self.span(start, end)
+        if lo >= hi:
+            return None
+        transcript = self.transcript
+        clip_end = max(transcript.starts[i] + transcript.durations[i] for i in range(lo, hi))
+        return Segment(transcript.starts[lo], clip_end, self.text_between(lo, hi, separator))
+
+    def buckets(self, interval: float) -> List[Tuple[float, int, int]]:
+        """
+        按固定间隔分桶
+
+        Args:
+            interval: 间隔（秒）
+
+        Returns:
+            [(桶开始时间, lo, hi)]，只包含有字幕的桶
+        """
+        starts = self.transcript.starts
+        result: List[Tuple[float, int, int]] = []
+        lo = 0
+        while lo < len(starts):
+            bucket_start = (starts[lo] // interval) * interval
+            hi = bisect_left(starts, bucket_start + interval, lo)
+            result.append((bucket_start, lo, hi))
+            lo = hi
+        return result
+
+    def format_markers(self, interval: float = 60) -> str:
+        """
+        每隔 interval 秒插入一个 [MM:SS] 时间标记
+
+        标记打在距上一个标记至少 interval 秒后的第一条字幕前，与逐条扫描的结果一致
+        """
+        starts = self.transcript.starts
+        parts: List[str] = []
+        lo, hi = 0, bisect_left(starts, interval)
+        while True:
+            if hi > lo:
+                parts.append(self.text_between(lo, hi))
+            if hi >= len(starts):
+                break
+            current = starts[hi]
+            parts.append(f"\n[{format_clock(current)}]")
+            lo, hi = hi, bisect_left(starts, current + interval, hi + 1)
+        return " ".join(parts)
+
+    def offset_to_index(self, offset: int) -> int:
+        """Transcript.text 中的字符偏移所在的字幕下标"""
+        return bisect_right(self.transcript.offsets, offset) - 1
+
+    def search(self, query: str, case_sensitive: bool = False) -> List[Segment]:
+        """
+        全文搜索，命中位置映射回字幕时间
+
+        Args:
+            query: 搜索词
+            case_sensitive: 是否区分大小写
+
+        Returns:
+            每个命中所在的字幕（同一条字幕多次命中只返回一次）
+        """
+        if not query:
+            return []
+        text = self.transcript.text
+        if not case_sensitive:
+            text, query = text.lower(), query.lower()
+        hits: List[Segment] = []
+        last = -1
+        position = text.find(query)
+        while position != -1:
+            index = self.offset_to_index(position)
+            if index != last:
+                hits.append(self.transcript[index])
+                last = index
+            position = text.find(query, position + 1)
+        return hits
+
+
+def json_default(obj: Any) -> Any:
+    """json.dump 的 default 参数：Transcript 按列序列化"""
+    if isinstance(obj, Transcript):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def items_default(obj: Any) -> Any:
+    """json.dump 的 default 参数：Transcript 展开为 {start, duration, text} 字典列表，与旧格式一致"""
+    if isinstance(obj, Transcript):
+        return obj.to_items()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,226 @@
+"""
+B站弹幕模块
+按6分钟分段并发获取弹幕（protobuf），逐条解析，支持时间窗口过滤和按密度采样，
+内存占用只与采样桶数量和并发分段数有关，与视频时长无关
+"""
+
+import heapq
+import itertools
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+from http_client import get_client
+
+DANMAKU_SEGMENT_URL = "https://api.bilibili.com/x/v2/dm/web/seg.so"
+
+# 弹幕分段接口每段覆盖的时长（秒）
+SEGMENT_SECONDS = 360
+
+# 采样桶宽度（秒）和每桶保留的弹幕数
+DANMAKU_BUCKET_SECONDS = 10
+DANMAKU_MAX_PER_BUCKET = 3
+
+# 并发获取的分段数
+DANMAKU_SEGMENT_WORKERS = 4
+
+# 每条弹幕作为字幕显示的时长（秒）
+DANMAKU_DISPLAY_SECONDS = 3
+
+# 高级弹幕/代码弹幕/BAS弹幕，不是文字内容
+SKIP_MODES = {7, 8, 9}
+
+# DanmakuElem 字段号 -> (字段名, 类型)
+_ELEM_FIELDS = {
+    1: ('id', 'int'),
+    2: ('progress', 'int'),
+    3: ('mode', 'int'),
+    4: ('fontsize', 'int'),
+    5: ('color', 'int'),
+    6: ('midHash', 'str'),
+    7: ('content', 'str'),
+    8: ('ctime', 'int'),
+    9: ('weight', 'int'),
+    11: ('pool', 'int'),
+}
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _skip_field(data: bytes, pos: int, wire_type: int) -> int:
+    if wire_type == 0:
+        return _read_varint(data, pos)[1]
+    if wire_type == 1:
+        return pos + 8
+    if wire_type == 2:
+        length, pos = _read_varint(data, pos)
+        return pos + length
+    if wire_type == 5:
+        return pos + 4
+    raise ValueError(f"不支持的 protobuf wire type: {wire_type}")
+
+
+def _parse_elem(data: bytes, pos: int, end: int) -> Dict[str, Any]:
+    elem: Dict[str, Any] = {}
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        field_no, wire_type = key >> 3, key & 0x07
+        spec = _ELEM_FIELDS.get(field_no)
+        if spec is None:
+            pos = _skip_field(data, pos, wire_type)
+            continue
+        name, kind = spec
+        if kind == 'int' and wire_type == 0:
+            elem[name], pos = _read_varint(data, pos)
+        elif kind == 'str' and wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            elem[name] = data[pos:pos + length].decode('utf-8', errors='replace')
+            pos += length
+        else:
+            pos = _skip_field(data, pos, wire_type)
+    return elem
+
+
+def iter_segment_elems(data: bytes) -> Iterator[Dict[str, Any]]:
+    """逐条解析 DmSegMobileReply，不构建完整列表"""
+    pos = 0
+    end = len(data)
+    while pos < end:
+        key, pos = _read_varint(data, pos)
+        field_no, wire_type = key >> 3, key & 0x07
+        if field_no == 1 and wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            yield _parse_elem(data, pos, pos + length)
+            pos += length
+        else:
+            pos = _skip_field(data, pos, wire_type)
+
+
+def fetch_segment(aid: int, cid: int, segment_index: int) -> bytes:
+    """获取单个弹幕分段（segment_index 从1开始）"""
+    response = get_client('bilibili').get(DANMAKU_SEGMENT_URL, params={
+        'type': 1,
+        'oid': cid,
+        'pid': aid,
+        'segment_index': segment_index,
+    })
+    if response.status_code != 200:
+        return b''
+    return response.content
+
+
+class DensitySampler:
+    """按时间桶采样：每个桶只保留权重最高的若干条，桶内相同内容只计一次"""
+
+    def __init__(self, bucket_seconds: float, max_per_bucket: int):
+        self.bucket_ms = bucket_seconds * 1000
+        self.max_per_bucket = max_per_bucket
+        self._buckets: Dict[int, List[Tuple]] = {}
+        self._seen: Dict[int, set] = {}
+        self._counter = itertools.count()
+
+    def add(self, elem: Dict[str, Any]) -> None:
+        bucket = int(elem.get('progress', 0) // self.bucket_ms)
+        content = elem.get('content', '').strip()
+        seen = self._seen.setdefault(bucket, set())
+        if not content or content in seen:
+            return
+        heap = self._buckets.setdefault(bucket, [])
+        # 权重高、发送早的弹幕优先，序号保证排序键唯一
+        item = (elem.get('weight', 0), -elem.get('ctime', 0), -next(self._counter), elem)
+        if len(heap) < self.max_per_bucket:
+            heapq.heappush(heap, item)
+            seen.add(content)
+        elif item[:3] > heap[0][:3]:
+            removed = heapq.heapreplace(heap, item)
+            seen.discard(removed[3].get('content', '').strip())
+            seen.add(content)
+
+    def results(self) -> List[Dict[str, Any]]:
+        elems = [item[3] for heap in self._buckets.values() for item in heap]
+        elems.sort(key=lambda e: (e.get('progress', 0), e.get('id', 0)))
+        return elems
+
+
+def _iter_segments(aid: int, cid: int, indexes: List[int], max_workers: int) -> Iterator[bytes]:
+    """按顺序产出分段数据，同时在途的分段不超过 max_workers 个"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for index in indexes:
+            pending.append(executor.submit(fetch_segment, aid, cid, index))
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def fetch_danmaku(
+    aid: int,
+    cid: int,
+    duration: float,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    bucket_seconds: float = DANMAKU_BUCKET_SECONDS,
+    max_per_bucket: int = DANMAKU_MAX_PER_BUCKET,
+    max_workers: int = DANMAKU_SEGMENT_WORKERS
+) -> List[Dict[str, Any]]:
+    """
+    获取弹幕并转换为字幕格式
+
+    Args:
+        aid: 视频AV号
+        cid: 分P的cid
+        duration: 视频时长（秒），用于计算分段数
+        start: 时间窗口起点（秒）
+        end: 时间窗口终点（秒）
+        bucket_seconds: 采样桶宽度（秒）
+        max_per_bucket: 每个桶最多保留的弹幕数
+        max_workers: 并发获取的分段数
+
+    Returns:
+        按时间排序的字幕条目列表
+    """
+    start = max(0.0, start or 0.0)
+    if end is None:
+        end = duration or SEGMENT_SECONDS
+    elif duration:
+        end = min(end, duration)
+    if end <= start:
+        return []
+
+    first = int(start // SEGMENT_SECONDS) + 1
+    last = max(first, math.ceil(end / SEGMENT_SECONDS))
+    start_ms, end_ms = start * 1000, end * 1000
+
+    sampler = DensitySampler(bucket_seconds, max_per_bucket)
+    for data in _iter_segments(aid, cid, list(range(first, last + 1)), max_workers):
+        for elem in iter_segment_elems(data):
+            if elem.get('mode', 1) in SKIP_MODES:
+                continue
+            if not start_ms <= elem.get('progress', 0) < end_ms:
+                continue
+            sampler.add(elem)
+
+    return [
+        {
+            'id': elem.get('id', 0),
+            'mode': elem.get('mode', 1),
+            'progress': elem.get('progress', 0),
+            'color': f"{elem.get('color', 0xFFFFFF):06x}",
+            'from': elem.get('progress', 0) / 1000,
+            'to': elem.get('progress', 0) / 1000 + DANMAKU_DISPLAY_SECONDS,
+            'content': elem.get('content', '')
+        }
+        for elem in sampler.results()
+    ]
@@ -0,0 +1,110 @@
+"""
+HTTP客户端模块
+按上游服务复用连接池（keep-alive），统一超时、重试策略和请求头/Cookie
+"""
+
+import threading
+from typing import Optional, Dict, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (连接超时, 读取超时) 秒
+DEFAULT_TIMEOUT = (5, 30)
+
+# 各上游服务的连接池与重试策略。
+# raise_on_status=False：按状态码重试用完后返回最后一次的响应，而不是抛出 RetryError，
+# 调用方照常检查 status_code
+UPSTREAM_POLICIES = {
+    # YouTube 字幕文件 (timedtext)
+    'youtube': {
+        'timeout': (5, 30),
+        'retries': Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                         allowed_methods=frozenset({'GET'}), respect_retry_after_header=True,
+                         raise_on_status=False),
+        'pool_maxsize': 20,
+    },
+    # Google 翻译
+    'translate': {
+        'timeout': (5, 30),
+        'retries': Retry(total=2, backoff_factor=1, status_forcelist=(429, 500, 502, 503),
+                         allowed_methods=frozenset({'GET'}), respect_retry_after_header=True,
+                         raise_on_status=False),
+        'pool_maxsize': 10,
+    },
+    # B站 API / 字幕 / 弹幕
+    'bilibili': {
+        'timeout': (5, 15),
+        'retries': Retry(total=3, backoff_factor=0.5, status_forcelist=(412, 429, 500, 502, 503, 504),
+                         allowed_methods=frozenset({'GET'}), respect_retry_after_header=True,
+                         raise_on_status=False),
+        'pool_maxsize': 20,
+    },
+}
+
+
+class HttpClient:
+    """绑定到单个上游服务的HTTP客户端"""
+
+    def __init__(self, name: str, policy: Dict[str, Any]):
+        self.name = name
+        self.timeout = policy.get('timeout', DEFAULT_TIMEOUT)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=policy.get('pool_connections', 10),
+            pool_maxsize=policy.get('pool_maxsize', 10),
+            max_retries=policy.get('retries', 0)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def configure(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        cookie_domain: Optional[str] = None
+    ) -> None:
+        """设置该上游所有请求共用的请求头和Cookie"""
+        if headers:
+            self.session.headers.update(headers)
+        for key, value in (cookies or {}).items():
+            if value:
+                self.session.cookies.set(key, value, domain=cookie_domain or '')
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_clients: Dict[str, HttpClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str) -> HttpClient:
+    """获取上游服务对应的共享客户端"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = HttpClient(name, UPSTREAM_POLICIES.get(name, {}))
+                _clients[name] = client
+    return client
+
+
+def close_clients() -> None:
+    """关闭所有连接池"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
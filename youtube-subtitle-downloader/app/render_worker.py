@@ -0,0 +1,104 @@
+"""
+CPU 密集的渲染任务
+这些函数既可以在请求线程中直接调用，也可以通过 utils.process_pool 在子进程中执行：
+模块只依赖 python-docx 和 utils 中的纯计算模块，不导入 Flask 应用；
+docx 由子进程直接写入磁盘上的临时文件，只把路径、大小和摘要传回请求进程
+"""
+
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from utils.staged_file import stage_file
+from utils.docx_writer import append_paragraphs, new_document
+from utils.textrank import extract_key_points
+
+
+def init_worker():
+    """子进程启动时预热：加载 docx 模板到缓存"""
+    new_document()
+
+
+def build_docx(transcript_text, title, video_info=None, include_summary=True, key_points=()):
+    """生成下载用的 docx 文档；核心观点由调用方传入（可能来自 AI，子进程中不请求网络）"""
+    doc = new_document()
+
+    doc.add_heading(title, 0)
+
+    if video_info and include_summary:
+        doc.add_heading('📺 视频信息', level=1)
+
+        info_data = [
+            ('📅 发布时间', video_info.get('published', '未知')),
+            ('🔗 视频链接', video_info.get('url', '未知')),
+            ('📺 发布账号', video_info.get('channel', '未知')),
+            ('👁️ 观看次数', f"{video_info.get('view_count', 0):,}"),
+            ('👍 点赞数量', f"{video_info.get('like_count', 0):,}"),
+            ('⏱️ 视频时长', f"{video_info.get('duration', 0)//60} 分钟"),
+        ]
+
+        for label, value in info_data:
+            p = doc.add_paragraph()
+            p.add_run(f"{label}: ").bold = True
+            p.add_run(str(value))
+
+        doc.add_paragraph('')
+
+        doc.add_heading('📝 内容摘要', level=1)
+
+        doc.add_paragraph('【视频简介】')
+        description = video_info.get('description', '无')
+        if len(description) > 500:
+            description = description[:500] + '...'
+        doc.add_paragraph(description)
+
+        doc.add_paragraph('')
+        doc.add_paragraph('【核心观点】')
+        doc.add_paragraph('（以下为AI根据字幕内容自动提取，仅供参考）')
+
+        for i, point in enumerate(key_points[:8], 1):
+            doc.add_paragraph(f"{i}. {point}")
+
+        doc.add_paragraph('')
+
+        doc.add_heading('📋 字幕内容', level=1)
+
+    doc.add_paragraph(f'生成时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+    doc.add_paragraph('')
+
+    append_paragraphs(doc, transcript_text.split('\n'), style=None)
+
+    return doc
+
+
+def render_docx(scratch_dir, transcript_text, title, video_info, include_summary, key_points):
+    """
+    生成 docx 并写入 scratch_dir 下的临时文件
+
+    Args:
+        scratch_dir: 临时文件目录（与产物缓存在同一文件系统时可直接改名移入缓存）
+
+    Returns:
+        StagedFile
+    """
+    doc = build_docx(transcript_text, title, video_info, include_summary, key_points)
+    fd, path = tempfile.mkstemp(suffix='.render.tmp', dir=scratch_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            doc.save(f)
+        return stage_file(path)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def split_sentences(text):
+    """按句末标点断句，每句一行"""
+    sentences = re.split(r'[。！？!?]+', text)
+    return '\n'.join(s.strip() for s in sentences if s.strip())
+
+
+def key_points(text, top_k=8):
+    """本地 TextRank 提取核心观点"""
+    return extract_key_points(text, top_k=top_k)
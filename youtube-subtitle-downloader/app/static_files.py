@@ -0,0 +1,100 @@
+"""
+静态文件服务
+启动时把静态文件预压缩为 .gz（安装了 brotli 时另生成 .br），按 Accept-Encoding 直接返回压缩版本，
+请求时不再压缩；HTML 每次协商缓存（ETag），其余资源带长期缓存头
+"""
+
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小于该字节数的文件压缩收益不明显，不生成压缩版本
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# (Content-Encoding, 扩展名)，按优先顺序
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _compressible(path):
+    mimetype, _ = mimetypes.guess_type(path)
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def precompress(directory):
+    """
+    为目录下可压缩的静态文件生成 .gz / .br，已是最新的跳过
+
+    Args:
+        directory: 静态文件目录
+
+    Returns:
+        新生成的压缩文件数
+    """
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(('.gz', '.br')) or not _compressible(path):
+                continue
+            if os.path.getsize(path) < MIN_COMPRESS_BYTES:
+                continue
+            mtime = os.path.getmtime(path)
+            stale = [
+                (encoding, path + suffix) for encoding, suffix in ENCODINGS
+                if (encoding != 'br' or brotli is not None)
+                and not (os.path.exists(path + suffix) and os.path.getmtime(path + suffix) >= mtime)
+            ]
+            if not stale:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding, target in stale:
+                compressed = brotli.compress(data) if encoding == 'br' else gzip.compress(data, 9, mtime=0)
+                with open(target + '.tmp', 'wb') as out:
+                    out.write(compressed)
+                os.replace(target + '.tmp', target)
+                written += 1
+    return written
+
+
+def send_static(directory, filename, max_age):
+    """
+    返回静态文件；客户端支持且存在最新的预压缩版本时返回压缩版本
+
+    Args:
+        directory: 静态文件目录
+        filename: 相对路径
+        max_age: 非 HTML 文件的缓存秒数；HTML 总是 no-cache（依靠 ETag 返回 304）
+    """
+    path = os.path.join(directory, filename)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    is_html = mimetype == 'text/html'
+    served, encoding = filename, None
+    if os.path.isfile(path) and _compressible(path):
+        accepted = request.accept_encodings
+        for candidate, suffix in ENCODINGS:
+            variant = path + suffix
+            if accepted[candidate] and os.path.isfile(variant) and os.path.getmtime(variant) >= os.path.getmtime(path):
+                served, encoding = filename + suffix, candidate
+                break
+
+    response = send_from_directory(directory, served, mimetype=mimetype, max_age=0 if is_html else max_age)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        # send_from_directory 按实际文件名（*.gz）生成，避免浏览器按压缩文件处理
+        response.headers.pop('Content-Disposition', None)
+    if _compressible(path):
+        response.vary.add('Accept-Encoding')
+    if is_html:
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    return response
@@ -0,0 +1,80 @@
+"""
+流式写出模块
+txt/json 下载按块生成（srt/vtt 由 utils.subtitles 生成），不在内存中拼出完整文件再整体编码；
+小片段攒成约 64KB 的块后编码，超长的字幕正文按切片编码
+"""
+
+import json
+from typing import Any, Iterable, Iterator, List
+
+CHUNK_SIZE = 64 * 1024
+
+
+def encode_chunks(parts: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    把字符串片段合并成约 chunk_size 字符的 UTF-8 块
+
+    Args:
+        parts: 字符串片段
+        chunk_size: 每块的字符数
+
+    Returns:
+        bytes 块的生成器
+    """
+    buffer: List[str] = []
+    size = 0
+    for part in parts:
+        if len(part) >= chunk_size:
+            if buffer:
+                yield ''.join(buffer).encode('utf-8')
+                buffer, size = [], 0
+            for i in range(0, len(part), chunk_size):
+                yield part[i:i + chunk_size].encode('utf-8')
+            continue
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def iter_summary_text(
+    title: str,
+    info_lines: Iterable[str],
+    description: str,
+    key_points: Iterable[str],
+    transcript_text: str
+) -> Iterator[str]:
+    """
+    逐段生成带视频信息和核心观点的 txt
+
+    Args:
+        title: 标题
+        info_lines: 【视频信息】下的各行
+        description: 视频简介（超过500字截断）
+        key_points: 核心观点
+        transcript_text: 字幕正文
+
+    Returns:
+        文本片段
+    """
+    rule = "=" * 60 + "\n"
+    yield rule + title + "\n" + rule + "\n"
+    yield "【视频信息】\n"
+    for line in info_lines:
+        yield line + "\n"
+    if len(description) > 500:
+        description = description[:500] + '...'
+    yield "\n【视频简介】\n" + description + "\n\n"
+    yield "【核心观点】\n（以下为AI根据字幕内容自动提取，仅供参考）\n"
+    for i, point in enumerate(list(key_points)[:8], 1):
+        yield f"{i}. {point}\n"
+    yield "\n" + rule + "【字幕内容】\n" + rule + "\n"
+    yield transcript_text
+
+
+def iter_json(data: Any) -> Iterator[str]:
+    """用 JSONEncoder.iterencode 逐个 token 生成缩进的 JSON，配合 encode_chunks 合并成块"""
+    return json.JSONEncoder(ensure_ascii=False, indent=2).iterencode(data)
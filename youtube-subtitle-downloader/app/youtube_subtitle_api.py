@@ -5,14 +5,50 @@ import sys
 config_dir = os.path.join(os.path.dirname(__file__), '..', 'config')
 sys.path.insert(0, config_dir)
 
-from flask import Flask, request, jsonify, send_file
+# 应用目录（http_client 等同级模块）
+app_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, app_dir)
+
+# 将项目根目录添加到路径，复用 services/utils 中的共享模块
+project_root = os.path.join(os.path.dirname(__file__), '..', '..')
+sys.path.insert(0, project_root)
+
+from flask import Flask, Response, make_response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-import yt_dlp
+import hashlib
 import json
 import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from docx import Document
-from io import BytesIO
+from functools import wraps
+from urllib.parse import quote
+
+from services.ytdlp_pool import (
+    METADATA_PROFILE,
+    SUBTITLES_PROFILE,
+    best_thumbnail,
+    close_all_pools,
+    extract_with_profile,
+    prewarm_profiles
+)
+from core.llm_router import create_router
+from core.rate_limiter import BudgetExceededError
+from utils.admission import AdmissionLimiter, Overloaded
+from utils.artifact_cache import ArtifactCache, StagedFile, make_key, read_chunks
+from utils.cache import TTLCache
+from utils.extractive import select_sentences
+from utils.process_pool import ProcessPool
+from utils.swr import StaleWhileRevalidate
+from utils.subtitles import (
+    EMITTERS as SUBTITLE_EMITTERS, normalize_segments, parse_bilibili, parse_subtitles, subtitle_text
+)
+from http_client import close_clients, get_client
+from writers import encode_chunks, iter_json, iter_summary_text
+from danmaku import fetch_danmaku
+import render_worker
+from static_files import precompress, send_static
 
 app = Flask(__name__)
 CORS(app)
@@ -34,209 +70,86 @@ def extract_video_id(url):
 def get_video_info(video_id):
     url = f'https://www.youtube.com/watch?v={video_id}'
     
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'skip_download': True,
-    }
-    
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            info = ydl.extract_info(url, download=False)
-            
-            video_data = {
-                'video_id': video_id,
-                'title': info.get('title', ''),
-                'url': url,
-                'thumbnail': info.get('thumbnail', ''),
-                'channel': info.get('channel', ''),
-                'channel_url': info.get('channel_url', ''),
-                'views': info.get('view_count', 0),
-                'duration': info.get('duration', 0),
-                'published': info.get('upload_date', ''),
-                'description': info.get('description', ''),
-                'view_count': info.get('view_count', 0),
-                'like_count': info.get('like_count', 0),
-                'comment_count': info.get('comment_count', 0),
-                'channel_id': info.get('channel_id', ''),
-                'channel_follower_count': info.get('channel_follower_count', 0),
-                'upload_date': info.get('upload_date', ''),
-                'categories': info.get('categories', []),
-                'tags': info.get('tags', []),
-            }
-            
-            return video_data
-        except Exception as e:
-            print(f"Error fetching video info: {e}")
-            return None
+    try:
+        info = extract_with_profile(url, METADATA_PROFILE)
+        
+        video_data = {
+            'video_id': video_id,
+            'title': info.get('title', ''),
+            'url': url,
+            'thumbnail': best_thumbnail(info),
+            'channel': info.get('channel', ''),
+            'channel_url': info.get('channel_url', ''),
+            'views': info.get('view_count', 0),
+            'duration': info.get('duration', 0),
+            'published': info.get('upload_date', ''),
+            'description': info.get('description', ''),
+            'view_count': info.get('view_count', 0),
+            'like_count': info.get('like_count', 0),
+            'comment_count': info.get('comment_count', 0),
+            'channel_id': info.get('channel_id', ''),
+            'channel_follower_count': info.get('channel_follower_count', 0),
+            'upload_date': info.get('upload_date', ''),
+            'categories': info.get('categories', []),
+            'tags': info.get('tags', []),
+        }
+        
+        return video_data
+    except Exception as e:
+        print(f"Error fetching video info: {e}")
+        return None
 
 def get_transcript(video_id, language='en'):
     url = f'https://www.youtube.com/watch?v={video_id}'
     
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'skip_download': True,
-        'writesubtitles': True,
-        'writeautomaticsub': True,
-        'subtitleslangs': [language],
-    }
-    
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        try:
-            info = ydl.extract_info(url, download=False)
+    try:
+        info = extract_with_profile(url, SUBTITLES_PROFILE)
+        
+        if 'subtitles' in info and language in info['subtitles']:
+            subtitle_url = info['subtitles'][language][0]['url']
+        elif 'automatic_captions' in info and language in info['automatic_captions']:
+            subtitle_url = info['automatic_captions'][language][0]['url']
+        else:
+            # 尝试模糊匹配语言
+            subs = info.get('subtitles', {}) or {}
+            auto_subs = info.get('automatic_captions', {}) or {}
             
-            if 'subtitles' in info and language in info['subtitles']:
-                subtitle_url = info['subtitles'][language][0]['url']
-            elif 'automatic_captions' in info and language in info['automatic_captions']:
-                subtitle_url = info['automatic_captions'][language][0]['url']
+            # 查找包含该语言前缀的字幕
+            for key in list(subs.keys()) + list(auto_subs.keys()):
+                if key.startswith(language.split('-')[0]):
+                    subtitle_url = (subs.get(key) or auto_subs.get(key))[0]['url']
+                    break
             else:
-                # 尝试模糊匹配语言
-                subs = info.get('subtitles', {}) or {}
-                auto_subs = info.get('automatic_captions', {}) or {}
-                
-                # 查找包含该语言前缀的字幕
-                for key in list(subs.keys()) + list(auto_subs.keys()):
-                    if key.startswith(language.split('-')[0]):
-                        subtitle_url = (subs.get(key) or auto_subs.get(key))[0]['url']
-                        break
-                else:
-                    return None
-            
-            import requests
-            response = requests.get(subtitle_url)
-            return response.text
-        except Exception as e:
-            print(f"Error fetching transcript: {e}")
-            return None
-
-def parse_srt_to_text(srt_content):
-    import json
-    
-    if not srt_content:
-        return ""
-    
-    try:
-        data = json.loads(srt_content)
+                return None
         
-        if 'events' in data:
-            text_lines = []
-            for event in data.get('events', []):
-                segs = event.get('segs', [])
-                for seg in segs:
-                    if 'utf8' in seg:
-                        text = seg['utf8'].strip()
-                        if text:
-                            text_lines.append(text)
-            return ' '.join(text_lines)
-    except (json.JSONDecodeError, TypeError):
-        pass
-    
-    lines = srt_content.split('\n')
-    text_lines = []
-    
-    for line in lines:
-        line = line.strip()
-        if line and not line.isdigit() and '-->' not in line:
-            text_lines.append(line)
-    
-    return '\n'.join(text_lines)
+        response = get_client('youtube').get(subtitle_url)
+        return response.text
+    except Exception as e:
+        print(f"Error fetching transcript: {e}")
+        return None
 
-def format_srt_time(seconds):
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds * 1000) % 1000)
-    
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+def parse_srt_to_text(srt_content):
+    """字幕（json3/SRT/VTT）转纯文本；自动字幕去掉滚动重复、合并碎片后每句一行"""
+    return subtitle_text(srt_content, normalize=True)
 
 def create_srt_content(transcript_data):
-    if isinstance(transcript_data, str):
-        return transcript_data
-    
-    srt_content = []
-    for i, entry in enumerate(transcript_data, 1):
-        start_time = entry.get('start', 0)
-        duration = entry.get('duration', 0)
-        text = entry.get('text', '')
-        
-        srt_content.append(str(i))
-        srt_content.append(f"{format_srt_time(start_time)} --> {format_srt_time(start_time + duration)}")
-        srt_content.append(text)
-        srt_content.append('')
-    
-    return '\n'.join(srt_content)
+    """任意支持的字幕格式（json3/SRT/VTT 文本、字幕条目列表）转 SRT"""
+    return ''.join(SUBTITLE_EMITTERS['srt'](parse_subtitles(transcript_data)))
 
-def create_docx(transcript_text, title, video_info=None, include_summary=True):
-    doc = Document()
-    
-    doc.add_heading(title, 0)
-    
-    if video_info and include_summary:
-        doc.add_heading('📺 视频信息', level=1)
-        
-        info_data = [
-            ('📅 发布时间', video_info.get('published', '未知')),
-            ('🔗 视频链接', video_info.get('url', '未知')),
-            ('📺 发布账号', video_info.get('channel', '未知')),
-            ('👁️ 观看次数', f"{video_info.get('view_count', 0):,}"),
-            ('👍 点赞数量', f"{video_info.get('like_count', 0):,}"),
-            ('⏱️ 视频时长', f"{video_info.get('duration', 0)//60} 分钟"),
-        ]
-        
-        for label, value in info_data:
-            p = doc.add_paragraph()
-            p.add_run(f"{label}: ").bold = True
-            p.add_run(str(value))
-        
-        doc.add_paragraph('')
-        
-        doc.add_heading('📝 内容摘要', level=1)
-        
-        doc.add_paragraph('【视频简介】')
-        description = video_info.get('description', '无')
-        if len(description) > 500:
-            description = description[:500] + '...'
-        doc.add_paragraph(description)
-        
-        doc.add_paragraph('')
-        doc.add_paragraph('【核心观点】')
-        doc.add_paragraph('（以下为AI根据字幕内容自动提取，仅供参考）')
-        
-        use_gpt = bool(os.environ.get('OPENAI_API_KEY', '') or os.environ.get('SILICONFLOW_API_KEY', ''))
-        
-        # 也检查配置文件
-        if not use_gpt:
-            try:
-                from api_config import SILICONFLOW_API_KEY
-                use_gpt = bool(SILICONFLOW_API_KEY)
-            except:
-                pass
-        
-        keywords = extract_key_points(transcript_text, use_gpt=use_gpt)
-        for i, point in enumerate(keywords[:8], 1):
-            doc.add_paragraph(f"{i}. {point}")
-        
-        doc.add_paragraph('')
-        
-        doc.add_heading('📋 字幕内容', level=1)
-    
-    doc.add_paragraph(f'生成时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-    doc.add_paragraph('')
-    
-    for line in transcript_text.split('\n'):
-        if line.strip():
-            doc.add_paragraph(line)
-    
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer
+def create_docx(transcript_text, title, video_info=None, include_summary=True, key_points=None):
+    """
+    渲染 docx 下载文件，返回 StagedFile
+
+    文档在进程池中生成并写到缓存目录下的临时文件，只回传路径；写入缓存时直接改名移入
+    """
+    if key_points is None and video_info and include_summary:
+        key_points, _ = get_key_points(transcript_text)
+    return run_cpu(
+        render_worker.render_docx, RENDER_SCRATCH_DIR, transcript_text, title, video_info, include_summary,
+        key_points or []
+    )
 
 def extract_key_points(text, use_gpt=False):
-    import re
-    from collections import Counter
-    
     if not text or len(text) < 50:
         return ["内容太短，无法提取核心观点"]
     
@@ -246,194 +159,138 @@ def extract_key_points(text, use_gpt=False):
         if ai_points and ai_points[0] not in ["内容太短，无法提取核心观点", "未能提取核心观点"]:
             return ai_points
     
-    text = re.sub(r'\s+', ' ', text)
-    
-    # 提取关键主题
-    themes = {
-        '中美关系': [],
-        '台湾问题': [],
-        '川习会': [],
-        '普京/俄罗斯': [],
-        '经济贸易': [],
-        '国际局势': []
-    }
-    
-    # 关键模式匹配
-    theme_patterns = {
-        '中美关系': ['中美', '中美关系', '中国大陆', '美国', '特朗普', '中国'],
-        '台湾问题': ['台湾', '台海', '对台军售', '军售', '一中', '一个中国'],
-        '川习会': ['川习会', '习近平', '特朗普', '北京', '会面', '访问', '峰会'],
-        '普京/俄罗斯': ['普京', '俄罗斯', '俄罗', '普丁'],
-        '经济贸易': ['稀土', '大豆', '石油', '天然气', '贸易', '关税', '经济', '购买'],
-        '国际局势': ['伊朗', '印度', '日本', '选举', '战争', '和谈']
-    }
-    
-    # 智能断句
-    sentences = re.split(r'[。！？!?\n]+', text)
-    processed = []
-    for s in sentences:
-        s = s.strip()
-        if not s or len(s) < 6:
-            continue
-        # 长句按逗号拆分
-        if len(s) > 60 and '，' in s:
-            parts = s.split('，')
-            for p in parts:
-                p = p.strip()
-                if len(p) > 12:
-                    processed.append(p)
-        else:
-            processed.append(s)
-    
-    sentences = processed
-    
-    # 对每个主题找相关句子
-    for theme, keywords in theme_patterns.items():
-        for sent in sentences:
-            for kw in keywords:
-                if kw in sent and len(sent) > 15:
-                    if sent not in themes[theme]:
-                        themes[theme].append(sent)
-                    break
-    
-    # 提取高分句子
-    high_value = ['关键', '重要', '核心', '主要', '原因', '因为', '结论', '所以', '因此', 
-                  '认为', '预测', '估计', '分析', '显示', '表明', '趋势', '未来', '必须']
-    
-    scored = []
-    filler = ['嗯', '啊', '这个', '那个', '好吧', '是的']
-    
-    for i, sent in enumerate(sentences):
-        score = 0
-        length = len(sent)
-        
-        if 15 <= length <= 70:
-            score += 2
-        if length > 100:
-            score -= 1
-        
-        for hv in high_value:
-            if hv in sent:
-                score += 2
-        
-        for f in filler:
-            if sent.startswith(f):
-                score -= 2
-                break
-        
-        if i < 5:
-            score += 2
-        if i > len(sentences) * 0.8:
-            score += 2
-        
-        if score > 0:
-            scored.append((sent, score))
-    
-    scored.sort(key=lambda x: x[1], reverse=True)
-    
-    # 构建高质量摘要
-    result = []
-    used = set()
-    
-    # 优先从主题相关句子中选择
-    for theme, theme_sents in themes.items():
-        if len(result) >= 6:
-            break
-        for sent in theme_sents[:3]:
-            if len(result) >= 6:
-                break
-            # 清理
-            cleaned = sent.strip()
-            for f in filler:
-                if cleaned.startswith(f):
-                    cleaned = cleaned[len(f):].strip()
-                    break
-            
-            if not cleaned or len(cleaned) < 12:
-                continue
-            
-            key = cleaned[:20]
-            if key in used:
-                continue
-            
-            # 精简
-            if len(cleaned) > 45:
-                for p in '。；,':
-                    if p in cleaned[20:]:
-                        idx = cleaned.index(p, 20)
-                        if idx < 42:
-                            cleaned = cleaned[:idx+1]
-                            break
-                else:
-                    cleaned = cleaned[:42] + '...'
-            
-            if len(cleaned) > 10:
-                result.append(cleaned)
-                used.add(key)
-    
-    # 补充高分句子
-    for sent, score in scored:
-        if len(result) >= 8:
-            break
-        
-        cleaned = sent.strip()
-        for f in filler:
-            if cleaned.startswith(f):
-                cleaned = cleaned[len(f):].strip()
-                break
-        
-        if len(cleaned) < 12:
-            continue
-        
-        key = cleaned[:20]
-        if key in used:
-            continue
-        
-        if len(cleaned) > 45:
-            cleaned = cleaned[:42] + '...'
-        
-        result.append(cleaned)
-        used.add(key)
-    
-    # 后处理 - 合成更精炼的观点
-    final_points = []
-    for point in result[:8]:
-        # 去除开头无意义词
-        point = re.sub(r'^(?:嗯|啊|这个|那个|那么|就是|其实|好吧),*\s*', '', point)
-        point = point.strip()
-        if len(point) > 8:
-            final_points.append(point)
-    
-    return final_points[:8] if final_points else ["未能提取核心观点"]
+    return local_key_points(text)
 
-def generate_gpt_summary(text, fallback_points):
-    """使用AI生成高质量摘要 - 支持硅基流动和OpenAI"""
+
+def local_key_points(text):
+    """本地 TextRank 提取，不依赖网络和领域词表"""
+    if not text or len(text) < 50:
+        return ["内容太短，无法提取核心观点"]
+    points = run_cpu(render_worker.key_points, text, size=len(text))
+    return points if points else ["未能提取核心观点"]
+
+
+# 核心观点模式：swr 先返回本地提取结果、后台生成AI观点；blocking 等待AI结果
+KEY_POINTS_MODE = os.environ.get('KEY_POINTS_MODE', 'swr')
+KEY_POINTS_CACHE_TTL = 7 * 24 * 3600
+# 本地提取观点的产物超过该秒数仍没有AI观点时重新构建（负责后台生成的 worker 可能已退出）
+KEY_POINTS_RETRY_SECONDS = 600
+key_points_cache = StaleWhileRevalidate(
+    ttl=KEY_POINTS_CACHE_TTL, maxsize=512, max_workers=2, name='key-points'
+)
+
+
+def transcript_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def key_points_key(text_hash):
+    return make_key(kind='key_points', text_hash=text_hash)
+
+
+def load_shared_key_points(text_hash):
+    """
+    读取写在产物缓存目录中的AI观点
+
+    后台生成的AI观点同时写入磁盘，其他 gunicorn worker 和重启后的进程也能拿到升级后的版本
+
+    Returns:
+        观点列表，未生成或关闭了产物缓存时返回 None
+    """
+    if artifact_cache is None or not text_hash:
+        return None
+    artifact = artifact_cache.get(key_points_key(text_hash))
+    if artifact is None:
+        return None
     try:
-        import os
-        import sys
-        import requests
-        import re
-        
-        # 优先从环境变量获取，其次从配置文件读取
+        with open(artifact.path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_shared_key_points(text_hash, points):
+    """把AI观点写入产物缓存目录，供其他 worker 读取"""
+    if artifact_cache is None:
+        return
+    try:
+        artifact_cache.put(
+            key_points_key(text_hash),
+            json.dumps(points, ensure_ascii=False).encode('utf-8'),
+            mimetype='application/json'
+        )
+    except OSError as e:
+        print(f"写入AI观点缓存失败: {e}")
+
+
+def get_key_points(text):
+    """
+    下载接口使用的核心观点，返回 (观点列表, 来源)
+
+    AI观点已缓存（本进程内存或产物缓存目录）时直接返回（来源 llm）；否则立即返回本地提取结果（来源 extractive），
+    同时在后台请求AI，完成后写入缓存，之后的下载（包括其他 worker 处理的）拿到升级后的版本。
+    下载延迟因此不再受 LLM 长尾延迟影响。
+    """
+    if not text or len(text) < 50 or not has_llm_provider():
+        return local_key_points(text), 'extractive'
+    
+    if KEY_POINTS_MODE == 'blocking':
+        points = generate_gpt_summary(text, [])
+        return (points, 'llm') if points else (local_key_points(text), 'extractive')
+    
+    text_hash = transcript_hash(text)
+    points = key_points_cache.peek(text_hash) or load_shared_key_points(text_hash)
+    if points:
+        return points, 'llm'
+
+    def refresh():
+        points = generate_gpt_summary(text, [])
+        if not points:
+            return None
+        save_shared_key_points(text_hash, points)
+        return points
+
+    points, upgraded = key_points_cache.get(
+        text_hash,
+        fallback=lambda: local_key_points(text),
+        refresh=refresh
+    )
+    return points, 'llm' if upgraded else 'extractive'
+
+_llm_router = None
+
+
+def get_llm_router():
+    """获取摘要使用的LLM路由，硅基流动 Key 也可以来自配置文件"""
+    global _llm_router
+    if _llm_router is None:
         silicon_key = os.environ.get('SILICONFLOW_API_KEY', '')
-        openai_key = os.environ.get('OPENAI_API_KEY', '')
-        
-        # 从配置文件读取
-        if not silicon_key and not openai_key:
+        if not silicon_key:
             try:
                 from api_config import SILICONFLOW_API_KEY
                 silicon_key = SILICONFLOW_API_KEY or ''
             except:
                 pass
-        
-        api_key = silicon_key or openai_key
-        if not api_key:
-            return fallback_points
-        
-        # 截取文本前8000字符（减少以提高响应速度）
-        text_sample = text[:8000]
-        
-        prompt = f"""你是一个专业的知识提炼专家。请分析以下视频字幕内容，提取6-8个核心观点。
+        _llm_router = create_router(
+            siliconflow_api_key=silicon_key or None,
+            openai_api_key=os.environ.get('OPENAI_API_KEY') or None
+        )
+    return _llm_router
+
+
+def has_llm_provider():
+    return bool(get_llm_router().providers)
+
+
+# 核心观点提示词中字幕部分的 token 预算
+KEY_POINTS_TOKEN_BUDGET = 2500
+
+
+def build_key_points_prompt(text):
+    # 从全文中按 token 预算挑选信息量最高的句子，而不是只截取开头
+    text_sample = select_sentences(text, token_budget=KEY_POINTS_TOKEN_BUDGET)
+    
+    return f"""你是一个专业的知识提炼专家。请分析以下视频字幕内容，提取6-8个核心观点。
 
 要求：
 1. 每个观点要用一句话概括，25-45字
@@ -451,81 +308,72 @@ def generate_gpt_summary(text, fallback_points):
 3. [核心观点3]
 ...
 """
+
+
+def parse_key_point(line):
+    """解析AI输出的一行，是编号/列表项时返回去掉序号的观点，否则返回None"""
+    line = line.strip()
+    if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
+        # 去掉序号
+        cleaned = re.sub(r'^[0-9]+[.、)\]】\s]+', '', line)
+        cleaned = re.sub(r'^[-•]\s*', '', cleaned)
+        cleaned = cleaned.strip()
+        if cleaned and len(cleaned) > 10:
+            return cleaned
+    return None
+
+
+def generate_gpt_summary(text, fallback_points):
+    """使用AI生成高质量摘要 - 智谱/硅基流动/OpenAI 自动路由"""
+    try:
+        router = get_llm_router()
+        if not router.providers:
+            return fallback_points
         
-        # 判断使用哪个API
-        if silicon_key:
-            base_url = "https://api.siliconflow.cn/v1"
-            model = "Qwen/QwQ-32B"
-        else:
-            base_url = "https://api.openai.com/v1"
-            model = "gpt-3.5-turbo"
-        
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json'
-        }
+        try:
+            response = router.complete(build_key_points_prompt(text), temperature=0.7, max_tokens=1000)
+        except BudgetExceededError as e:
+            print(f"AI summary skipped: {e}")
+            return fallback_points
         
-        data = {
-            'model': model,
-            'messages': [
-                {'role': 'user', 'content': prompt}
-            ],
-            'temperature': 0.7,
-            'max_tokens': 1000
-        }
-        
-        # 添加重试机制
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    f'{base_url}/chat/completions',
-                    headers=headers,
-                    json=data,
-                    timeout=120
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result['choices'][0]['message']['content']
-                    
-                    # 解析AI输出
-                    points = []
-                    for line in content.split('\n'):
-                        line = line.strip()
-                        if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
-                            # 去掉序号
-                            cleaned = re.sub(r'^[0-9]+[.、)\]】\s]+', '', line)
-                            cleaned = re.sub(r'^[-•]\s*', '', cleaned)
-                            cleaned = cleaned.strip()
-                            if cleaned and len(cleaned) > 10:
-                                points.append(cleaned)
-                    
-                    if points:
-                        return points[:8]
-                break
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    print(f"AI summary attempt {attempt + 1} failed, retrying: {e}")
-                    import time
-                    time.sleep(2)
-                else:
-                    raise e
+        # 解析AI输出
+        points = []
+        for line in response.content.split('\n'):
+            point = parse_key_point(line)
+            if point:
+                points.append(point)
         
+        if points:
+            return points[:8]
         return fallback_points
     except Exception as e:
         print(f"AI summary error: {e}")
         return fallback_points
 
+
+def stream_gpt_key_points(text, max_points=8):
+    """流式生成核心观点，每解析出一条完整的观点就立即产出"""
+    buffer = ''
+    count = 0
+    for chunk in get_llm_router().stream(build_key_points_prompt(text), temperature=0.7, max_tokens=1000):
+        buffer += chunk
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            point = parse_key_point(line)
+            if point:
+                yield point
+                count += 1
+                if count >= max_points:
+                    return
+    point = parse_key_point(buffer)
+    if point and count < max_points:
+        yield point
+
 def smart_sentence_split(text):
-    sentences = re.split(r'[。！？!?]+', text)
-    sentences = [s.strip() for s in sentences if s.strip()]
-    return '\n'.join(sentences)
+    return run_cpu(render_worker.split_sentences, text, size=len(text))
 
 def translate_text(text, target_lang='zh-CN'):
     try:
-        import requests
-        
         lang_map = {
             'zh-CN': 'zh-CN',
             'zh-TW': 'zh-TW', 
@@ -545,7 +393,7 @@ def translate_text(text, target_lang='zh-CN'):
             'q': text[:5000]
         }
         
-        response = requests.get(url, params=params, timeout=30)
+        response = get_client('translate').get(url, params=params)
         result = response.json()
         
         translated = ''.join([item[0] for item in result[0] if item[0]])
@@ -558,7 +406,70 @@ def translate_text(text, target_lang='zh-CN'):
         print(f"Translation error: {e}")
         return text
 
+# ==================== 准入控制 ====================
+# 每个 worker 进程内限制同时处理的请求数，超出时短暂排队，排不上立即返回 503 + Retry-After。
+# 下载会抓字幕、调 LLM、渲染文件，上限较小；元数据接口较轻，单独一组更宽的上限。
+# 各组的上限与排队数之和应小于 GUNICORN_THREADS，留出线程给健康检查和静态文件；
+# 默认合计 (3+1) + (3+1) + (4+2) = 14，小于默认的16个线程
+
+def make_limiter(prefix, max_in_flight, max_queue, queue_timeout, default_retry_after):
+    """按 {prefix}_MAX_IN_FLIGHT / _MAX_QUEUE / _QUEUE_TIMEOUT 环境变量创建限流器，MAX_IN_FLIGHT=0 时不限制"""
+    return AdmissionLimiter(
+        int(os.environ.get(f'{prefix}_MAX_IN_FLIGHT', str(max_in_flight))),
+        max_queue=int(os.environ.get(f'{prefix}_MAX_QUEUE', str(max_queue))),
+        queue_timeout=float(os.environ.get(f'{prefix}_QUEUE_TIMEOUT', str(queue_timeout))),
+        name=prefix.lower(),
+        default_retry_after=default_retry_after
+    )
+
+youtube_download_limiter = make_limiter('YOUTUBE_DOWNLOAD', 3, 1, 5, default_retry_after=10)
+bilibili_download_limiter = make_limiter('BILIBILI_DOWNLOAD', 3, 1, 5, default_retry_after=10)
+metadata_limiter = make_limiter('METADATA', 4, 2, 1, default_retry_after=2)
+
+
+def overloaded_response(error):
+    """繁忙时的 503 响应"""
+    response = jsonify({'error': '服务繁忙，请稍后重试', 'retry_after': error.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def admitted(limiter, respond):
+    """
+    在 limiter 的名额内调用 respond() 生成响应，名额已满时抛出 Overloaded
+
+    流式响应（SSE、分块下载）的内容在返回之后才生成，名额保持到响应体发送完毕或客户端断开；
+    其他响应返回前即归还
+    """
+    limiter.acquire()
+    started = time.monotonic()
+    try:
+        response = make_response(respond())
+    except BaseException:
+        limiter.release(time.monotonic() - started)
+        raise
+    if response.is_streamed:
+        response.response = limiter.hold(response.response, started)
+    else:
+        limiter.release(time.monotonic() - started)
+    return response
+
+
+def admit(limiter):
+    """路由装饰器：在 limiter 的名额内处理请求，排不上时返回 503"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                return admitted(limiter, lambda: view(*args, **kwargs))
+            except Overloaded as e:
+                return overloaded_response(e)
+        return wrapper
+    return decorator
+
 @app.route('/api/video/<video_id>')
+@admit(metadata_limiter)
 def get_video(video_id):
     video_data = get_video_info(video_id)
     
@@ -567,6 +478,161 @@ def get_video(video_id):
     else:
         return jsonify({'error': 'Failed to fetch video info'}), 404
 
+# 下载格式及对应的 mimetype
+DOWNLOAD_FORMATS = {
+    'txt': 'text/plain',
+    'srt': 'text/plain',
+    'vtt': 'text/vtt',
+    'json': 'application/json',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+# 渲染产物缓存：相同视频、格式、语言、翻译和句子模式的下载直接返回磁盘上的文件
+ARTIFACT_CACHE_DIR = os.environ.get('ARTIFACT_CACHE_DIR', os.path.join(DATA_DIR, 'artifacts'))
+ARTIFACT_CACHE_MAX_MB = int(os.environ.get('ARTIFACT_CACHE_MAX_MB', '512'))
+# 设为 0 时关闭缓存，下载内容以分块传输直接流式写入响应
+artifact_cache = (
+    ArtifactCache(ARTIFACT_CACHE_DIR, max_bytes=ARTIFACT_CACHE_MAX_MB * 1024 * 1024)
+    if ARTIFACT_CACHE_MAX_MB > 0 else None
+)
+
+# docx 渲染、TextRank、断句在子进程中执行，不占用请求进程的 GIL；CPU_POOL_WORKERS=0 时在请求线程内执行
+CPU_POOL_WORKERS = int(os.environ.get('CPU_POOL_WORKERS', str(os.cpu_count() or 1)))
+# 短文本的计算比进程间传输还快，低于该字符数时不交给进程池
+CPU_OFFLOAD_MIN_CHARS = int(os.environ.get('CPU_OFFLOAD_MIN_CHARS', '20000'))
+# 子进程写出渲染结果的目录，与产物缓存同一目录时写入缓存只需改名
+RENDER_SCRATCH_DIR = ARTIFACT_CACHE_DIR if artifact_cache is not None else tempfile.gettempdir()
+cpu_pool = (
+    ProcessPool(CPU_POOL_WORKERS, initializer=render_worker.init_worker, max_tasks_per_child=500, name='render')
+    if CPU_POOL_WORKERS > 0 else None
+)
+
+
+def run_cpu(fn, *args, size=None):
+    """
+    执行 CPU 密集任务：进程池开启且输入不小于 CPU_OFFLOAD_MIN_CHARS（size 为 None 时总是）时在子进程执行
+
+    fn 须为 render_worker 中的模块级函数
+    """
+    if cpu_pool is None or (size is not None and size < CPU_OFFLOAD_MIN_CHARS):
+        return fn(*args)
+    return cpu_pool.run(fn, *args)
+
+
+class DownloadError(Exception):
+    """下载失败，携带返回给前端的错误信息，不会写入产物缓存"""
+
+    def __init__(self, payload, status=404):
+        super().__init__(payload.get('error'))
+        self.payload = payload
+        self.status = status
+
+
+def make_artifact(content, format_type, download_name, transcript_text=None, summary_source=None):
+    """
+    打包 (内容, 元数据) 交给产物缓存，含核心观点的产物记录观点来源
+
+    content 可以是 StagedFile（进程池渲染好的 docx）、bytes、str，或按片段产出 str 的生成器；
+    文本内容按块编码，缓存逐块写盘或直接流式写入响应，不在内存中拼出完整文件
+    """
+    if isinstance(content, StagedFile):
+        pass
+    elif isinstance(content, str):
+        content = encode_chunks((content,))
+    elif not isinstance(content, bytes):
+        content = encode_chunks(content)
+    meta = {'mimetype': DOWNLOAD_FORMATS[format_type], 'download_name': download_name}
+    if summary_source:
+        meta['summary_source'] = summary_source
+        meta['text_hash'] = transcript_hash(transcript_text)
+        meta['built_at'] = time.time()
+    return content, meta
+
+
+def artifact_is_fresh(meta):
+    """
+    产物中是本地提取的观点时，以下情况需要重新渲染：
+    AI观点已在后台生成完毕（本进程或其他 worker 写入的）；
+    或超过 KEY_POINTS_RETRY_SECONDS 仍未生成——发起后台任务的 worker 可能已被回收，
+    重新构建时由当前 worker 再次发起
+    """
+    if meta.get('summary_source') != 'extractive':
+        return True
+    text_hash = meta.get('text_hash')
+    if key_points_cache.peek(text_hash) is not None or load_shared_key_points(text_hash) is not None:
+        return False
+    return time.time() - meta.get('built_at', 0) < KEY_POINTS_RETRY_SECONDS
+
+
+def serve_artifact(artifact):
+    """返回缓存的产物文件；If-None-Match 与 ETag 一致时返回 304"""
+    if request.if_none_match.contains(artifact.etag):
+        response = Response(status=304)
+    else:
+        response = send_file(
+            artifact.path,
+            mimetype=artifact.meta['mimetype'],
+            as_attachment=True,
+            download_name=artifact.meta['download_name'],
+            etag=False,
+            conditional=False
+        )
+    response.set_etag(artifact.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    exposed = ['Content-Disposition', 'ETag']
+    # extractive 表示AI版本仍在后台生成，稍后重新下载即可获得
+    if 'summary_source' in artifact.meta:
+        response.headers['X-Summary-Source'] = artifact.meta['summary_source']
+        exposed.append('X-Summary-Source')
+    response.headers['Access-Control-Expose-Headers'] = ', '.join(exposed)
+    return response
+
+
+def content_disposition(download_name):
+    try:
+        download_name.encode('ascii')
+        return f'attachment; filename="{download_name}"'
+    except UnicodeEncodeError:
+        return f"attachment; filename*=UTF-8''{quote(download_name)}"
+
+
+def stream_download(content, meta):
+    """不经缓存，以分块传输把内容直接流式写入响应"""
+    if isinstance(content, StagedFile):
+        content = read_chunks(content.path, remove=True)
+    elif isinstance(content, bytes):
+        content = (content,)
+    headers = {'Content-Disposition': content_disposition(meta['download_name'])}
+    exposed = ['Content-Disposition']
+    if 'summary_source' in meta:
+        headers['X-Summary-Source'] = meta['summary_source']
+        exposed.append('X-Summary-Source')
+    headers['Access-Control-Expose-Headers'] = ', '.join(exposed)
+    return Response(content, mimetype=meta['mimetype'], headers=headers)
+
+
+def download_from_cache(params, build, limiter):
+    """
+    按请求参数查缓存，未命中时构建；并发的相同请求只构建一次
+
+    只有实际构建占用 limiter 的名额：缓存命中和等待同一构建的请求不受限；
+    名额已满时返回 503，等待同一构建的请求也一并返回 503。
+    关闭缓存时内容边生成边发送，名额保持到响应体发送完毕
+    """
+    def limited_build():
+        with limiter.slot():
+            return build()
+
+    try:
+        if artifact_cache is None:
+            return admitted(limiter, lambda: stream_download(*build()))
+        artifact = artifact_cache.get_or_build(make_key(**params), limited_build, is_fresh=artifact_is_fresh)
+    except DownloadError as e:
+        return jsonify(e.payload), e.status
+    except Overloaded as e:
+        return overloaded_response(e)
+    return serve_artifact(artifact)
+
 @app.route('/api/download', methods=['POST'])
 def download():
     data = request.json
@@ -578,7 +644,24 @@ def download():
     
     if not video_id:
         return jsonify({'error': 'Video ID is required'}), 400
+    if format_type not in DOWNLOAD_FORMATS:
+        return jsonify({'error': 'Invalid format'}), 400
     
+    return download_from_cache(
+        {
+            'source': 'youtube',
+            'video_id': video_id,
+            'format': format_type,
+            'language': language,
+            'translate': translate,
+            'sentence': sentence_mode,
+        },
+        lambda: build_youtube_download(video_id, format_type, language, translate, sentence_mode),
+        youtube_download_limiter
+    )
+
+def build_youtube_download(video_id, format_type, language, translate, sentence_mode):
+    """获取字幕并渲染下载文件，返回 (内容, 元数据)"""
     srt_content = get_transcript(video_id, language)
     
     if not srt_content:
@@ -587,26 +670,25 @@ def download():
     if not srt_content:
         # 检查是否有自动字幕
         try:
-            import yt_dlp
             url = f'https://www.youtube.com/watch?v={video_id}'
-            ydl = yt_dlp.YoutubeDL({'quiet': True})
-            info = ydl.extract_info(url, download=False)
+            info = extract_with_profile(url, SUBTITLES_PROFILE)
             auto_subs = info.get('automatic_captions', {}) or {}
             manual_subs = info.get('subtitles', {}) or {}
             
             if not auto_subs and not manual_subs:
-                return jsonify({
+                error = {
                     'error': '该视频没有字幕',
                     'hint': '请选择其他有字幕的视频'
-                }), 404
+                }
             else:
-                return jsonify({
+                error = {
                     'error': '所选语言字幕不可用',
                     'available_languages': list(auto_subs.keys()) + list(manual_subs.keys()),
                     'hint': '尝试选择其他语言'
-                }), 404
+                }
         except:
-            return jsonify({'error': '获取字幕失败，请稍后重试'}), 404
+            error = {'error': '获取字幕失败，请稍后重试'}
+        raise DownloadError(error)
     
     transcript_text = parse_srt_to_text(srt_content)
     
@@ -619,101 +701,93 @@ def download():
     video_info = get_video_info(video_id)
     title = video_info.get('title', 'subtitle') if video_info else 'subtitle'
     
-    def generate_summary_text(transcript_text, video_info):
-        lines = []
-        lines.append("=" * 60)
-        lines.append(title)
-        lines.append("=" * 60)
-        lines.append("")
-        lines.append("【视频信息】")
-        lines.append(f"发布时间: {video_info.get('published', '未知')}")
-        lines.append(f"视频链接: {video_info.get('url', '未知')}")
-        lines.append(f"发布账号: {video_info.get('channel', '未知')}")
-        lines.append(f"观看次数: {video_info.get('view_count', 0):,}")
-        lines.append(f"点赞数量: {video_info.get('like_count', 0):,}")
-        lines.append(f"视频时长: {video_info.get('duration', 0)//60} 分钟")
-        lines.append("")
-        lines.append("【视频简介】")
-        description = video_info.get('description', '无')
-        if len(description) > 500:
-            description = description[:500] + '...'
-        lines.append(description)
-        lines.append("")
-        lines.append("【核心观点】")
-        lines.append("（以下为AI根据字幕内容自动提取，仅供参考）")
-        
-        use_gpt = bool(os.environ.get('OPENAI_API_KEY', '') or os.environ.get('SILICONFLOW_API_KEY', ''))
-        
-        # 也检查配置文件
-        if not use_gpt:
-            try:
-                from api_config import SILICONFLOW_API_KEY
-                use_gpt = bool(SILICONFLOW_API_KEY)
-            except:
-                pass
-        
-        keywords = extract_key_points(transcript_text, use_gpt=use_gpt)
-        for i, point in enumerate(keywords[:8], 1):
-            lines.append(f"{i}. {point}")
-        
-        lines.append("")
-        lines.append("=" * 60)
-        lines.append("【字幕内容】")
-        lines.append("=" * 60)
-        lines.append("")
-        lines.append(transcript_text)
-        return '\n'.join(lines)
-    
-    if format_type == 'txt':
-        full_content = generate_summary_text(transcript_text, video_info)
-        output = BytesIO(full_content.encode('utf-8'))
-        output.seek(0)
-        return send_file(
-            output,
-            mimetype='text/plain',
-            as_attachment=True,
-            download_name=f'{title[:50]}_subtitle.txt'
+    def generate_summary_text(transcript_text, video_info, key_points):
+        info_lines = [
+            f"发布时间: {video_info.get('published', '未知')}",
+            f"视频链接: {video_info.get('url', '未知')}",
+            f"发布账号: {video_info.get('channel', '未知')}",
+            f"观看次数: {video_info.get('view_count', 0):,}",
+            f"点赞数量: {video_info.get('like_count', 0):,}",
+            f"视频时长: {video_info.get('duration', 0)//60} 分钟",
+        ]
+        return iter_summary_text(
+            title, info_lines, video_info.get('description', '无'), key_points, transcript_text
         )
     
-    elif format_type == 'srt':
-        output = BytesIO(srt_content.encode('utf-8'))
-        output.seek(0)
-        return send_file(
-            output,
-            mimetype='text/plain',
-            as_attachment=True,
-            download_name=f'{title[:50]}_subtitle.srt'
+    if format_type == 'txt':
+        key_points, summary_source = get_key_points(transcript_text)
+        full_content = generate_summary_text(transcript_text, video_info, key_points)
+        return make_artifact(full_content, 'txt', f'{title[:50]}_subtitle.txt', transcript_text, summary_source)
+    
+    elif format_type in ('srt', 'vtt'):
+        # 上游返回的可能是 json3/VTT，按所选格式重新输出，保留时间轴；自动字幕只去重，不合并分条
+        segments = normalize_segments(parse_subtitles(srt_content), merge_sentences=False)
+        return make_artifact(
+            SUBTITLE_EMITTERS[format_type](segments), format_type, f'{title[:50]}_subtitle.{format_type}'
         )
     
     elif format_type == 'docx':
-        docx_buffer = create_docx(transcript_text, title, video_info)
-        response = send_file(
-            docx_buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            as_attachment=True,
-            download_name=f'{title[:50]}_subtitle.docx'
+        key_points, summary_source = get_key_points(transcript_text)
+        return make_artifact(
+            create_docx(transcript_text, title, video_info, key_points=key_points),
+            'docx', f'{title[:50]}_subtitle.docx', transcript_text, summary_source
         )
-        response.headers['Access-Control-Expose-Headers'] = 'Content-Disposition'
-        return response
     
-    elif format_type == 'json':
-        json_data = {
-            'video_id': video_id,
-            'title': title,
-            'transcript': transcript_text,
-            'language': language,
-            'generated_at': datetime.now().isoformat()
-        }
-        output = BytesIO(json.dumps(json_data, ensure_ascii=False, indent=2).encode('utf-8'))
-        output.seek(0)
-        return send_file(
-            output,
-            mimetype='application/json',
-            as_attachment=True,
-            download_name=f'{title[:50]}_subtitle.json'
-        )
+    json_data = {
+        'video_id': video_id,
+        'title': title,
+        'transcript': transcript_text,
+        'language': language,
+        'generated_at': datetime.now().isoformat()
+    }
+    return make_artifact(iter_json(json_data), 'json', f'{title[:50]}_subtitle.json')
+
+def sse_event(data, event=None):
+    message = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    return message
+
+@app.route('/api/keypoints/stream', methods=['POST'])
+@admit(youtube_download_limiter)
+def stream_key_points():
+    """以 SSE 推送核心观点，AI 每生成一条就推送一条"""
+    data = request.json or {}
+    video_id = data.get('video_id')
+    language = data.get('language', 'en')
+    transcript_text = data.get('text', '')
+    
+    if not transcript_text:
+        if not video_id:
+            return jsonify({'error': 'Video ID or text is required'}), 400
+        srt_content = get_transcript(video_id, language) or get_transcript(video_id, 'en')
+        if not srt_content:
+            return jsonify({'error': '获取字幕失败，请稍后重试'}), 404
+        transcript_text = parse_srt_to_text(srt_content)
     
-    return jsonify({'error': 'Invalid format'}), 400
+    def generate():
+        count = 0
+        if has_llm_provider():
+            try:
+                for point in stream_gpt_key_points(transcript_text):
+                    count += 1
+                    yield sse_event({'index': count, 'point': point, 'source': 'ai'})
+            except Exception as e:
+                print(f"AI key points stream error: {e}")
+        
+        # AI 不可用或未产出任何观点时退回到本地提取
+        if count == 0:
+            for point in extract_key_points(transcript_text, use_gpt=False)[:8]:
+                count += 1
+                yield sse_event({'index': count, 'point': point, 'source': 'local'})
+        
+        yield sse_event({'total': count}, event='done')
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/health')
 def health():
@@ -735,36 +809,55 @@ def get_bilibili_sessdata():
 
 BILIBILI_SESSDATA = get_bilibili_sessdata()
 
-def get_bilibili_headers():
-    """获取B站API请求头"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-        'Referer': 'https://www.bilibili.com'
-    }
-    if BILIBILI_SESSDATA:
-        headers['Cookie'] = f'SESSDATA={BILIBILI_SESSDATA}'
-    return headers
+BILIBILI_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+    'Referer': 'https://www.bilibili.com'
+}
 
-def get_bilibili_video_info(video_type, video_id):
-    """获取B站视频信息"""
-    import requests
-    
-    if video_type == 'bv':
-        # 通过BV号获取AV号
+# B站请求头和Cookie只在共享客户端上设置一次
+get_client('bilibili').configure(
+    headers=BILIBILI_HEADERS,
+    cookies={'SESSDATA': BILIBILI_SESSDATA},
+    cookie_domain='.bilibili.com'
+)
+
+# B站 view 接口数据缓存（含 cid、分P列表、字幕列表），bvid 和 aid 两个键指向同一份数据
+BILIBILI_VIEW_CACHE_TTL = 600
+bilibili_view_cache = TTLCache(ttl=BILIBILI_VIEW_CACHE_TTL, maxsize=512)
+
+def fetch_bilibili_view(video_type=None, video_id=None, aid=None):
+    """获取B站 view 接口数据，优先读取缓存"""
+    if aid is not None:
+        cache_key = f"av:{aid}"
+        api_url = f"https://api.bilibili.com/x/web-interface/view?aid={aid}"
+    elif video_type == 'bv':
+        cache_key = f"bv:{video_id}"
         api_url = f"https://api.bilibili.com/x/web-interface/view?bvid={video_id}"
     else:
-        # 直接使用AV号
+        cache_key = f"av:{video_id}"
         api_url = f"https://api.bilibili.com/x/web-interface/view?aid={video_id}"
     
-    headers = get_bilibili_headers()
+    view = bilibili_view_cache.get(cache_key)
+    if view is not None:
+        return view
     
-    response = requests.get(api_url, headers=headers)
+    response = get_client('bilibili').get(api_url)
     data = response.json()
     
     if data.get('code') != 0:
         raise Exception(data.get('message', '获取视频信息失败'))
     
-    info = data.get('data', {})
+    view = data.get('data', {})
+    if view.get('bvid'):
+        bilibili_view_cache.set(f"bv:{view['bvid']}", view)
+    if view.get('aid'):
+        bilibili_view_cache.set(f"av:{view['aid']}", view)
+    bilibili_view_cache.set(cache_key, view)
+    return view
+
+def get_bilibili_video_info(video_type, video_id, view=None):
+    """获取B站视频信息"""
+    info = view or fetch_bilibili_view(video_type, video_id)
     
     # 格式化时长
     duration = info.get('duration', 0)
@@ -785,61 +878,146 @@ def get_bilibili_video_info(video_type, video_id):
         'publish_time': info.get('pubdate', 0)
     }
 
-def get_bilibili_subtitle(aid):
-    """获取B站弹幕（作为字幕使用）"""
-    import requests
+def get_bilibili_player_subtitles(aid, cid):
+    """获取播放器接口返回的字幕列表（含AI字幕），按 aid/cid 缓存"""
+    cache_key = f"player:{aid}:{cid}"
+    subtitles = bilibili_view_cache.get(cache_key)
+    if subtitles is not None:
+        return subtitles
+    
+    player_url = f"https://api.bilibili.com/x/player/wbi/v2?aid={aid}&cid={cid}"
+    response = get_client('bilibili').get(player_url)
+    player_data = response.json()
+    
+    if player_data.get('code') != 0:
+        return []
+    
+    subtitles = player_data.get('data', {}).get('subtitle', {}).get('subtitles', [])
+    bilibili_view_cache.set(cache_key, subtitles)
+    return subtitles
+
+def fetch_bilibili_cid_subtitle(aid, cid, ai_only=False):
+    """获取单个分P（cid）的字幕，优先AI字幕，返回统一格式的 body 列表"""
+    subtitles_list = get_bilibili_player_subtitles(aid, cid)
+    candidates = sorted(subtitles_list, key=lambda sub: not sub.get('lan', '').startswith('ai-'))
+    if ai_only:
+        candidates = [sub for sub in candidates if sub.get('lan', '').startswith('ai-')]
+    
+    for sub in candidates:
+        subtitle_url = sub.get('subtitle_url', '')
+        if not subtitle_url:
+            continue
+        # 处理相对URL
+        if subtitle_url.startswith('//'):
+            subtitle_url = 'https:' + subtitle_url
+        # 获取完整的字幕内容
+        sub_response = get_client('bilibili').get(subtitle_url)
+        if sub_response.status_code == 200:
+            return [
+                {
+                    'from': item.get('from', 0),
+                    'to': item.get('to', 0),
+                    'content': item.get('content', '')
+                }
+                for item in sub_response.json().get('body', [])
+            ]
+    return None
+
+# 分P字幕并发获取上限
+BILIBILI_PART_WORKERS = 4
+
+def get_bilibili_multipart_subtitle(aid, view, max_workers=BILIBILI_PART_WORKERS):
+    """
+    获取多P视频所有分P的字幕
+    
+    各分P并发获取，按分P顺序合并：
+    - body: 按前面分P的时长偏移，拼成一条连续时间轴
+    - tracks: 每个分P独立的字幕轨，保留原始时间戳
+    """
+    pages = view.get('pages') or [{
+        'cid': view.get('cid'),
+        'page': 1,
+        'part': view.get('title', ''),
+        'duration': view.get('duration', 0)
+    }]
+    
+    def fetch_page(page):
+        try:
+            return fetch_bilibili_cid_subtitle(aid, page.get('cid'))
+        except Exception as e:
+            print(f"获取P{page.get('page')}字幕失败: {e}")
+            return None
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-        'Referer': 'https://www.bilibili.com'
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pages)))) as executor:
+        bodies = list(executor.map(fetch_page, pages))
+    
+    if not any(bodies):
+        return None
+    
+    tracks = []
+    body = []
+    offset = 0
+    for page, part_body in zip(pages, bodies):
+        part_body = part_body or []
+        tracks.append({
+            'page': page.get('page'),
+            'part': page.get('part', ''),
+            'cid': page.get('cid'),
+            'offset': offset,
+            'body': part_body
+        })
+        for item in part_body:
+            body.append({
+                'from': item['from'] + offset,
+                'to': item['to'] + offset,
+                'content': item['content'],
+                'page': page.get('page')
+            })
+        offset += page.get('duration', 0)
+    
+    return {
+        'code': 0,
+        'message': 'success',
+        'body': body,
+        'tracks': tracks
     }
+
+def page_duration(view, cid):
+    """分P的时长；view 的 duration 是所有分P的总时长"""
+    for page in view.get('pages') or []:
+        if page.get('cid') == cid:
+            return page.get('duration', 0)
+    return view.get('duration', 0)
+
+def get_bilibili_subtitle(aid, view=None, danmaku_options=None):
+    """
+    获取B站字幕，没有字幕时使用弹幕（作为字幕使用）
     
-    # 获取视频信息中的字幕列表
-    view_url = f"https://api.bilibili.com/x/web-interface/view?aid={aid}"
-    response = requests.get(view_url, headers=headers)
-    data = response.json()
+    view 为已获取的 view 接口数据，未传入时从缓存或接口获取；
+    danmaku_options 传给 fetch_danmaku（start/end 时间窗口、max_per_bucket 采样密度）
+    """
+    bilibili = get_client('bilibili')
     
-    if data.get('code') != 0:
-        return None
+    # 获取视频信息中的 cid 和字幕列表
+    if view is None:
+        try:
+            view = fetch_bilibili_view(aid=aid)
+        except Exception as e:
+            print(f"获取B站视频信息失败: {e}")
+            return None
     
-    info = data.get('data', {})
+    info = view
     
     # 优先尝试获取AI字幕（需要Cookie）
     if BILIBILI_SESSDATA:
         try:
-            player_url = f"https://api.bilibili.com/x/player/wbi/v2?aid={aid}&cid={info.get('cid')}"
-            response = requests.get(player_url, headers=get_bilibili_headers())
-            player_data = response.json()
-            
-            if player_data.get('code') == 0:
-                subtitle_info = player_data.get('data', {}).get('subtitle', {})
-                subtitles_list = subtitle_info.get('subtitles', [])
-                
-                # 查找AI字幕
-                for sub in subtitles_list:
-                    if sub.get('lan', '').startswith('ai-'):
-                        subtitle_url = sub.get('subtitle_url', '')
-                        if subtitle_url:
-                            # 处理相对URL
-                            if subtitle_url.startswith('//'):
-                                subtitle_url = 'https:' + subtitle_url
-                            # 获取完整的字幕内容
-                            sub_response = requests.get(subtitle_url)
-                            if sub_response.status_code == 200:
-                                ai_sub_data = sub_response.json()
-                                # 转换为统一格式
-                                return {
-                                    'code': 0,
-                                    'message': 'success',
-                                    'body': [
-                                        {
-                                            'from': item.get('from', 0),
-                                            'to': item.get('to', 0),
-                                            'content': item.get('content', '')
-                                        }
-                                        for item in ai_sub_data.get('body', [])
-                                    ]
-                                }
+            ai_body = fetch_bilibili_cid_subtitle(aid, info.get('cid'), ai_only=True)
+            if ai_body:
+                return {
+                    'code': 0,
+                    'message': 'success',
+                    'body': ai_body
+                }
         except Exception as e:
             print(f"获取AI字幕失败: {e}")
     
@@ -850,43 +1028,29 @@ def get_bilibili_subtitle(aid):
     if subtitles:
         subtitle_data = subtitles[0]
         subtitle_api_url = f"https://comment.bilibili.com/{subtitle_data.get('id')}.json"
-        response = requests.get(subtitle_api_url, headers=headers)
+        response = bilibili.get(subtitle_api_url)
         if response.status_code == 200:
             return response.json()
     
-    # 没有字幕时，使用弹幕作为替代
-    danmaku_url = f"https://comment.bilibili.com/{aid}.json"
-    response = requests.get(danmaku_url, headers=headers)
-    if response.status_code != 200:
+    # 没有字幕时，使用弹幕作为替代（分段并发获取，按时间窗口过滤、按密度采样）
+    try:
+        body = fetch_danmaku(aid, info.get('cid'), page_duration(info, info.get('cid')), **(danmaku_options or {}))
+    except Exception as e:
+        print(f"获取弹幕失败: {e}")
         return None
     
-    # 将弹幕转换为字幕格式
-    danmaku_data = response.json()
-    body = danmaku_data.get('body', [])
+    if not body:
+        return None
     
-    # 转换为字幕格式
-    converted = {
+    return {
         'code': 0,
         'message': 'success',
         'ttl': 1,
-        'body': [
-            {
-                'id': item.get('id', 0),
-                'mode': item.get('mode', 1),
-                'msg': item.get('c', ''),
-                'progress': item.get('p', 0),
-                'color': item.get('c', '').split(',')[0] if ',' in str(item.get('c', '')) else 'ffffff',
-                'from': item.get('p', 0) / 1000 if isinstance(item.get('p'), (int, float)) else 0,
-                'to': (item.get('p', 0) / 1000 + 3) if isinstance(item.get('p'), (int, float)) else 3,
-                'content': item.get('c', '').split(',')[-1] if ',' in str(item.get('c', '')) else item.get('c', '')
-            }
-            for item in body[:500]  # 限制500条
-        ]
+        'body': body
     }
-    
-    return converted
 
 @app.route('/api/bilibili/video/<video_type>/<video_id>')
+@admit(metadata_limiter)
 def get_bilibili_video(video_type, video_id):
     """获取B站视频信息API"""
     try:
@@ -895,6 +1059,48 @@ def get_bilibili_video(video_type, video_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
+# 多P字幕的合并方式
+MULTIPART_MODES = ('timeline', 'tracks')
+
+def parse_flag(value):
+    """解析请求中的布尔参数：true/false、1/0 及其字符串形式，其他值抛出 ValueError"""
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ('true', '1', 'false', '0', ''):
+        return value.strip().lower() in ('true', '1')
+    raise ValueError(value)
+
+def parse_danmaku_options(data):
+    """
+    校验请求中的弹幕参数
+
+    Returns:
+        传给 fetch_danmaku 的参数（start/end 为非负秒数，max_per_bucket 为正整数）
+
+    Raises:
+        ValueError: 参数类型或范围不合法
+    """
+    options = {}
+    for field, key in (('danmaku_start', 'start'), ('danmaku_end', 'end')):
+        value = data.get(field)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f'{field} must be a non-negative number of seconds')
+        options[key] = value
+    if 'start' in options and 'end' in options and options['end'] <= options['start']:
+        raise ValueError('danmaku_end must be greater than danmaku_start')
+    value = data.get('danmaku_max_per_bucket')
+    if value is not None:
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError('danmaku_max_per_bucket must be a positive integer')
+        options['max_per_bucket'] = value
+    return options
+
 @app.route('/api/bilibili/download', methods=['POST'])
 def download_bilibili_subtitle():
     """下载B站字幕API"""
@@ -904,160 +1110,161 @@ def download_bilibili_subtitle():
     format_type = data.get('format', 'txt')
     language = data.get('language', 'original')
     translate = data.get('translate', 'none')
+    multipart_mode = data.get('multipart_mode', 'timeline')
     
     if not video_id:
         return jsonify({'error': 'Video ID is required'}), 400
-    
+    if format_type not in DOWNLOAD_FORMATS:
+        return jsonify({'error': 'Unsupported format'}), 400
     try:
-        # 获取视频信息
-        video_info = get_bilibili_video_info(video_type, video_id)
+        multipart = parse_flag(data.get('multipart'))
+    except ValueError:
+        return jsonify({'error': 'multipart must be true or false'}), 400
+    if multipart_mode not in MULTIPART_MODES:
+        return jsonify({'error': f"multipart_mode must be one of: {', '.join(MULTIPART_MODES)}"}), 400
+    try:
+        danmaku_options = parse_danmaku_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def build():
+        """获取字幕并渲染下载文件，返回 (内容, 元数据)"""
+        # 获取视频信息，view 数据复用给字幕获取
+        view = fetch_bilibili_view(video_type, video_id)
+        video_info = get_bilibili_video_info(video_type, video_id, view=view)
         
-        # 获取字幕
-        subtitle_data = get_bilibili_subtitle(video_info['aid'])
+        # 获取字幕，多P视频可获取全部分P
+        subtitle_data = None
+        if multipart and len(view.get('pages') or []) > 1:
+            subtitle_data = get_bilibili_multipart_subtitle(video_info['aid'], view)
+        if not subtitle_data:
+            # 各分P都没有播放器/AI字幕时，与单P一样回退到视频级字幕或弹幕
+            subtitle_data = get_bilibili_subtitle(video_info['aid'], view=view, danmaku_options=danmaku_options)
         
         if not subtitle_data:
-            return jsonify({
+            raise DownloadError({
                 'error': '该视频没有字幕/弹幕',
                 'hint': 'B站大部分视频无官方字幕，请选择其他视频（如教程、演讲类）'
-            }), 404
+            })
         
         # 解析字幕内容
         subtitles = subtitle_data.get('body', [])
-        transcript_text = '\n'.join([item.get('content', '') for item in subtitles])
+        tracks = subtitle_data.get('tracks')
+        if tracks and multipart_mode == 'tracks':
+            transcript_text = '\n\n'.join(
+                f"【P{track['page']} {track['part']}】\n" + '\n'.join(item.get('content', '') for item in track['body'])
+                for track in tracks if track['body']
+            )
+        else:
+            transcript_text = '\n'.join([item.get('content', '') for item in subtitles])
         
         # 翻译
         if translate != 'none':
             transcript_text = translate_text(transcript_text, translate)
         
         # 生成B站特有的内容格式
-        def generate_bilibili_summary_text(video_info, transcript_text):
-            lines = []
-            lines.append("=" * 60)
-            lines.append(video_info['title'])
-            lines.append("=" * 60)
-            lines.append("")
-            lines.append("【视频信息】")
-            lines.append(f"标题: {video_info['title']}")
-            lines.append(f"链接: https://www.bilibili.com/video/{video_info.get('bvid', video_id)}")
-            lines.append(f"作者: {video_info['author']}")
-            lines.append(f"时长: {video_info['duration']}")
-            lines.append("")
-            lines.append("【视频简介】")
-            description = video_info.get('description', '无')
-            if len(description) > 500:
-                description = description[:500] + '...'
-            lines.append(description)
-            lines.append("")
-            lines.append("【核心观点】")
-            lines.append("（以下为AI根据字幕内容自动提取，仅供参考）")
-            
-            use_gpt = bool(os.environ.get('OPENAI_API_KEY', '') or os.environ.get('SILICONFLOW_API_KEY', ''))
-            if not use_gpt:
-                try:
-                    from api_config import SILICONFLOW_API_KEY
-                    use_gpt = bool(SILICONFLOW_API_KEY)
-                except:
-                    pass
-            
-            keywords = extract_key_points(transcript_text, use_gpt=use_gpt)
-            for i, point in enumerate(keywords[:8], 1):
-                lines.append(f"{i}. {point}")
-            
-            lines.append("")
-            lines.append("=" * 60)
-            lines.append("【字幕内容】")
-            lines.append("=" * 60)
-            lines.append("")
-            lines.append(transcript_text)
-            return '\n'.join(lines)
-        
-        def generate_bilibili_srt(subtitles):
-            lines = []
-            for i, item in enumerate(subtitles, 1):
-                content = item.get('content', '').replace('\n', ' ')
-                from_time = item.get('from', 0)
-                to_time = item.get('to', 0)
-                
-                hours = int(from_time // 3600)
-                minutes = int((from_time % 3600) // 60)
-                secs = int(from_time % 60)
-                millisecs = int((from_time % 1) * 1000)
-                from_str = f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}"
-                
-                hours = int(to_time // 3600)
-                minutes = int((to_time % 3600) // 60)
-                secs = int(to_time % 60)
-                millisecs = int((to_time % 1) * 1000)
-                to_str = f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}"
-                
-                lines.append(str(i))
-                lines.append(f"{from_str} --> {to_str}")
-                lines.append(content)
-                lines.append("")
-            
-            return '\n'.join(lines)
+        def generate_bilibili_summary_text(video_info, transcript_text, key_points):
+            info_lines = [
+                f"标题: {video_info['title']}",
+                f"链接: https://www.bilibili.com/video/{video_info.get('bvid', video_id)}",
+                f"作者: {video_info['author']}",
+                f"时长: {video_info['duration']}",
+            ]
+            return iter_summary_text(
+                video_info['title'], info_lines, video_info.get('description', '无'), key_points, transcript_text
+            )
         
         # 生成输出
+        download_name = f"{video_info['title'][:50]}_subtitle.{format_type}"
         if format_type == 'txt':
-            full_content = generate_bilibili_summary_text(video_info, transcript_text)
-            output = BytesIO(full_content.encode('utf-8'))
-            output.seek(0)
-            return send_file(
-                output,
-                mimetype='text/plain',
-                as_attachment=True,
-                download_name=f"{video_info['title'][:50]}_subtitle.txt"
-            )
-        elif format_type == 'srt':
-            srt_content = generate_bilibili_srt(subtitles)
-            output = BytesIO(srt_content.encode('utf-8'))
-            output.seek(0)
-            return send_file(
-                output,
-                mimetype='text/plain',
-                as_attachment=True,
-                download_name=f"{video_info['title'][:50]}_subtitle.srt"
+            key_points, summary_source = get_key_points(transcript_text)
+            full_content = generate_bilibili_summary_text(video_info, transcript_text, key_points)
+            return make_artifact(full_content, 'txt', download_name, transcript_text, summary_source)
+        elif format_type in ('srt', 'vtt'):
+            segments = (
+                segment._replace(text=segment.text.replace('\n', ' '))
+                for segment in parse_bilibili(subtitles)
             )
+            return make_artifact(SUBTITLE_EMITTERS[format_type](segments), format_type, download_name)
         elif format_type == 'json':
-            json_content = json.dumps({
+            json_data = {
                 'video': video_info,
                 'subtitles': subtitles,
                 'transcript': transcript_text
-            }, ensure_ascii=False, indent=2)
-            output = BytesIO(json_content.encode('utf-8'))
-            output.seek(0)
-            return send_file(
-                output,
-                mimetype='application/json',
-                as_attachment=True,
-                download_name=f"{video_info['title'][:50]}_subtitle.json"
-            )
-        elif format_type == 'docx':
-            docx_content = create_docx(transcript_text, video_info['title'], video_info, include_summary=True)
-            return send_file(
-                docx_content,
-                mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                as_attachment=True,
-                download_name=f"{video_info['title'][:50]}_subtitle.docx"
-            )
-        else:
-            return jsonify({'error': 'Unsupported format'}), 400
-        
+            }
+            if tracks:
+                json_data['tracks'] = tracks
+            return make_artifact(iter_json(json_data), 'json', download_name)
+        key_points, summary_source = get_key_points(transcript_text)
+        docx_content = create_docx(
+            transcript_text, video_info['title'], video_info, include_summary=True, key_points=key_points
+        )
+        return make_artifact(docx_content, 'docx', download_name, transcript_text, summary_source)
+    
+    try:
+        return download_from_cache(
+            {
+                'source': 'bilibili',
+                'video_id': video_id,
+                'video_type': video_type,
+                'format': format_type,
+                'language': language,
+                'translate': translate,
+                'multipart': multipart,
+                'multipart_mode': multipart_mode,
+                'danmaku': danmaku_options,
+            },
+            build,
+            bilibili_download_limiter
+        )
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 # ==================== 静态文件路由 ====================
-from flask import send_from_directory
+STATIC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static'))
+# 非 HTML 静态资源的浏览器缓存时长（秒）
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', str(7 * 24 * 3600)))
+
+try:
+    precompress(STATIC_DIR)
+except OSError as e:
+    print(f"Static precompression skipped: {e}")
 
 @app.route('/')
 def index():
-    return send_from_directory('../static', 'youtube-subtitle-downloader.html')
+    return send_static(STATIC_DIR, 'youtube-subtitle-downloader.html', STATIC_MAX_AGE)
 
 @app.route('/<path:filename>')
 def static_files(filename):
-    return send_from_directory('../static', filename)
+    return send_static(STATIC_DIR, filename, STATIC_MAX_AGE)
+
+
+def startup():
+    """
+    预热：启动渲染进程池，预先创建元数据和字幕配置的 YoutubeDL 实例（gunicorn post_worker_init 钩子调用）
+
+    须在 fork 之后的进程中调用，YoutubeDL 实例持有的连接和 Cookie 不能跨进程共享
+    """
+    if cpu_pool is not None:
+        cpu_pool.start()
+    try:
+        prewarm_profiles(METADATA_PROFILE, SUBTITLES_PROFILE)
+    except Exception as e:
+        print(f"yt-dlp prewarm error: {e}")
+
+def shutdown():
+    """优雅退出：等待进程池中的渲染完成，停止接收后台AI任务，关闭上游连接池和 YoutubeDL 实例（gunicorn worker_exit 钩子调用）"""
+    if cpu_pool is not None:
+        cpu_pool.shutdown()
+    key_points_cache.shutdown()
+    close_clients()
+    close_all_pools()
 
 if __name__ == '__main__':
+    # 开发服务器；生产环境使用 gunicorn -c gunicorn.conf.py（见 README）
+    # 开启自动重载时只在实际处理请求的子进程中预热
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        startup()
     app.run(host='0.0.0.0', debug=True, port=5002)
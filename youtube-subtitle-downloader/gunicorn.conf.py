@@ -0,0 +1,62 @@
+"""
+字幕下载器生产环境 gunicorn 配置
+
+用法:
+    cd youtube-subtitle-downloader
+    gunicorn -c gunicorn.conf.py
+
+所有参数都可用环境变量覆盖，见下方各项
+"""
+
+import multiprocessing
+import os
+import sys
+
+app_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app')
+sys.path.insert(0, app_dir)
+
+wsgi_app = 'youtube_subtitle_api:app'
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5002')}")
+
+# 多进程 + 每进程多线程：下载接口大部分时间在等 YouTube/B站/LLM，线程即可并发；
+# CPU 密集的渲染已交给各 worker 的进程池（CPU_POOL_WORKERS），不占 worker 的 GIL
+cpu_count = multiprocessing.cpu_count()
+workers = int(os.environ.get('WEB_CONCURRENCY', str(cpu_count)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '16'))
+# 各 worker 的渲染进程池合计不超过 CPU 核数
+os.environ.setdefault('CPU_POOL_WORKERS', str(max(1, cpu_count // workers)))
+
+# 在 master 中导入应用（Flask、yt-dlp、python-docx 等只导入一次），fork 后各 worker 共享内存页；
+# 进程池、线程池、上游连接池都是首次使用时才创建，不会在 fork 前启动
+preload_app = True
+
+# 处理一定数量的请求后替换 worker，限制内存增长；抖动避免所有 worker 同时重启。
+# 替换 worker 时会重新启动其渲染进程池，上限不宜过小
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+
+# yt-dlp 抓取和 LLM 请求较慢，超时放宽；收到 SIGTERM 后最多等待 graceful_timeout 秒让请求处理完
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+# worker 心跳文件放在内存文件系统，避免磁盘抖动被误判为超时
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_worker_init(worker):
+    """worker 就绪后预先启动渲染进程池、创建 YoutubeDL 实例，避免第一批请求承担启动开销"""
+    import youtube_subtitle_api
+    youtube_subtitle_api.startup()
+
+
+def worker_exit(server, worker):
+    """worker 退出（重启、缩容、SIGTERM）时关闭进程池和连接池"""
+    import youtube_subtitle_api
+    youtube_subtitle_api.shutdown()